@@ -0,0 +1 @@
+"""Benchmark suite: synthetic corpora and timings of indexing and retrieval stages."""
@@ -0,0 +1,72 @@
+"""Synthetic markdown/PDF corpora shaped like the CERT coding standards."""
+
+import random
+from pathlib import Path
+
+RULE_PREFIXES = ["PRE", "DCL", "EXP", "INT", "FLP", "ARR", "STR", "MEM", "FIO", "ERR"]
+IDENTIFIERS = ["strncpy", "memcpy", "errno", "malloc", "free", "size_t", "INT_MAX"]
+PROSE = (
+    "the value of an object must not be used after its lifetime ends and every "
+    "conversion between integer types can change the value when the range of the "
+    "destination type is smaller than the range of the source type so check bounds"
+)
+WORDS = PROSE.split()
+
+
+def rule_id(chapter: int, rule: int) -> str:
+    """CERT-style rule id, e.g. INT30-C."""
+    return f"{RULE_PREFIXES[chapter % len(RULE_PREFIXES)]}{30 + rule}-C"
+
+
+def make_document(doc: int, chapters: int, rules: int, rng: random.Random) -> str:
+    """
+    One standard: '## **N Chapter**' headers, each followed by rule sections
+    '## **N.M RULE-C. Title**' with prose and a code example.
+    """
+    parts = [f"# Synthetic Coding Standard {doc}\n"]
+    for chapter in range(1, chapters + 1):
+        parts.append(f"## **{chapter} Chapter {chapter}**\n")
+        for rule in range(rules):
+            identifier = rng.choice(IDENTIFIERS)
+            prose = " ".join(rng.choice(WORDS) for _ in range(rng.randint(80, 240)))
+            parts.append(
+                f"## **{chapter}.{rule + 1} {rule_id(chapter, rule)}. "
+                f"Use {identifier} safely (doc {doc})**\n\n{prose}\n\n"
+                f"### Noncompliant Code Example\n\n```c\n"
+                f"void f(char *dst, const char *src) {{ {identifier}(dst, src); }}\n"
+                f"```\n"
+            )
+    return "\n".join(parts)
+
+
+def generate_corpus(
+    path: Path | str,
+    md_files: int = 20,
+    pdf_files: int = 2,
+    chapters: int = 5,
+    rules: int = 8,
+    seed: int = 0,
+) -> tuple[list[str], list[str]]:
+    """Write md_files markdown files and pdf_files PDFs under path. Returns (md, pdf) paths."""
+    import pymupdf
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    md_paths = []
+    for i in range(md_files):
+        md_path = path / f"standard_{i:04d}.md"
+        md_path.write_text(make_document(i, chapters, rules, rng), encoding="utf-8")
+        md_paths.append(str(md_path.resolve()))
+    pdf_paths = []
+    for i in range(pdf_files):
+        text = make_document(md_files + i, chapters, rules, rng)
+        pdf_path = path / f"standard_{md_files + i:04d}.pdf"
+        with pymupdf.open() as doc:
+            lines = text.split("\n")
+            for start in range(0, len(lines), 50):
+                page = doc.new_page()
+                page.insert_text((50, 50), "\n".join(lines[start : start + 50]))
+            doc.save(pdf_path)
+        pdf_paths.append(str(pdf_path.resolve()))
+    return md_paths, pdf_paths
@@ -0,0 +1,174 @@
+"""
+Local stand-in for the Gemini API that injects latency and 429s.
+
+Serves generateContent and streamGenerateContent (SSE) for any model, so a
+real google-genai client pointed at it (GEMINI_BASE_URL) exercises retries,
+rate limiting and load shedding without network or quota.
+
+Run from project root:
+  python -m benchmarks.fake_gemini --port 8001 --latency 0.5 --rate-limit-every 5
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from collections.abc import AsyncIterator
+from typing import final
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+REPLY = "Fake Gemini reply."
+
+
+def rate_limit_response(retry_after: float) -> JSONResponse:
+    """429 shaped like Gemini's: RESOURCE_EXHAUSTED with a RetryInfo detail."""
+    body = {
+        "error": {
+            "code": 429,
+            "message": "Resource has been exhausted (fake).",
+            "status": "RESOURCE_EXHAUSTED",
+            "details": [
+                {
+                    "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                    "retryDelay": f"{retry_after}s",
+                }
+            ],
+        }
+    }
+    return JSONResponse(
+        body, status_code=429, headers={"Retry-After": f"{retry_after:g}"}
+    )
+
+
+def candidate(text: str) -> dict:
+    return {
+        "candidates": [
+            {
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }
+        ],
+        "modelVersion": "fake",
+    }
+
+
+def create_app(
+    latency: float = 0.0,
+    rate_limit_every: int = 0,
+    rate_limit_first: int = 0,
+    retry_after: float = 1.0,
+    max_concurrent: int = 0,
+) -> FastAPI:
+    """
+    Fake API. Every rate_limit_every-th request (0 = never), the first
+    rate_limit_first requests, and requests beyond max_concurrent in flight
+    (0 = unlimited) get a 429; the others reply after latency seconds.
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.rate_limited = 0
+    app.state.in_flight = 0
+    app.state.max_in_flight = 0
+
+    def admit() -> JSONResponse | None:
+        app.state.requests += 1
+        n = app.state.requests
+        if (
+            n <= rate_limit_first
+            or (rate_limit_every and n % rate_limit_every == 0)
+            or (max_concurrent and app.state.in_flight >= max_concurrent)
+        ):
+            app.state.rate_limited += 1
+            return rate_limit_response(retry_after)
+        return None
+
+    @app.post("/{version}/models/{model_action}")
+    async def generate(version: str, model_action: str, request: Request):
+        rejected = admit()
+        if rejected is not None:
+            return rejected
+        app.state.in_flight += 1
+        app.state.max_in_flight = max(app.state.max_in_flight, app.state.in_flight)
+        if model_action.endswith(":streamGenerateContent"):
+            return StreamingResponse(stream(), media_type="text/event-stream")
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            app.state.in_flight -= 1
+        return candidate(REPLY)
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            words = REPLY.split(" ")
+            for i, word in enumerate(words):
+                await asyncio.sleep(latency / len(words))
+                text = word if i == 0 else f" {word}"
+                yield f"data: {json.dumps(candidate(text))}\r\n\r\n"
+        finally:
+            app.state.in_flight -= 1
+
+    @app.get("/stats")
+    def stats() -> dict[str, int]:
+        return {
+            "requests": app.state.requests,
+            "rate_limited": app.state.rate_limited,
+            "max_in_flight": app.state.max_in_flight,
+        }
+
+    return app
+
+
+@final
+class FakeGeminiServer:
+    """Runs create_app(**options) with uvicorn on a free local port in a thread."""
+
+    def __init__(self, **options: float) -> None:
+        self.app = create_app(**options)  # type: ignore[arg-type]
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(
+            self.app, host="127.0.0.1", port=self.port, log_level="warning"
+        )
+        self.server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "FakeGeminiServer":
+        self._thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.server.should_exit = True
+        self._thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds")
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--rate-limit-first", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="seconds")
+    parser.add_argument("--max-concurrent", type=int, default=0)
+    args = parser.parse_args()
+    app = create_app(
+        args.latency,
+        args.rate_limit_every,
+        args.rate_limit_first,
+        args.retry_after,
+        args.max_concurrent,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
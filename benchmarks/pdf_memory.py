@@ -0,0 +1,173 @@
+"""
+Peak memory of PDF conversion, splitting and indexing by document size, as JSON.
+
+For each page count, a synthetic PDF is converted, split and indexed (hash
+embeddings, in-memory Chroma) in a fresh process, in two ways:
+- in memory: whole-file pymupdf4llm.to_markdown, one string written with
+  write_text, then ChromaIndexer.index_files
+- streaming: IngestionPipeline, with PdfConverter page batches appended to the
+  .md on disk
+Both index through ChromaIndexer.iter_prepare_file, in batches of the
+indexer's batch_size, as the server and scripts do.
+Peak RSS is reported for the indexing process and for its largest child (the
+conversion workers).
+
+Run from project root:
+  python -m benchmarks.pdf_memory --pages 50 200 800 --output pdf_memory.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import tempfile
+import textwrap
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.corpus import WORDS, rule_id
+
+MODES = ("in_memory", "streaming")
+
+
+def make_pdf(path: Path, pages: int, seed: int = 0) -> None:
+    """Write a PDF of pages full pages of prose, with a rule header every 4 pages."""
+    import pymupdf
+
+    rng = random.Random(seed)
+    with pymupdf.open() as doc:
+        for number in range(pages):
+            lines = []
+            if number % 4 == 0:
+                chapter, rule = divmod(number // 4, 8)
+                lines.append(f"## **{chapter + 1}.{rule + 1} {rule_id(chapter, rule)}.")
+            prose = " ".join(rng.choice(WORDS) for _ in range(550))
+            lines.extend(textwrap.wrap(prose, 90))
+            page = doc.new_page()
+            page.insert_text((40, 40), "\n".join(lines[:60]), fontsize=8)
+        doc.save(path)
+
+
+def peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * scale / 2**20
+
+
+def measure(
+    mode: str, pdf: str, workers: int, pages_per_batch: int, results: Any
+) -> None:
+    """Convert, split and index pdf in this (fresh) process; put peak RSS on results."""
+    import threading
+
+    import chromadb
+
+    from benchmarks.run import HashEmbeddingFunction
+    from chroma.embedder import BatchEmbedder
+    from chroma.hash_manager import FileHashManager
+    from chroma.indexer import ChromaIndexer
+    from chroma.pdf_converter import PdfConverter
+    from chroma.pipeline import IngestionPipeline
+    from chroma.text_splitter import TextSplitter
+
+    collection = chromadb.EphemeralClient().create_collection(
+        "pdf-memory",
+        embedding_function=HashEmbeddingFunction(),  # type: ignore[arg-type]
+    )
+    indexer = ChromaIndexer(
+        collection,
+        threading.Lock(),
+        TextSplitter(),
+        # one hash file per mode, so the second run doesn't skip the unchanged .md
+        FileHashManager(Path(pdf).with_suffix(f".{mode}.hashes.json")),
+        embedder=BatchEmbedder(HashEmbeddingFunction()),
+    )
+    baseline = peak_rss_mb(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    md_file = str(Path(pdf).with_suffix(".md"))
+    if mode == "in_memory":
+        import pymupdf4llm
+
+        markdown = pymupdf4llm.to_markdown(pdf, header=False, footer=False)
+        Path(md_file).write_text(str(markdown), encoding="utf-8")
+        result = indexer.index_files([md_file])
+    else:
+        from chroma import pdf_converter
+
+        # spawned workers are children of this process, so RUSAGE_CHILDREN
+        # counts them; forkserver workers are children of the fork server
+        spawn = multiprocessing.get_context("spawn")
+        pdf_converter.worker_context = lambda: spawn  # type: ignore[assignment]
+        pipeline = IngestionPipeline(indexer, PdfConverter(workers, pages_per_batch))
+        result = pipeline.run(lambda: ([], [], [pdf]))
+    if result.errors:
+        raise RuntimeError(result.errors)
+    results.put(
+        {
+            "seconds": time.perf_counter() - started,
+            "chunks": collection.count(),
+            "markdown_mb": Path(md_file).stat().st_size / 2**20,
+            "baseline_rss_mb": baseline,
+            "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+            "peak_worker_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        }
+    )
+
+
+def run(args: argparse.Namespace, workdir: Path) -> dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for pages in args.pages:
+        pdf = workdir / f"doc_{pages}.pdf"
+        make_pdf(pdf, pages)
+        for mode in MODES:
+            results = context.Queue()
+            process = context.Process(
+                target=measure,
+                args=(mode, str(pdf), args.workers, args.pages_per_batch, results),
+            )
+            process.start()
+            process.join()  # the result is small enough to sit in the pipe
+            if process.exitcode != 0:
+                raise RuntimeError(f"{mode} run on {pages} pages failed")
+            measured = results.get()
+            runs.append({"pages": pages, "mode": mode, **measured})
+            print(
+                f"{pages:>6} pages {mode:<10} {measured['seconds']:>7.1f}s  "
+                f"markdown {measured['markdown_mb']:>6.1f} MB  "
+                f"{measured['chunks']:>6} chunks  "
+                f"peak {measured['peak_rss_mb']:>7.1f} MB  "
+                f"workers {measured['peak_worker_rss_mb']:>7.1f} MB"
+            )
+    return {
+        "python": sys.version.split()[0],
+        "params": {"workers": args.workers, "pages_per_batch": args.pages_per_batch},
+        "runs": runs,
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--pages", type=int, nargs="+", default=[50, 200, 800], help="PDF sizes"
+    )
+    parser.add_argument("--workers", type=int, default=2, help="conversion processes")
+    parser.add_argument("--pages-per-batch", type=int, default=50)
+    parser.add_argument("--output", type=Path, default=Path("pdf_memory.json"))
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run(args, Path(workdir))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+"""
+Benchmark indexing and retrieval on a synthetic corpus, write results as JSON.
+
+Stages: discovery, PDF conversion, splitting, indexing (reload_collection),
+rule lookup, semantic query (Chroma and the NumPy backend: export, open,
+query), bursts of concurrent queries with and without
+QueryBatcher or spread over read-only worker processes, and /chat end-to-end
+with a stub in place of genai_client, so no API key or network is needed.
+
+Run from project root:
+  python -m benchmarks.run --docs 20 --pdfs 2 --output benchmark.json
+Compare two runs (e.g. before and after a commit) offline:
+  python -m benchmarks.run --compare old.json new.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest import mock
+
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from benchmarks.corpus import generate_corpus, rule_id
+
+QUESTIONS = [
+    "How do I avoid integer overflow when converting between types?",
+    "Is it safe to use memcpy on overlapping buffers?",
+    "What should I check before calling free?",
+    "How do I handle errno correctly?",
+]
+
+# read-only RagClient of a query worker process (see time_workers)
+_worker_client: Any = None
+
+
+class HashEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Deterministic 384-dim embedding from sha256, to time Chroma without the model."""
+
+    DIMENSIONS = 384
+
+    def __init__(self) -> None:
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = []
+        for text in input:
+            digest = hashlib.sha256(text.encode("utf-8")).digest()
+            vector = [digest[i % len(digest)] / 255 for i in range(self.DIMENSIONS)]
+            embeddings.append(vector)
+        return embeddings  # type: ignore[return-value]
+
+    @staticmethod
+    def name() -> str:
+        return "benchmark-hash"
+
+    def get_config(self) -> dict:
+        return {}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashEmbeddingFunction":
+        return HashEmbeddingFunction()
+
+
+class StubLlm:
+    """Stands in for genai.Client: replies after latency seconds, no network."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content=self.generate_content,
+                generate_content_stream=self.generate_content_stream,
+            )
+        )
+
+    async def generate_content(self, **kwargs: Any) -> SimpleNamespace:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(text="Stub reply.")
+
+    async def generate_content_stream(self, **kwargs: Any) -> Any:
+        reply = await self.generate_content(**kwargs)
+
+        async def chunks() -> Any:
+            yield reply
+
+        return chunks()
+
+
+def summarize(samples: list[float]) -> dict[str, float | int]:
+    """Count, total and distribution of timing samples (seconds)."""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "total": sum(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def time_calls(fn: Callable[[], Any], repeat: int) -> dict[str, float | int]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(args: argparse.Namespace, workdir: Path) -> dict[str, Any]:
+    corpus = workdir / "corpus"
+    md_files, pdf_files = generate_corpus(
+        corpus, args.docs, args.pdfs, args.chapters, args.rules, args.seed
+    )
+    with ExitStack() as stack:
+        if args.fake_embeddings:
+            stack.enter_context(
+                mock.patch(
+                    "chroma.chroma.DefaultEmbeddingFunction", HashEmbeddingFunction
+                )
+            )
+        from chroma.chroma import RagClient
+
+        rag_client = RagClient(
+            name="benchmark",
+            persistent_storage=str(workdir / "chroma_db"),
+            collection_path=str(corpus),
+            cache_size=0,  # time retrieval itself, not the cache
+            answer_cache_size=0,
+            pdf_workers=args.pdf_workers or None,
+            pdf_cache_dir=str(workdir / "pdf_cache"),
+        )
+    stages: dict[str, Any] = {}
+    stages["discovery"] = time_calls(
+        lambda: rag_client._discover_files(corpus), args.repeat
+    )
+    if pdf_files:
+        stages["pdf_conversion"] = time_calls(
+            lambda: rag_client.pdf_converter.convert(pdf_files), 1
+        )
+        # unchanged PDFs again: every page comes from the page cache
+        stages["pdf_reconversion_cached"] = time_calls(
+            lambda: rag_client.pdf_converter.convert(pdf_files), args.repeat
+        )
+    md_files = rag_client._discover_files(corpus)[0]
+    stages["splitting"] = time_calls(
+        lambda: [rag_client.text_splitter.split(f) for f in md_files], args.repeat
+    )
+    started = time.perf_counter()
+    result = rag_client.reload_collection()
+    stages["indexing"] = summarize([time.perf_counter() - started])
+    stages["indexing"]["files"] = len(result.files)
+    stages["indexing"]["errors"] = len(result.errors)
+    stages["indexing"]["chunks"] = rag_client.indexer.collection.count()
+    stages["indexing"]["pipeline"] = [stage.model_dump() for stage in result.stages]
+    rule_ids = [rule_id(chapter, 0) for chapter in range(1, args.chapters + 1)]
+    stages["rule_lookup"] = time_calls(
+        lambda: rag_client.rule_index.lookup(rule_ids[:1]), args.repeat * 10
+    )
+    questions = iter_forever(QUESTIONS)
+    stages["semantic_query"] = time_calls(
+        lambda: rag_client.get_query_results(next(questions)), args.repeat
+    )
+    stages.update(time_numpy(rag_client, workdir / "vector_index", args))
+    stages["burst_query"] = time_burst(rag_client.retriever, args, batched=False)
+    stages["burst_query_batched"] = time_burst(rag_client.retriever, args, batched=True)
+    stages["burst_query_processes"] = time_workers(
+        str(workdir / "chroma_db"), args, args.workers or os.cpu_count() or 1
+    )
+    stages["chat"] = time_chat(rag_client, args.llm_latency, args.repeat)
+    return {
+        "metadata": {
+            "git_commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": vars(args) | {"output": str(args.output)},
+            "corpus": {
+                "md_files": len(md_files),
+                "pdf_files": len(pdf_files),
+                "bytes": sum(Path(f).stat().st_size for f in md_files),
+            },
+        },
+        "stages": stages,
+    }
+
+
+def iter_forever(items: list[str]) -> Any:
+    while True:
+        yield from items
+
+
+def time_numpy(
+    rag_client: Any, index_dir: Path, args: argparse.Namespace
+) -> dict[str, Any]:
+    """
+    NumPy vector backend on the same collection: export, open (memory-mapped)
+    and the same queries as semantic_query through a NumpyRetriever.
+    """
+    from chroma.numpy_retriever import NumpyRetriever, NumpyVectorIndex
+
+    collection = rag_client.indexer.collection
+    directory = index_dir / collection.name
+
+    def export() -> None:
+        NumpyVectorIndex.from_collection(collection, args.vector_dtype).save(directory)
+
+    retriever = NumpyRetriever(
+        collection,
+        index_dir,
+        rag_client.embedding_function,
+        args.vector_dtype,
+        rule_index=rag_client.rule_index,
+        lexical_index=rag_client.lexical_index,
+    )
+    stages = {
+        "numpy_export": time_calls(export, 1),
+        "numpy_open": time_calls(lambda: NumpyVectorIndex.open(directory), args.repeat),
+    }
+    retriever.warmup()
+    questions = iter_forever(QUESTIONS)
+    stages["semantic_query_numpy"] = time_calls(
+        lambda: retriever.get_query_results(next(questions), 50), args.repeat
+    )
+    stages["semantic_query_numpy"]["dtype"] = args.vector_dtype
+    return stages
+
+
+def time_burst(
+    retriever: Any, args: argparse.Namespace, batched: bool
+) -> dict[str, Any]:
+    """
+    Wall time for args.burst threads each sending one distinct query at once,
+    straight to the retriever or (batched) through a QueryBatcher.
+    """
+    from chroma.query_batcher import QueryBatcher
+
+    batcher = None
+    get_query_results = retriever.get_query_results
+    if batched:
+        batcher = QueryBatcher(retriever, args.batch_window, args.burst)
+        get_query_results = batcher.get_query_results
+    samples = []
+    for run in range(args.repeat):
+        messages = [
+            f"{QUESTIONS[i % len(QUESTIONS)]} ({run}.{i})" for i in range(args.burst)
+        ]
+        threads = [
+            threading.Thread(target=get_query_results, args=(message, 50))
+            for message in messages
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        samples.append(time.perf_counter() - started)
+    timings: dict[str, Any] = summarize(samples)
+    timings["queries_per_second"] = args.burst / timings["mean"]
+    if batcher is not None:
+        timings |= batcher.stats()
+        batcher.close()
+    return timings
+
+
+def init_query_worker(storage: str, fake_embeddings: bool) -> None:
+    """Pool initializer: open a read-only RagClient in the worker process."""
+    global _worker_client
+    with ExitStack() as stack:
+        if fake_embeddings:
+            stack.enter_context(
+                mock.patch(
+                    "chroma.chroma.DefaultEmbeddingFunction", HashEmbeddingFunction
+                )
+            )
+        from chroma.chroma import RagClient
+
+        _worker_client = RagClient(
+            name="benchmark",
+            persistent_storage=storage,
+            cache_size=0,
+            read_only=True,
+        )
+    _worker_client.warmup()
+
+
+def worker_query(message: str) -> int:
+    return len(_worker_client.get_query_results(message, 50))
+
+
+def time_workers(
+    storage: str, args: argparse.Namespace, workers: int
+) -> dict[str, Any]:
+    """
+    Wall time for args.burst distinct queries spread over workers processes,
+    each with its own read-only RagClient (as with WORKERS in chatbot.main).
+    Compare queries_per_second with burst_query (threads in one process).
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        workers, init_query_worker, (storage, args.fake_embeddings)
+    ) as pool:
+        # start-up and warm-up are not timed
+        pool.map(worker_query, QUESTIONS * workers, chunksize=1)
+        samples = []
+        for run in range(args.repeat):
+            messages = [
+                f"{QUESTIONS[i % len(QUESTIONS)]} (p{run}.{i})"
+                for i in range(args.burst)
+            ]
+            started = time.perf_counter()
+            pool.map(worker_query, messages, chunksize=1)
+            samples.append(time.perf_counter() - started)
+    timings: dict[str, Any] = summarize(samples)
+    timings["queries_per_second"] = args.burst / timings["mean"]
+    timings["workers"] = workers
+    return timings
+
+
+def time_chat(rag_client: Any, latency: float, repeat: int) -> dict[str, Any]:
+    """POST /chat through the FastAPI app with rag_client and a stub LLM."""
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    from fastapi.testclient import TestClient
+
+    import chatbot
+
+    stub = StubLlm(latency)
+    chatbot.rag_client = rag_client
+    chatbot.genai_client = stub  # type: ignore[assignment]
+    # no lifespan: clients are set above, nothing to warm up or watch
+    client = TestClient(chatbot.app)
+    questions = iter_forever(QUESTIONS)
+
+    def post() -> None:
+        response = client.post(
+            "/chat", json={"session_id": 1, "message": next(questions)}
+        )
+        response.raise_for_status()
+
+    timings = time_calls(post, repeat)
+    timings["llm_latency"] = latency
+    timings["llm_calls"] = stub.calls
+    return timings
+
+
+def compare(old_file: Path, new_file: Path) -> None:
+    """Print mean time per stage of two result files and the relative change."""
+    with open(old_file, "r", encoding="utf-8") as f:
+        old = json.load(f)["stages"]
+    with open(new_file, "r", encoding="utf-8") as f:
+        new = json.load(f)["stages"]
+    print(f"{'stage':<16}{'old mean':>12}{'new mean':>12}{'change':>10}")
+    for stage in new:
+        if stage not in old:
+            continue
+        before, after = old[stage]["mean"], new[stage]["mean"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{stage:<16}{before:>12.4f}{after:>12.4f}{change:>+9.1f}%")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs", type=int, default=20, help="markdown files")
+    parser.add_argument("--pdfs", type=int, default=2, help="PDF files")
+    parser.add_argument("--chapters", type=int, default=5, help="chapters per file")
+    parser.add_argument("--rules", type=int, default=8, help="rules per chapter")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per stage")
+    parser.add_argument(
+        "--burst", type=int, default=16, help="concurrent queries per burst"
+    )
+    parser.add_argument(
+        "--batch-window", type=float, default=0.002, help="QueryBatcher window (s)"
+    )
+    parser.add_argument(
+        "--vector-dtype",
+        default="float32",
+        choices=("float32", "float16", "int8"),
+        help="NumPy backend matrix type",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="query processes (0 = CPU count)"
+    )
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="stub LLM reply delay (s)"
+    )
+    parser.add_argument(
+        "--pdf-workers", type=int, default=0, help="0 = CPU count (default)"
+    )
+    parser.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help="hash embeddings instead of the ONNX model (times Chroma only)",
+    )
+    parser.add_argument(
+        "--workdir", type=Path, help="keep corpus and database here (default: temp)"
+    )
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument(
+        "--compare", nargs=2, type=Path, metavar=("OLD", "NEW"), help="compare results"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+    params = vars(args).copy()
+    del params["compare"], params["workdir"]
+    bench_args = argparse.Namespace(**params)
+    if args.workdir is not None:
+        results = run_benchmarks(bench_args, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run_benchmarks(bench_args, Path(workdir))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    for stage, timings in results["stages"].items():
+        print(f"{stage:<16} mean {timings['mean']:.4f}s  p95 {timings['p95']:.4f}s")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,20 +7,39 @@ FastAPI client for RAG chatbot
 - dotenv/ os: load environment variables from .env file
 - google-genai: Google GenAI API client
 - chroma: ChromaDB/ RAG client implementation
+
+google-genai and chroma are imported when the app starts (lifespan), not on import.
 """
 
 import asyncio
+import copy
+import json
 import logging
 import os
 import sys
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from google import genai
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
-from chroma import RagClient
+from chroma.config import create_rag_client
+from chroma.llm_dispatcher import LlmDispatcher, LlmUnavailable, retry_after_header
+from chroma.metrics import Metrics, timed
+
+if TYPE_CHECKING:
+    from google import genai
+    from google.genai import types
+
+    from chroma import FileWatcher, RagClient
+    from chroma.sessions import SessionStore
+    from chroma.watcher import UpdateFiles
 
 # Logging
 logger = logging.getLogger("chatbot")
@@ -45,6 +64,13 @@ SYSTEM_PROMPT = """You are a helpful assistant. Use the provided context from
 the source documents to answer questions accurately. If the context doesn't
 contain relevant information, you can use your general knowledge but mention
 that the information isn't from the source documents. Be concise and helpful."""
+GEMINI_MODEL = "gemini-2.5-flash"
+GENERATION_CONFIG: "types.GenerateContentConfigDict" = {
+    "system_instruction": SYSTEM_PROMPT,
+    "temperature": 0,  # how random the response is
+    "top_p": 0.95,  # probability of selecting the next token
+    "top_k": 20,  # number of tokens to consider for the next token
+}
 
 # Load environment variables
 load_dotenv()
@@ -53,19 +79,120 @@ load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
 if not api_key:
     raise ValueError("GEMINI_API_KEY is not set")
-# instantiate LLM client: Gemini
-genai_client = genai.Client(api_key=api_key)
-
-# instantiate RAG client: ChromaDB
-rag_client = RagClient(
-    name=os.getenv("COLLECTION_NAME", "my-collection"),
-    persistent_storage=os.getenv("PERSISTENT_STORAGE", "./chroma_db"),
-    collection_path=os.getenv("COLLECTION_PATH", "source_docs"),
-    hash_filename=os.getenv("HASH_FILE", "file_hashes.json"),
+
+# created in lifespan (create_clients), so importing this module stays cheap
+genai_client: "genai.Client"
+rag_client: "RagClient"
+watcher: "FileWatcher | None" = None
+sessions: "SessionStore | None" = None
+# hot-path histograms for /metrics and Server-Timing headers (METRICS=false disables)
+metrics: Metrics | None = (
+    Metrics() if os.getenv("METRICS", "true").lower() in ("1", "true", "yes") else None
+)
+
+
+def create_watcher(update_files: "UpdateFiles") -> "FileWatcher | None":
+    """FileWatcher on COLLECTION_PATH calling update_files, if WATCH_COLLECTION is set."""
+    from chroma import FileWatcher
+
+    if os.getenv("WATCH_COLLECTION", "false").lower() not in ("1", "true", "yes"):
+        return None
+    return FileWatcher(
+        os.getenv("COLLECTION_PATH", "source_docs"),
+        update_files,
+        backend=os.getenv("WATCH_BACKEND", "auto"),
+        debounce=float(os.getenv("WATCH_DEBOUNCE", "1.0")),
+        poll_interval=float(os.getenv("WATCH_POLL_INTERVAL", "2.0")),
+    )
+
+
+def create_clients() -> None:
+    """
+    Import and construct the LLM client, RAG client, session memory and
+    optional file watcher. With READ_ONLY (query workers, see serve_workers)
+    the RAG client only reads and the writer process does the watching.
+    """
+    global genai_client, rag_client, sessions, watcher
+    from google import genai
+
+    from chroma.sessions import (
+        FileSessionBackend,
+        InMemorySessionBackend,
+        SessionBackend,
+        SessionStore,
+    )
+
+    # instantiate LLM client: Gemini (GEMINI_BASE_URL: e.g. benchmarks.fake_gemini)
+    base_url = os.getenv("GEMINI_BASE_URL")
+    genai_client = genai.Client(
+        api_key=api_key, http_options={"base_url": base_url} if base_url else None
+    )
+    # instantiate RAG client: ChromaDB
+    read_only = os.getenv("READ_ONLY", "false").lower() in ("1", "true", "yes")
+    rag_client = create_rag_client(read_only, metrics)
+    # conversation memory per session_id (SESSION_MAX_SESSIONS=0 disables);
+    # SESSION_DIR shares sessions between server processes on one host
+    max_sessions = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+    if max_sessions > 0:
+        session_ttl = float(os.getenv("SESSION_TTL", "3600"))
+        session_dir = os.getenv("SESSION_DIR")
+        backend: SessionBackend = (
+            FileSessionBackend(session_dir, max_sessions, session_ttl)
+            if session_dir
+            else InMemorySessionBackend(max_sessions, session_ttl)
+        )
+        sessions = SessionStore(backend, int(os.getenv("SESSION_MAX_TOKENS", "1000")))
+    # optional: re-index files changed under COLLECTION_PATH while serving
+    if not read_only:
+        watcher = create_watcher(rag_client.update_files)
+
+
+# Gemini calls in flight are capped; overload is shed with 503 + Retry-After,
+# and rate limits (429) are retried with backoff before giving up
+llm = LlmDispatcher(
+    max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "64")),
+    timeout=float(os.getenv("LLM_TIMEOUT", "30")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+    metrics=metrics,
+)
+# cap on /chat requests doing retrieval + LLM work at the same time (default: as
+# many as the dispatcher admits, in flight plus queued); beyond it a request is
+# shed with 503 at once, as the LLM queue could not take it anyway
+chat_semaphore = asyncio.Semaphore(
+    int(os.getenv("MAX_CONCURRENT_CHATS", "0")) or llm.max_in_flight + llm.max_queue
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Create clients and warm up (embedding model, vector index) before serving,
+    so the first query doesn't pay for it. Start the file watcher if enabled;
+    stop it and persist cached answers on shutdown.
+    """
+    started = time.perf_counter()
+    await asyncio.to_thread(create_clients)
+    created = time.perf_counter()
+    if os.getenv("WARMUP", "true").lower() in ("1", "true", "yes"):
+        await asyncio.to_thread(rag_client.warmup)
+    logger.info(
+        f"Startup: clients {created - started:.2f}s, "
+        f"warmup {time.perf_counter() - created:.2f}s"
+    )
+    if watcher is not None:
+        watcher.start()
+    yield
+    if watcher is not None:
+        watcher.stop()
+    if rag_client.query_batcher is not None:
+        rag_client.query_batcher.close()
+    if rag_client.answer_cache is not None:
+        rag_client.answer_cache.save()
+
+
 # instantiate FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/")
@@ -74,32 +201,220 @@ def root() -> dict[str, str]:
     return {"message": "Hello World"}
 
 
+@app.get("/watcher/status")
+def watcher_status() -> dict:
+    """File watcher queue depth and last index time (see WatcherStatus)."""
+    if watcher is None:
+        raise HTTPException(status_code=404, detail="File watcher is disabled")
+    return watcher.status().model_dump()
+
+
+@app.get("/metrics")
+def prometheus_metrics() -> PlainTextResponse:
+    """Hot-path histograms in the Prometheus text format."""
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest) -> ChatResponse:
-    """Retrieve RAG context and generate reply."""
-    reply = generate_response(req.message, rag_client.get_context(req.message))
+async def chat(req: ChatRequest, response: Response) -> ChatResponse:
+    """
+    Retrieve RAG context and generate reply, with the session's earlier turns.
+    Timings go in a Server-Timing header.
+    """
+    # retrieval counts against the LLM_TIMEOUT deadline too
+    deadline = time.monotonic() + llm.timeout
+    request_timings = nullcontext(None) if metrics is None else metrics.request()
+    with request_timings as timings:
+        try:
+            admit_chat(deadline)
+        except LlmUnavailable as e:
+            raise HTTPException(
+                status_code=e.status_code, detail=str(e), headers=retry_after_header(e)
+            )
+        async with chat_semaphore:
+            query, history = await asyncio.to_thread(
+                recall, req.session_id, req.message
+            )
+            # Chroma queries are blocking: run them off the event loop
+            context = await asyncio.to_thread(rag_client.get_context, query)
+            results = context["results"]
+            # a reply shaped by this session's history is not for other sessions
+            reply = None
+            if not history:
+                reply = await asyncio.to_thread(
+                    rag_client.get_cached_answer, query, results
+                )
+            if reply is None:
+                reply = await generate_response(
+                    req.message, context["context"], history, deadline
+                )
+                if not history:
+                    await asyncio.to_thread(
+                        rag_client.cache_answer, query, results, reply
+                    )
+            await asyncio.to_thread(remember, req.session_id, req.message, reply)
+    if timings:
+        response.headers["Server-Timing"] = Metrics.server_timing(timings)
     return ChatResponse(reply=reply)
 
 
-def generate_response(message: str, context: str) -> str:
-    """Build prompt and call LLM client. Returns reply text or raise HTTPException."""
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    """
+    Stream reply as Server-Sent Events.
+    Events: sources (retrieved source list), token (text chunks), then done or error.
+    """
+    return StreamingResponse(
+        stream_response(req.session_id, req.message), media_type="text/event-stream"
+    )
+
+
+async def stream_response(session_id: int, message: str) -> AsyncIterator[str]:
+    """Retrieve context, send sources, then stream LLM text as it arrives."""
+    deadline = time.monotonic() + llm.timeout
+    try:
+        admit_chat(deadline)
+    except LlmUnavailable as e:
+        yield llm_error_event(e)
+        return
+    async with chat_semaphore:
+        query, history = await asyncio.to_thread(recall, session_id, message)
+        context = await asyncio.to_thread(rag_client.get_context, query)
+        results = context["results"]
+        sources = rag_client.retriever.get_sources(results)
+        yield sse_event("sources", {"sources": sources})
+        cached = None
+        if not history:  # see chat
+            cached = await asyncio.to_thread(
+                rag_client.get_cached_answer, query, results
+            )
+        if cached is not None:
+            await asyncio.to_thread(remember, session_id, message, cached)
+            yield sse_event("token", {"text": cached})
+            yield sse_event("done", {})
+            return
+        prompt = build_prompt(message, context["context"], history)
+        if metrics is not None:
+            metrics.observe("prompt", len(prompt))
+        reply_parts = []
+        try:
+            with timed(metrics, "llm_generate"):
+                # the slot is held for the whole stream; only opening it is retried
+                async with llm.slot(deadline):
+                    stream = await llm.retry(
+                        lambda: genai_client.aio.models.generate_content_stream(
+                            model=GEMINI_MODEL,
+                            contents={"text": prompt},
+                            config=GENERATION_CONFIG,
+                        ),
+                        deadline,
+                    )
+                    async for chunk in stream:
+                        if chunk.text:
+                            reply_parts.append(chunk.text)
+                            yield sse_event("token", {"text": chunk.text})
+        except LlmUnavailable as e:
+            logger.warning(f"LLM unavailable: {e}")
+            yield llm_error_event(e)
+            return
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            yield sse_event("error", {"detail": "Internal server error"})
+            return
+        if reply_parts:
+            reply = "".join(reply_parts)
+            if not history:
+                await asyncio.to_thread(rag_client.cache_answer, query, results, reply)
+            await asyncio.to_thread(remember, session_id, message, reply)
+    yield sse_event("done", {})
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def llm_error_event(error: LlmUnavailable) -> str:
+    """error event for a shed, rate limited or timed out request."""
+    return sse_event(
+        "error",
+        {
+            "detail": str(error),
+            "status": error.status_code,
+            "retry_after": error.retry_after,
+        },
+    )
+
+
+def admit_chat(deadline: float) -> None:
+    """
+    Raise LlmUnavailable(503) if every /chat slot is taken or deadline has
+    passed, instead of letting the request wait with no bound.
+    """
+    if chat_semaphore.locked():
+        raise llm.reject("Too many concurrent chats")
+    if time.monotonic() >= deadline:
+        raise llm.reject("Chat deadline exceeded before retrieval")
+
+
+def recall(session_id: int, message: str) -> tuple[str, str]:
+    """
+    Return (retrieval query, conversation history) for message in session_id.
+    Follow-ups are condensed with the previous question; no history without sessions.
+    """
+    if sessions is None:
+        return message, ""
+    state = sessions.get(session_id)
+    return sessions.condense_query(state, message), sessions.format_history(state)
+
+
+def remember(session_id: int, message: str, reply: str) -> None:
+    """Add the turn to session memory (no-op if disabled)."""
+    if sessions is not None:
+        sessions.add_turn(session_id, message, reply)
+
+
+def build_prompt(message: str, context: str, history: str = "") -> str:
+    """Combine conversation history, retrieved context and message into the LLM prompt."""
+    prompt = message
     if context:
         prompt = f"""Please answer the question based on the context below when relevant:
 Context from source documents: {context}
 Question: {message}
 Answer: """
-    else:
-        prompt = message
+    if history:
+        prompt = f"Conversation so far:\n{history}\n\n{prompt}"
+    return prompt
+
+
+async def generate_response(
+    message: str, context: str, history: str = "", deadline: float | None = None
+) -> str:
+    """
+    Build prompt and call LLM client through the dispatcher, within deadline
+    (a time.monotonic() value, default LLM_TIMEOUT from now). Returns reply text
+    or raises HTTPException: 429/503/504 with Retry-After when the LLM is
+    overloaded or rate limited, 500 otherwise.
+    """
+    prompt = build_prompt(message, context, history)
+    if metrics is not None:
+        metrics.observe("prompt", len(prompt))
     try:
-        response = genai_client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents={"text": prompt},
-            config={
-                "system_instruction": SYSTEM_PROMPT,
-                "temperature": 0,  # how random the response is
-                "top_p": 0.95,  # probability of selecting the next token
-                "top_k": 20,  # number of tokens to consider for the next token
-            },
+        with timed(metrics, "llm_generate"):
+            response = await llm.call(
+                lambda: genai_client.aio.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents={"text": prompt},
+                    config=GENERATION_CONFIG,
+                ),
+                deadline,
+            )
+    except LlmUnavailable as e:
+        logger.warning(f"LLM unavailable: {e}")
+        raise HTTPException(
+            status_code=e.status_code, detail=str(e), headers=retry_after_header(e)
         )
     except Exception as e:
         logger.error(f"Error generating response: {e}")
@@ -112,28 +427,79 @@ Answer: """
     return text
 
 
-async def main() -> None:
-    """Configure logging, and run Uvicorn."""
+LOG_FORMAT = "%(levelname)s:     %(name)s: %(message)s: %(asctime)s"
+
+
+def main() -> None:
+    """Configure logging, and run Uvicorn (WORKERS > 1: see serve_workers)."""
     # Configure logging to file or stdout
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(levelname)s:     %(name)s: %(message)s: %(asctime)s",
-    )
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
     log_file = os.getenv("LOG_FILE")
     if log_file:
         logging.basicConfig(filename=log_file)
     else:
         logging.basicConfig(stream=sys.stdout)
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        serve_workers(workers)
+        return
     # Run Uvicorn programmatically
     config = uvicorn.Config(
         "chatbot:app", port=8000
     )  # use reload=True if not production
     server = uvicorn.Server(config)
-    await server.serve()
+    asyncio.run(server.serve())
+
+
+def serve_workers(workers: int) -> None:
+    """
+    Run workers query processes on port 8000, each with its own read-only
+    RagClient (READ_ONLY), so retrieval uses that many cores. This process is
+    the only writer: it creates the collection if missing and, with
+    WATCH_COLLECTION, publishes changed files as new collection versions,
+    which workers switch to on their next query without restarting.
+    """
+    rag_client = create_rag_client(metrics=metrics)
+    writer = create_watcher(rag_client.publish_files)
+    if writer is not None:
+        writer.start()
+    # spawned workers inherit the environment
+    os.environ["READ_ONLY"] = "true"
+    if not os.getenv("SESSION_DIR"):
+        # a conversation's requests may land on any worker
+        session_dir = Path(rag_client.persistent_storage) / "sessions"
+        os.environ["SESSION_DIR"] = str(session_dir)
+        logger.info(f"Sharing sessions between workers in {session_dir}")
+    logger.info(f"Starting {workers} query workers")
+    try:
+        uvicorn.run(
+            "chatbot:app", port=8000, workers=workers, log_config=logging_config()
+        )
+    finally:
+        if writer is not None:
+            writer.stop()
+
+
+def logging_config() -> dict:
+    """Uvicorn's logging config plus main()'s root logger, for worker processes."""
+    config = copy.deepcopy(uvicorn.config.LOGGING_CONFIG)
+    config["formatters"]["app"] = {"format": LOG_FORMAT}
+    log_file = os.getenv("LOG_FILE")
+    config["handlers"]["app"] = (
+        {"class": "logging.FileHandler", "filename": log_file, "formatter": "app"}
+        if log_file
+        else {
+            "class": "logging.StreamHandler",
+            "stream": "ext://sys.stdout",
+            "formatter": "app",
+        }
+    )
+    config["root"] = {"handlers": ["app"], "level": "INFO"}
+    return config
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        main()
     except KeyboardInterrupt:
         pass
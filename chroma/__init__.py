@@ -1,8 +1,36 @@
 """ChromaDB RAG package: indexing, retrieval, and file-hash tracking.
 
-Public API: use RagClient to get_context, reload_collection, and list_files.
+Public API: use RagClient to get_context, reload_collection, and list_files;
+FileWatcher re-indexes changed files in the background.
+Names are imported on first access, so `import chroma` stays cheap.
 """
 
-from chroma.chroma import RagClient
+import importlib
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["RagClient"]
+if TYPE_CHECKING:
+    from chroma.chroma import RagClient
+    from chroma.models import ContextResult, RetrievalResult, WatcherStatus
+    from chroma.watcher import FileWatcher
+
+_EXPORTS = {
+    "ContextResult": "chroma.models",
+    "FileWatcher": "chroma.watcher",
+    "RagClient": "chroma.chroma",
+    "RetrievalResult": "chroma.models",
+    "WatcherStatus": "chroma.models",
+}
+
+__all__ = [
+    "ContextResult",
+    "FileWatcher",
+    "RagClient",
+    "RetrievalResult",
+    "WatcherStatus",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'chroma' has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
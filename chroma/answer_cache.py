@@ -0,0 +1,240 @@
+"""Semantic answer cache: reuse LLM replies for similar questions on the same chunks."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TypedDict
+
+import numpy as np
+from chromadb import Documents, EmbeddingFunction, Metadata
+
+logger = logging.getLogger("AnswerCache")
+
+
+class CachedAnswer(TypedDict):
+    question: str
+    chunk_ids: list[str]
+    embedding: list[float]
+    reply: str
+
+
+class AnswerCache:
+    """
+    Maps (question embedding, retrieved chunk ids) to a stored reply.
+    A lookup hits when the retrieved chunk ids match exactly and the question
+    embedding is within max_distance (cosine) of a stored question.
+    LRU-bounded to max_size entries and persisted to a JSON file.
+    Registered as a collection listener: entries citing a changed chunk are dropped.
+    """
+
+    DEFAULT_MAX_SIZE = 500
+    DEFAULT_MAX_DISTANCE = 0.05
+    SAVE_INTERVAL = 30.0  # seconds between saves triggered by store()
+    RECENT_EMBEDDINGS = 64  # question embeddings kept for store() after a lookup
+
+    def __init__(
+        self,
+        cache_file: Path | str,
+        embedding_function: EmbeddingFunction[Documents],
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_distance: float = DEFAULT_MAX_DISTANCE,
+    ) -> None:
+        if not isinstance(cache_file, Path):
+            cache_file = Path(cache_file)
+        self.cache_file = cache_file
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.embedding_function = embedding_function
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+        self._dirty = False
+        # entry key -> entry, in LRU order
+        self._entries: OrderedDict[str, CachedAnswer] = OrderedDict()
+        # chunk-set key -> entry keys answered from that exact chunk set
+        self._by_chunks: dict[str, set[str]] = {}
+        # chunk id -> entry keys citing it, for invalidation
+        self._by_chunk_id: dict[str, set[str]] = {}
+        # question -> embedding computed by lookup, so store() doesn't embed again
+        self._recent: OrderedDict[str, np.ndarray] = OrderedDict()
+        for entry in self.load():
+            if self._is_entry(entry):
+                self._insert(entry)
+            else:
+                logger.warning(f"Skipping malformed answer cache entry: {entry!r:.200}")
+
+    def lookup(self, question: str, chunk_ids: list[str]) -> str | None:
+        """Return stored reply for a similar question on the same chunks, else None."""
+        chunks_key = self._chunks_key(chunk_ids)
+        with self._lock:
+            candidates = [self._entries[k] for k in self._by_chunks.get(chunks_key, ())]
+        if not candidates:
+            with self._lock:
+                self.misses += 1
+            return None
+        embedding = self._embed(question)
+        with self._lock:
+            self._recent[question] = embedding
+            while len(self._recent) > self.RECENT_EMBEDDINGS:
+                self._recent.popitem(last=False)
+        best_key, best_distance = None, self.max_distance
+        for entry in candidates:
+            distance = self._cosine_distance(embedding, np.asarray(entry["embedding"]))
+            if distance <= best_distance:
+                best_key = self._entry_key(entry["question"], chunks_key)
+                best_distance = distance
+        with self._lock:
+            if best_key is None or best_key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key]["reply"]
+
+    def store(self, question: str, chunk_ids: list[str], reply: str) -> None:
+        """Remember reply for question answered from chunk_ids."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            recent = self._recent.pop(question, None)
+        embedding = (recent if recent is not None else self._embed(question)).tolist()
+        entry: CachedAnswer = {
+            "question": question,
+            "chunk_ids": list(chunk_ids),
+            "embedding": embedding,
+            "reply": reply,
+        }
+        with self._lock:
+            self._insert(entry)
+            self._dirty = True
+            save_due = time.monotonic() - self._last_save >= self.SAVE_INTERVAL
+        if save_due:
+            self.save()
+
+    def load(self) -> list[CachedAnswer]:
+        if not self.cache_file.exists():
+            return []
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception as e:
+            logger.warning(f"Error loading answer cache: {e}")
+            return []
+        if not isinstance(entries, list):
+            logger.warning("Error loading answer cache: not a list of entries")
+            return []
+        return entries
+
+    def save(self) -> None:
+        """
+        Write entries to cache_file (oldest first) if anything changed. The write
+        is atomic, so server processes sharing the file never see a partial one.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = list(self._entries.values())
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_file.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.cache_file)
+        except Exception as e:
+            logger.error(f"Error saving answer cache: {e}")
+
+    def stats(self) -> dict[str, int]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    # collection listener hooks (see ChromaIndexer)
+    def on_upsert(
+        self, ids: list[str], documents: list[str], metadatas: list[Metadata]
+    ) -> None:
+        self._invalidate(ids)
+
+    def on_delete(self, ids: list[str]) -> None:
+        self._invalidate(ids)
+
+    def _invalidate(self, chunk_ids: list[str]) -> None:
+        """Drop every entry that cites one of chunk_ids."""
+        with self._lock:
+            keys = set()
+            for chunk_id in chunk_ids:
+                keys.update(self._by_chunk_id.get(chunk_id, ()))
+            for key in keys:
+                self._remove(key)
+            if keys:
+                self._dirty = True
+        if keys:
+            self.save()
+
+    def _insert(self, entry: CachedAnswer) -> None:
+        """Add entry and evict least recently used entries over max_size."""
+        chunks_key = self._chunks_key(entry["chunk_ids"])
+        key = self._entry_key(entry["question"], chunks_key)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._by_chunks.setdefault(chunks_key, set()).add(key)
+        for chunk_id in entry["chunk_ids"]:
+            self._by_chunk_id.setdefault(chunk_id, set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        """Remove entry and its index references."""
+        entry = self._entries.pop(key)
+        chunks_key = self._chunks_key(entry["chunk_ids"])
+        self._by_chunks[chunks_key].discard(key)
+        if not self._by_chunks[chunks_key]:
+            del self._by_chunks[chunks_key]
+        for chunk_id in entry["chunk_ids"]:
+            keys = self._by_chunk_id.get(chunk_id)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._by_chunk_id[chunk_id]
+
+    def _embed(self, question: str) -> np.ndarray:
+        return np.asarray(self.embedding_function([question])[0], dtype=np.float32)
+
+    @staticmethod
+    def _is_entry(entry: object) -> bool:
+        """Whether a loaded value has every CachedAnswer field."""
+        return (
+            isinstance(entry, dict) and CachedAnswer.__required_keys__ <= entry.keys()
+        )
+
+    @staticmethod
+    def _cosine_distance(a: np.ndarray, b: np.ndarray) -> float:
+        norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+        if norm == 0:
+            return 1.0
+        return 1.0 - float(np.dot(a, b)) / norm
+
+    @staticmethod
+    def _chunks_key(chunk_ids: list[str]) -> str:
+        """Order-independent key for a set of chunk ids."""
+        data = "\n".join(sorted(chunk_ids))
+        return hashlib.md5(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _entry_key(question: str, chunks_key: str) -> str:
+        data = f"{chunks_key}:{question}"
+        return hashlib.md5(data.encode("utf-8")).hexdigest()
@@ -0,0 +1,91 @@
+"""In-process LRU/TTL cache for retrieval results, cleared when the collection changes."""
+
+import threading
+import time
+from collections import OrderedDict
+
+from chromadb import Metadata
+
+from chroma.models import RetrievalResult
+
+CacheKey = tuple[str, int]
+
+
+class RetrievalCache:
+    """
+    LRU cache with TTL mapping (normalized message, n_results) to retrieval results.
+    Registered as a collection listener on ChromaIndexer, so any write clears it.
+    """
+
+    DEFAULT_MAX_SIZE = 256
+    DEFAULT_TTL = 300.0  # seconds
+
+    def __init__(
+        self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # bumped on clear; results computed under an older generation are dropped
+        self.generation = 0
+        self._entries: OrderedDict[CacheKey, tuple[float, list[RetrievalResult]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(message: str, n_results: int) -> CacheKey:
+        """Normalize message (case, whitespace) and pair it with n_results."""
+        return " ".join(message.lower().split()), n_results
+
+    def get(self, key: CacheKey) -> list[RetrievalResult] | None:
+        """Return cached results for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def set(
+        self, key: CacheKey, results: list[RetrievalResult], generation: int
+    ) -> None:
+        """Store results unless the cache was cleared since generation was read."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self) -> dict[str, int]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    # collection listener hooks (see ChromaIndexer)
+    def on_upsert(
+        self, ids: list[str], documents: list[str], metadatas: list[Metadata]
+    ) -> None:
+        self.clear()
+
+    def on_delete(self, ids: list[str]) -> None:
+        self.clear()
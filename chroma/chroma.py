@@ -4,19 +4,33 @@ Discovers PDF/MD under collection_path, converts PDFs to MD, delegates
 chunking/indexing to ChromaIndexer and retrieval to ChromaRetriever.
 """
 
+import copy
 import logging
+import shutil
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import chromadb
-import pymupdf4llm
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
 
+from chroma.answer_cache import AnswerCache
+from chroma.cache import RetrievalCache
+from chroma.embedder import BatchEmbedder
+from chroma.embedding_cache import EmbeddingCache
 from chroma.hash_manager import FileHashManager
 from chroma.indexer import ChromaIndexer
-from chroma.models import CollectionResult
+from chroma.lexical_index import Bm25Index
+from chroma.metrics import Metrics, timed
+from chroma.models import CollectionResult, ContextResult, RetrievalResult
+from chroma.numpy_retriever import NumpyRetriever
+from chroma.page_cache import PageCache
+from chroma.pdf_converter import PdfConverter
+from chroma.pipeline import IngestionPipeline
+from chroma.query_batcher import QueryBatcher
 from chroma.retriever import ChromaRetriever
+from chroma.rule_index import RuleIndex
 from chroma.text_splitter import TextSplitter
+from chroma.versions import CollectionVersions
 
 logger = logging.getLogger("RagClient")
 
@@ -32,47 +46,470 @@ class RagClient:
         persistent_storage: str = "chroma_db",
         collection_path: str = "source_docs",
         hash_filename: str = "file_hashes.json",
+        batch_size: int = ChromaIndexer.DEFAULT_BATCH_SIZE,
+        cache_size: int = RetrievalCache.DEFAULT_MAX_SIZE,
+        cache_ttl: float = RetrievalCache.DEFAULT_TTL,
+        answer_cache_size: int = 0,
+        answer_cache_distance: float = AnswerCache.DEFAULT_MAX_DISTANCE,
+        answer_cache_filename: str = "answer_cache.json",
+        context_budget: int = ChromaRetriever.DEFAULT_CONTEXT_BUDGET,
+        mmr_lambda: float = ChromaRetriever.DEFAULT_MMR_LAMBDA,
+        pdf_workers: int | None = None,
+        pdf_pages_per_batch: int = PdfConverter.DEFAULT_PAGES_PER_BATCH,
+        pdf_cache_dir: str | None = None,
+        pdf_cache_max_pages: int = PageCache.DEFAULT_MAX_PAGES,
+        pipeline_queue_size: int = IngestionPipeline.DEFAULT_QUEUE_SIZE,
+        embed_batch_size: int = BatchEmbedder.DEFAULT_BATCH_SIZE,
+        embed_workers: int = BatchEmbedder.DEFAULT_MAX_WORKERS,
+        embedding_cache_dir: str | None = None,
+        keep_versions: int = 1,
+        lexical_search: bool = True,
+        metrics: Metrics | None = None,
+        query_batch_size: int = 0,
+        query_batch_window: float = QueryBatcher.DEFAULT_WINDOW,
+        read_only: bool = False,
+        vector_backend: str = "chroma",
+        vector_dtype: str = "float32",
     ) -> None:
         """
         Create ChromaDB client, collection, indexer, and retriever.
-        Hash file is stored under persistent_storage.
+        Hash file and answer cache file are stored under persistent_storage.
+        Retrieval cache is disabled when cache_size is 0,
+        answer cache is disabled when answer_cache_size is 0,
+        context size is unlimited when context_budget (characters) is 0.
+        PDF conversion uses pdf_workers processes (default: CPU count);
+        converted pages are cached under pdf_cache_dir when set, so an edited
+        PDF only reconverts the pages that changed.
+        pipeline_queue_size bounds the hand-off queues between reload stages.
+        Chunks are embedded in batches of embed_batch_size on embed_workers
+        threads; vectors are cached under embedding_cache_dir when set.
+        rebuild_collection keeps keep_versions previous versions for rollback.
+        lexical_search fuses BM25 keyword hits with semantic results.
+        metrics (if given) records hot-path timings of retrieval and indexing.
+        With query_batch_size of 2 or more, concurrent queries arriving within
+        query_batch_window seconds are retrieved together (see QueryBatcher).
+        read_only makes a query worker for a database another process indexes:
+        the live version must exist, nothing is written, indexing methods raise
+        RuntimeError, and versions the writer publishes are picked up on query.
+        vector_backend "numpy" serves semantic search from a memory-mapped
+        export of the collection (NumpyRetriever, vector_dtype float32, float16
+        or int8) instead of Chroma's HNSW index.
         """
-        client = chromadb.PersistentClient(path=persistent_storage)
-        collection = client.get_or_create_collection(name)
-        lock = threading.Lock()
+        # same model Chroma uses by default, kept to embed questions for AnswerCache
+        self.embedding_function = DefaultEmbeddingFunction()
+        self.client = chromadb.PersistentClient(path=persistent_storage)
+        self.persistent_storage = persistent_storage
+        self.hash_filename = hash_filename
+        self.keep_versions = keep_versions
+        self.read_only = read_only
+        # which collection version is live (see rebuild_collection)
+        self.versions = CollectionVersions(
+            Path(persistent_storage) / "collection_versions.json", name
+        )
         # instantiate text splitter
-        text_splitter = TextSplitter()
-        # create hash file path and instantiate hash manager
-        hash_file_path = Path(persistent_storage) / Path(hash_filename)
-        hash_manager = FileHashManager(hash_file_path)
+        self.text_splitter = TextSplitter()
+        # cache per model, so switching models never mixes vectors
+        embedding_cache = (
+            EmbeddingCache(Path(embedding_cache_dir) / self.embedding_function.name())
+            if embedding_cache_dir
+            else None
+        )
+        self.embedder = BatchEmbedder(
+            self.embedding_function,  # type: ignore[arg-type]
+            embedding_cache,
+            embed_batch_size,
+            embed_workers,
+        )
+        self.batch_size = batch_size
+        self.metrics = metrics
         # instantiate indexer and retriever
-        self.indexer = ChromaIndexer(collection, lock, text_splitter, hash_manager)
-        self.retriever = ChromaRetriever(collection)
+        self.indexer = self._open_version(self.versions.active)
+        collection = self.indexer.collection
+        cache = RetrievalCache(cache_size, cache_ttl) if cache_size > 0 else None
+        # rule_id -> chunks map, kept in sync with indexer writes
+        self.rule_index = RuleIndex()
+        self.rule_index.load(collection)
+        self.indexer.add_listener(self.rule_index)
+        # BM25 index persisted next to the hash file, kept in sync the same way
+        self.lexical_index = None
+        if lexical_search:
+            self.lexical_index = Bm25Index(
+                self._lexical_file(self.versions.active), read_only
+            )
+            self.lexical_index.load(collection)
+            self.indexer.add_listener(self.lexical_index)
+        self.retriever: ChromaRetriever
+        if vector_backend == "numpy":
+            self.retriever = NumpyRetriever(
+                collection,
+                self._vector_index_dir(),
+                self.embedding_function,  # type: ignore[arg-type]
+                vector_dtype,
+                cache,
+                self.rule_index,
+                context_budget,
+                mmr_lambda,
+                self.lexical_index,
+                metrics,
+                read_only,
+            )
+            # reload the export after the indexer writes
+            self.indexer.add_listener(self.retriever)
+        elif vector_backend == "chroma":
+            self.retriever = ChromaRetriever(
+                collection,
+                cache,
+                self.rule_index,
+                context_budget,
+                mmr_lambda,
+                self.lexical_index,
+                metrics,
+            )
+        else:
+            raise ValueError(f"Unknown vector backend: {vector_backend}")
+        if cache is not None:
+            # clear cached results whenever the indexer writes to the collection
+            self.indexer.add_listener(cache)
+        self.answer_cache = None
+        if answer_cache_size > 0:
+            self.answer_cache = AnswerCache(
+                Path(persistent_storage) / Path(answer_cache_filename),
+                self.embedding_function,  # type: ignore[arg-type]
+                answer_cache_size,
+                answer_cache_distance,
+            )
+            # drop answers citing chunks the indexer adds, updates or deletes
+            self.indexer.add_listener(self.answer_cache)
+        self.query_batcher = None
+        if query_batch_size > 1:
+            self.query_batcher = QueryBatcher(
+                self.retriever, query_batch_window, query_batch_size, metrics
+            )
+        self.page_cache = (
+            PageCache(pdf_cache_dir, pdf_cache_max_pages)
+            if pdf_cache_dir and not read_only
+            else None
+        )
+        self.pdf_converter = PdfConverter(
+            pdf_workers, pdf_pages_per_batch, self.page_cache
+        )
+        self.pipeline_queue_size = pipeline_queue_size
         # store collection path
         self.collection_path = collection_path
+        self._refresh_lock = threading.Lock()
 
-    def get_context(self, message: str, n_results: int = 50) -> str:
-        """Return formatted context string from top n_results chunks for message."""
-        results = self.retriever.get_query_results(message, n_results)
-        return self.retriever.get_context(results)
+    def warmup(self) -> None:
+        """
+        Load the embedding model and the collection's vector index now, so the
+        first query doesn't pay for it.
+        """
+        self.embedding_function(["warmup"])
+        self.retriever.warmup()
+
+    def get_context(self, message: str, n_results: int = 50) -> ContextResult:
+        """Return context packed from top n_results chunks for message, with usage."""
+        self.refresh_version()
+        with timed(self.metrics, "get_context"):
+            results = self.get_query_results(message, n_results)
+            context = self.retriever.get_context(results)
+        if self.metrics is not None:
+            self.metrics.observe("context_chunks", len(context["results"]))
+        logger.debug(
+            f"Context: {len(context['results'])}/{len(results)} chunks, "
+            f"{context['chars_used']}/{context['char_budget']} chars"
+        )
+        return context
+
+    def get_query_results(
+        self, message: str, n_results: int = 50
+    ) -> list[RetrievalResult]:
+        """Return top n_results chunks for message (rule-id match first)."""
+        if self.query_batcher is not None:
+            return self.query_batcher.get_query_results(message, n_results)
+        return self.retriever.get_query_results(message, n_results)
+
+    def get_cached_answer(
+        self, message: str, results: list[RetrievalResult]
+    ) -> str | None:
+        """Return a stored reply for a similar message on the same chunks, if any."""
+        if self.answer_cache is None:
+            return None
+        return self.answer_cache.lookup(message, [r["id"] for r in results])
+
+    def cache_answer(
+        self, message: str, results: list[RetrievalResult], reply: str
+    ) -> None:
+        """Store reply generated for message from results (no-op if disabled)."""
+        if self.answer_cache is None:
+            return
+        self.answer_cache.store(message, [r["id"] for r in results], reply)
 
     def reload_collection(self) -> CollectionResult:
         """
         Discover files under collection_path, index changed ones.
-        Returns CollectionResult.
+        Conversion, splitting, embedding and writes overlap in IngestionPipeline.
+        Returns CollectionResult with per-stage stats.
+        """
+        self._check_writable()
+        if self.retriever.cache is not None:
+            self.retriever.cache.clear()
+        pipeline = IngestionPipeline(
+            self.indexer,
+            self.pdf_converter,
+            self.pipeline_queue_size,
+        )
+        result = pipeline.run(lambda: self._discover_files(self.collection_path))
+        if self.lexical_index is not None:
+            self.lexical_index.save()
+        return result
+
+    def rebuild_collection(self) -> CollectionResult:
+        """
+        Blue-green rebuild: index everything into a new collection version while
+        readers stay on the live one, validate it, then swap readers over.
+        The new version is dropped if it fails validation. Older versions beyond
+        keep_versions are deleted.
+        """
+        self._check_writable()
+        version = self.versions.next_version()
+        indexer = self._open_version(version)
+        # build the new version's BM25 file while indexing; loaded on swap
+        lexical_index = None
+        if self.lexical_index is not None:
+            lexical_index = Bm25Index(self._lexical_file(version))
+            indexer.add_listener(lexical_index)
+        pipeline = IngestionPipeline(
+            indexer, self.pdf_converter, self.pipeline_queue_size
+        )
+        result = pipeline.run(lambda: self._discover_files(self.collection_path))
+        if lexical_index is not None:
+            lexical_index.save()
+        return self._go_live(version, indexer, result, "Rebuild")
+
+    def publish_files(self, changed: list[str], deleted: list[str]) -> CollectionResult:
         """
-        result = self.list_files(self.collection_path)
-        if not result.files:
-            result.errors.append("No files to index")
+        update_files for a database served by read-only query workers in other
+        processes. Chroma keeps each process's vector index in memory, so they
+        don't see writes to the live collection; instead the live version is
+        copied (stored embeddings included), the changes are applied to the
+        copy, and the copy goes live as a new version (see rebuild_collection).
+        """
+        self._check_writable()
+        version = self.versions.next_version()
+        indexer = self._open_version(version)
+        indexer.copy_from(self.indexer.collection)
+        # start from the live version's hashes and BM25 file, so only the
+        # changed files are indexed and only their chunks tokenized on swap
+        file_hashes = copy.deepcopy(self.indexer.hash_manager.file_hashes)
+        indexer.hash_manager.file_hashes = file_hashes
+        indexer.hash_manager.save(file_hashes)
+        if self.lexical_index is not None:
+            self.lexical_index.save()
+            if self.lexical_index.index_file.exists():
+                shutil.copyfile(
+                    self.lexical_index.index_file, self._lexical_file(version)
+                )
+        result = self._update_files(indexer, changed, deleted)
+        return self._go_live(version, indexer, result, "Update")
+
+    def publish_collection(self) -> CollectionResult:
+        """
+        reload_collection for a database with collection versions: the changed
+        files under collection_path go live as a new version (see
+        publish_files), so read-only query workers and the vector export see
+        them. No version is made when nothing changed.
+        """
+        self._check_writable()
+        files, errors, pdfs = self._discover_files(self.collection_path)
+        hash_manager = self.indexer.hash_manager
+        changed = pdfs + [f for f in files if not hash_manager.is_unchanged(f)]
+        if not changed:
+            return CollectionResult(files=[], errors=errors)
+        result = self.publish_files(changed, [])
+        result.errors = errors + result.errors
+        return result
+
+    def rollback(self, version: str | None = None) -> str:
+        """Make a kept version (default: the one before the live one) live again."""
+        self._check_writable()
+        version = version or self.versions.previous()
+        if version is None or version not in self.versions.versions:
+            raise ValueError(f"No collection version to roll back to: {version}")
+        self._activate(self._open_version(version))
+        logger.info(f"Rolled back to collection {version}")
+        return version
+
+    def refresh_version(self) -> None:
+        """Swap to the live version if another process activated a new one."""
+        if not self.versions.changed_on_disk():
+            return
+        with self._refresh_lock:
+            if not self.versions.changed_on_disk():  # another thread swapped
+                return
+            self.versions.load()
+            if self.versions.active != self.indexer.collection.name:
+                self._activate(self._open_version(self.versions.active), save=False)
+                logger.info(f"Switched to collection {self.versions.active}")
+
+    def update_files(self, changed: list[str], deleted: list[str]) -> CollectionResult:
+        """
+        Re-index only the given paths (see FileWatcher): convert changed PDFs,
+        index changed .md files, drop chunks of deleted .md files.
+        """
+        self._check_writable()
+        result = self._update_files(self.indexer, changed, deleted)
+        if self.lexical_index is not None:
+            self.lexical_index.save()
+        return result
+
+    def _update_files(
+        self, indexer: ChromaIndexer, changed: list[str], deleted: list[str]
+    ) -> CollectionResult:
+        md_files = [f for f in changed if Path(f).suffix.lower() == ".md"]
+        pdfs = [f for f in changed if Path(f).suffix.lower() == ".pdf"]
+        errors = []
+        if pdfs:
+            converted_files, errors = self._extract_text_from_pdfs(pdfs)
+            md_files.extend(f for f in converted_files if f not in md_files)
+        # a deleted PDF leaves its .md behind, which stays indexed like on reload;
+        # only its cached pages go
+        if self.page_cache is not None and any(
+            Path(f).suffix.lower() == ".pdf" for f in deleted
+        ):
+            self.page_cache.prune()
+        removed = indexer.remove_files(
+            [f for f in deleted if Path(f).suffix.lower() == ".md"]
+        )
+        result = indexer.index_files(md_files)
+        result.files = removed + result.files
+        result.errors = errors + result.errors
+        return result
+
+    def _open_version(self, version: str) -> ChromaIndexer:
+        """
+        Indexer for collection version (created if missing, unless read-only)
+        with its own hash file.
+        """
+        open_collection = (
+            self.client.get_collection
+            if self.read_only
+            else self.client.get_or_create_collection
+        )
+        collection = open_collection(
+            version,
+            embedding_function=self.embedding_function,  # type: ignore[arg-type]
+        )
+        hash_manager = FileHashManager(self._hash_file(version))
+        return ChromaIndexer(
+            collection,
+            threading.Lock(),
+            self.text_splitter,
+            hash_manager,
+            self.batch_size,
+            self.embedder,
+            self.metrics,
+        )
+
+    def _hash_file(self, version: str) -> Path:
+        # the unversioned collection keeps the original hash file location
+        if version == self.versions.name:
+            return Path(self.persistent_storage) / Path(self.hash_filename)
+        return Path(self.persistent_storage) / "versions" / version / self.hash_filename
+
+    def _lexical_file(self, version: str) -> Path:
+        return self._hash_file(version).with_name("bm25_index.json")
+
+    def _vector_index_dir(self) -> Path:
+        return Path(self.persistent_storage) / "vector_index"
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError("RagClient is read-only; index from the writer process")
+
+    def _go_live(
+        self,
+        version: str,
+        indexer: ChromaIndexer,
+        result: CollectionResult,
+        action: str,
+    ) -> CollectionResult:
+        """
+        Make the new version live if it passes validation, else drop it.
+        Older versions beyond keep_versions are deleted.
+        """
+        error = self._validate(indexer, result)
+        if error is not None:
+            result.errors.append(f"{action} {version} rejected: {error}")
+            self._drop_version(version)
             return result
-        return self.indexer.index_files(result.files)
+        if isinstance(self.retriever, NumpyRetriever):
+            # readers in other processes open it on swap instead of building it
+            self.retriever.export(indexer.collection)
+        self._activate(indexer)
+        logger.info(
+            f"Collection {version} is live ({indexer.collection.count()} chunks)"
+        )
+        for stale in self.versions.stale(self.keep_versions):
+            self._drop_version(stale)
+        return result
+
+    @staticmethod
+    def _validate(indexer: ChromaIndexer, result: CollectionResult) -> str | None:
+        """Return why a rebuilt version must not go live, or None if it may."""
+        written = {stage.name: stage for stage in result.stages}.get("writing")
+        if written is not None and written.errors:
+            return f"{written.errors} files failed to write"
+        collection = indexer.collection
+        if collection.count() == 0:
+            return "collection is empty"
+        # one nearest-neighbour query proves the vector index answers
+        sample = collection.peek(1)
+        embeddings = sample.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            return "no embeddings stored"
+        found = collection.query(query_embeddings=[embeddings[0]], n_results=1)
+        if found["ids"][0][:1] != sample["ids"][:1]:
+            return "sample chunk not found by vector query"
+        return None
+
+    def _activate(self, indexer: ChromaIndexer, save: bool = True) -> None:
+        """Point indexing and retrieval at indexer's collection."""
+        collection = indexer.collection
+        # listeners (rule index, caches) follow the live collection
+        indexer.listeners = self.indexer.listeners
+        self.rule_index.load(collection)
+        if self.lexical_index is not None:
+            self.lexical_index.save()
+            self.lexical_index.load(collection, self._lexical_file(collection.name))
+        self.retriever.use_collection(collection)
+        # cached answers stay valid: they are keyed by chunk ids, which
+        # depend only on source and text, so they match across versions
+        self.indexer = indexer
+        if save:
+            self.versions.activate(collection.name)
+
+    def _drop_version(self, version: str) -> None:
+        """Delete collection version and its hash file."""
+        try:
+            self.client.delete_collection(version)
+        except Exception as e:
+            logger.warning(f"Error deleting collection {version}: {e}")
+        self._hash_file(version).unlink(missing_ok=True)
+        self._lexical_file(version).unlink(missing_ok=True)
+        shutil.rmtree(self._vector_index_dir() / version, ignore_errors=True)
+        if version in self.versions.versions:
+            self.versions.remove(version)
+        logger.info(f"Dropped collection {version}")
 
     def list_files(self, path: Path | str) -> CollectionResult:
         """Recursively list .md paths under path and convert PDFs to .md."""
         files, errors, pdfs_to_convert = self._discover_files(path, 0)
         if pdfs_to_convert:
-            converted_files = self._extract_text_from_pdfs(pdfs_to_convert)
+            converted_files, conversion_errors = self._extract_text_from_pdfs(
+                pdfs_to_convert
+            )
             files.extend(converted_files)
+            errors.extend(conversion_errors)
         return CollectionResult(files=files, errors=errors)
 
     def _discover_files(
@@ -151,32 +588,16 @@ class RagClient:
         extension = filepath.suffix.lower()
         return extension in [".pdf", ".md"]
 
-    def _extract_text_from_pdfs(self, pdfs: list[str]) -> list[str]:
-        """Convert PDFs to markdown in parallel"""
+    def _extract_text_from_pdfs(self, pdfs: list[str]) -> tuple[list[str], list[str]]:
+        """
+        Convert PDFs to markdown in a process pool, page ranges in parallel.
+        Returns (converted md files, errors).
+        """
         converted_files = []
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            future_to_pdf = {
-                executor.submit(self._extract_text_from_pdf, pdf): pdf for pdf in pdfs
-            }
-            for future in as_completed(future_to_pdf):
-                md_file = future.result()
-                if md_file:
-                    converted_files.append(md_file)
-        return converted_files
-
-    @staticmethod
-    def _extract_text_from_pdf(pdf: str) -> str | None:
-        """Convert one PDF to markdown"""
-        extension = Path(pdf).suffix.lower()
-        if extension != ".pdf":
-            return None
-        try:
-            md = pymupdf4llm.to_markdown(pdf, header=False, footer=False)
-            if not isinstance(md, str):
-                return None
-            md_path = Path(pdf).with_suffix(".md")
-            md_path.write_text(md, encoding="utf-8")
-            return str(md_path.resolve())
-        except Exception as e:
-            logger.error(f"Error extracting text from {pdf}: {e}")
-            return None
+        errors = []
+        for result in self.pdf_converter.convert(pdfs):
+            if result.md_file:
+                converted_files.append(result.md_file)
+            if result.error:
+                errors.append(result.error)
+        return converted_files, errors
@@ -0,0 +1,51 @@
+"""RagClient settings from environment variables, shared by the server and the scripts."""
+
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from chroma.chroma import RagClient
+    from chroma.metrics import Metrics
+
+
+def create_rag_client(
+    read_only: bool = False, metrics: "Metrics | None" = None
+) -> "RagClient":
+    """
+    Instantiate RagClient from environment variables (see .env.example), so
+    the server, its watcher and the scripts index and query with the same
+    settings. chromadb is imported only when this is called.
+    """
+    from chroma.chroma import RagClient
+
+    return RagClient(
+        name=os.getenv("COLLECTION_NAME", "my-collection"),
+        persistent_storage=os.getenv("PERSISTENT_STORAGE", "./chroma_db"),
+        collection_path=os.getenv("COLLECTION_PATH", "source_docs"),
+        hash_filename=os.getenv("HASH_FILE", "file_hashes.json"),
+        cache_size=int(os.getenv("RETRIEVAL_CACHE_SIZE", "256")),
+        cache_ttl=float(os.getenv("RETRIEVAL_CACHE_TTL", "300")),
+        answer_cache_size=int(os.getenv("ANSWER_CACHE_SIZE", "0")),
+        answer_cache_distance=float(os.getenv("ANSWER_CACHE_DISTANCE", "0.05")),
+        context_budget=int(os.getenv("CONTEXT_BUDGET_CHARS", "24000")),
+        mmr_lambda=float(os.getenv("MMR_LAMBDA", "0.7")),
+        batch_size=int(os.getenv("INDEX_BATCH_SIZE", "256")),
+        pdf_workers=int(os.getenv("PDF_WORKERS", "0")) or None,
+        pdf_pages_per_batch=int(os.getenv("PDF_PAGES_PER_BATCH", "50")),
+        pdf_cache_dir=os.getenv("PDF_CACHE_DIR", "./pdf_cache") or None,
+        pdf_cache_max_pages=int(os.getenv("PDF_CACHE_MAX_PAGES", "20000")),
+        pipeline_queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", "8")),
+        embed_batch_size=int(os.getenv("EMBED_BATCH_SIZE", "64")),
+        embed_workers=int(os.getenv("EMBED_WORKERS", "2")),
+        embedding_cache_dir=os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")
+        or None,
+        lexical_search=os.getenv("LEXICAL_SEARCH", "true").lower()
+        in ("1", "true", "yes"),
+        metrics=metrics,
+        query_batch_size=int(os.getenv("QUERY_BATCH_SIZE", "32")),
+        query_batch_window=float(os.getenv("QUERY_BATCH_WINDOW", "0.002")),
+        read_only=read_only,
+        keep_versions=int(os.getenv("KEEP_VERSIONS", "1")),
+        vector_backend=os.getenv("VECTOR_BACKEND", "chroma"),
+        vector_dtype=os.getenv("VECTOR_DTYPE", "float32"),
+    )
@@ -0,0 +1,74 @@
+"""Batched embedding on a worker pool, backed by an optional EmbeddingCache."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from chromadb import Documents, EmbeddingFunction
+from chromadb.api.types import Embedding
+
+from chroma.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger("BatchEmbedder")
+
+
+class BatchEmbedder:
+    """
+    Computes embeddings for ChromaIndexer instead of letting Chroma embed on add.
+    Texts found in cache are not embedded again; the rest are de-duplicated,
+    split into batches of batch_size and embedded on max_workers threads
+    (the ONNX runtime releases the GIL while it runs).
+    """
+
+    DEFAULT_BATCH_SIZE = 64
+    DEFAULT_MAX_WORKERS = 2
+
+    def __init__(
+        self,
+        embedding_function: EmbeddingFunction[Documents],
+        cache: EmbeddingCache | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.embedding_function = embedding_function
+        self.cache = cache
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="embed"
+        )
+
+    def embed(self, documents: list[str]) -> list[Embedding]:
+        """Return one embedding per document, in order."""
+        # text -> embedding, filled from cache first
+        embeddings: dict[str, Embedding] = {}
+        keys: dict[str, str] = {}
+        missing: list[str] = []
+        for text in dict.fromkeys(documents):
+            if self.cache is not None:
+                keys[text] = self.cache.make_key(text)
+                cached = self.cache.get(keys[text])
+                if cached is not None:
+                    embeddings[text] = cached
+                    continue
+            missing.append(text)
+        batches = [
+            missing[start : start + self.batch_size]
+            for start in range(0, len(missing), self.batch_size)
+        ]
+        for batch, vectors in zip(
+            batches, self.executor.map(self.embedding_function, batches)
+        ):
+            for text, vector in zip(batch, vectors):
+                embeddings[text] = vector
+                if self.cache is not None:
+                    self.cache.set(keys[text], vector)
+        if missing:
+            logger.debug(
+                f"Embedded {len(missing)} of {len(embeddings)} unique texts "
+                f"in {len(batches)} batches"
+            )
+        return [embeddings[text] for text in documents]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
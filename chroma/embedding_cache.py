@@ -0,0 +1,68 @@
+"""On-disk embedding cache addressed by chunk text hash, so unseen text alone is embedded."""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+from chromadb.api.types import Embedding
+
+logger = logging.getLogger("EmbeddingCache")
+
+
+class EmbeddingCache:
+    """
+    Stores one float32 .npy vector per chunk text, named by the sha256 of the text.
+    Keep cache_dir outside the Chroma storage (and per embedding model) so it
+    survives deleting chroma_db for a rebuild.
+    """
+
+    def __init__(self, cache_dir: Path | str) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Embedding | None:
+        """Return the cached vector for key, or None."""
+        try:
+            embedding = np.load(self._path(key))
+        except FileNotFoundError:
+            embedding = None
+        except Exception as e:
+            logger.warning(f"Error reading cached embedding {key}: {e}")
+            embedding = None
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return embedding
+
+    def set(self, key: str, embedding: Embedding) -> None:
+        """Write vector for key; a temp file + rename keeps readers from seeing partial files."""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.asarray(embedding, dtype=np.float32))
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.error(f"Error caching embedding {key}: {e}")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _path(self, key: str) -> Path:
+        # two-character shards keep directories small
+        return self.cache_dir / key[:2] / f"{key}.npy"
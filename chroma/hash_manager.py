@@ -1,18 +1,30 @@
-"""Map file path to modification time for incremental re-indexing."""
+"""Map file path to content hash and chunk ids for incremental re-indexing."""
 
+import hashlib
 import json
 import logging
 from pathlib import Path
+from typing import TypedDict
 
 logger = logging.getLogger("FileHashManager")
 
 
+class FileRecord(TypedDict):
+    mtime: float
+    size: int
+    sha256: str
+    chunks: list[str] | None  # chunk ids indexed from the file, None if unknown
+
+
 class FileHashManager:
     """
     Manage file hashes saved in JSON file.
-    Maps file path to mtime. Used to skip unchanged files on re-index.
+    Maps file path to mtime, size, sha256 and the chunk ids indexed from it.
+    mtime + size is a fast path; sha256 decides whether content really changed.
     """
 
+    READ_SIZE = 1 << 20  # bytes read per step while hashing
+
     def __init__(self, hash_file: Path | str) -> None:
         if not isinstance(hash_file, Path):
             hash_file = Path(hash_file)
@@ -21,28 +33,81 @@ class FileHashManager:
         # create hash file parent directory if it doesn't exist
         self.hash_file.parent.mkdir(parents=True, exist_ok=True)
         # load hash file
-        self.file_hashes: dict[str, float] = self.load()
+        self.file_hashes: dict[str, FileRecord] = self.load()
+        # True when file_hashes has changes not yet saved
+        self.dirty = False
 
-    def load(self) -> dict[str, float]:
+    def load(self) -> dict[str, FileRecord]:
         if not self.hash_file.exists():
             return {}
         try:
             with open(self.hash_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+                hashes = json.load(f)
         except Exception as e:
             logger.warning(f"Error loading file hashes: {e}")
             return {}
+        for file, record in hashes.items():
+            # older hash files map path to mtime only
+            if isinstance(record, (int, float)):
+                hashes[file] = {
+                    "mtime": record,
+                    "size": -1,
+                    "sha256": "",
+                    "chunks": None,
+                }
+        return hashes
 
-    def save(self, hashes: dict[str, float]) -> None:
+    def save(self, hashes: dict[str, FileRecord]) -> None:
         try:
             with open(self.hash_file, "w", encoding="utf-8") as f:
                 json.dump(hashes, f, indent=4)
+            self.dirty = False
         except Exception as e:
             logger.error(f"Error saving file hashes: {e}")
 
-    def update(self, file: str) -> None:
+    def update(self, file: str, chunks: list[str] | None = None) -> None:
+        """Record file's current mtime, size, sha256 and the chunk ids indexed from it."""
         try:
-            # store file's mtime to current time in file_hashes
-            self.file_hashes[file] = Path(file).stat().st_mtime
+            stat = Path(file).stat()
+            self.file_hashes[file] = {
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "sha256": self.compute_sha256(file),
+                "chunks": chunks,
+            }
+            self.dirty = True
         except Exception as e:
             logger.error(f"Error updating file hash for {file}: {e}")
+
+    def is_unchanged(self, file: str) -> bool:
+        """
+        True if file content matches the stored record.
+        A file that was only touched (same sha256) gets its mtime refreshed.
+        """
+        record = self.file_hashes.get(file)
+        if record is None:
+            return False
+        stat = Path(file).stat()
+        if record["mtime"] == stat.st_mtime and record["size"] in (-1, stat.st_size):
+            return True
+        if record["size"] != stat.st_size:
+            return False
+        if record["sha256"] != self.compute_sha256(file):
+            return False
+        record["mtime"] = stat.st_mtime
+        self.dirty = True
+        return True
+
+    def get_chunks(self, file: str) -> list[str] | None:
+        """Return chunk ids recorded for file, or None if unknown."""
+        record = self.file_hashes.get(file)
+        return record["chunks"] if record else None
+
+    @classmethod
+    def compute_sha256(cls, file: str) -> str:
+        """Hash file content without reading it into memory at once."""
+        digest = hashlib.sha256()
+        with open(file, "rb") as f:
+            while block := f.read(cls.READ_SIZE):
+                digest.update(block)
+        return digest.hexdigest()
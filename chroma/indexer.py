@@ -1,53 +1,90 @@
-"""ChromaDB indexing: chunk documents, add/update/remove in collection, track file mtimes."""
+"""ChromaDB indexing: chunk documents, add/update/remove in collection, track file hashes."""
 
 import hashlib
 import logging
 import re
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 from threading import Lock
+from typing import Protocol
 
-from chromadb import Collection
+from chromadb import Collection, Metadata
+from chromadb.api.types import Embedding
 
+from chroma.embedder import BatchEmbedder
 from chroma.hash_manager import FileHashManager
-from chroma.models import CollectionResult
+from chroma.metrics import Metrics, timed
+from chroma.models import ChunkBatch, CollectionResult
 from chroma.text_splitter import TextSplitter
 
 logger = logging.getLogger("ChromaIndexer")
 
+# match rule_id: ## **(numbers).(numbers)(spaces)(rule_id).
+# rule_id: (3 or more uppercase letters)(digits)-C(optional PP)
+RULE_HEADER_PATTERN = re.compile(r"## \*\*\d+\.\d+\s+([A-Z]{3,}\d+-C(?:PP)?)\.")
+
+
+class CollectionListener(Protocol):
+    """Notified by ChromaIndexer after chunks are added, updated or deleted."""
+
+    def on_upsert(
+        self, ids: list[str], documents: list[str], metadatas: list[Metadata]
+    ) -> None: ...
+
+    def on_delete(self, ids: list[str]) -> None: ...
+
 
 class ChromaIndexer:
     """Indexes markdown files into a ChromaDB collection"""
 
+    DEFAULT_BATCH_SIZE = 256
+
     def __init__(
         self,
         collection: Collection,
         lock: Lock,
         text_splitter: TextSplitter,
         hash_manager: FileHashManager,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        embedder: BatchEmbedder | None = None,
+        metrics: Metrics | None = None,
     ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
         self.collection = collection
         self.lock = lock
         self.text_splitter = text_splitter
         self.hash_manager = hash_manager
+        self.batch_size = batch_size
+        # computes vectors up front; without it Chroma embeds documents on add
+        self.embedder = embedder
+        self.metrics = metrics
+        self.listeners: list[CollectionListener] = []
+
+    def add_listener(self, listener: CollectionListener) -> None:
+        """Register listener to be notified of collection writes."""
+        self.listeners.append(listener)
 
     def index_files(self, files: list[str]) -> CollectionResult:
-        """Index only changed files (by mtime)"""
+        """
+        Index only changed files (by content hash).
+        Adds chunks that are new and deletes chunks that vanished from each file.
+        """
         files_to_process = self._get_files_to_process(files)
         files_indexed = []
         errors = []
         for file in files_to_process:
             try:
-                chunks = self.text_splitter.split(file)
-                norm_file = str(Path(file).resolve())
-                for chunk_index, chunk in enumerate(chunks):
-                    if chunk.strip():
-                        self._add_chunk(chunk, norm_file, chunk_index)
+                ids: list[str] = []
+                for chunks in self.iter_prepare_file(file):
+                    self._add_chunks(chunks)
+                    ids.extend(chunks["ids"])
+                self.finish_file(file, ids)
                 files_indexed.append(file)
-                self.hash_manager.update(file)
             except Exception as e:
                 errors.append(f"Error processing file {file}: {e}")
                 break
-        if files_indexed:
+        if self.hash_manager.dirty:
             self.hash_manager.save(self.hash_manager.file_hashes)
         return CollectionResult(files=files_indexed, errors=errors)
 
@@ -60,12 +97,16 @@ class ChromaIndexer:
             try:
                 with self.lock:
                     # check if file exists in collection
-                    result = self.collection.get(where={"source": norm_file})
-                    if not result.get("ids"):
+                    result = self.collection.get(
+                        where={"source": norm_file}, include=[]
+                    )
+                    ids = result.get("ids")
+                    if not ids:
                         continue
                     # delete file from collection
                     self.collection.delete(where={"source": norm_file})
                     files_removed.append(norm_file)
+                self._notify_delete(ids)
                 if norm_file in file_hashes:
                     del file_hashes[norm_file]
             except Exception as e:
@@ -84,54 +125,194 @@ class ChromaIndexer:
                     self.collection.delete(ids=ids)
                 self.hash_manager.file_hashes = {}
                 self.hash_manager.save(self.hash_manager.file_hashes)
+            if ids:
+                self._notify_delete(ids)
         except Exception as e:
             logger.error(f"Error clearing collection: {e}")
 
+    def copy_from(self, source: Collection) -> int:
+        """
+        Add every chunk of source, with its stored embedding, to this collection
+        (nothing is embedded again). Listeners are not notified. Returns the count.
+        """
+        copied = 0
+        while True:
+            page = source.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=self.batch_size,
+                offset=copied,
+            )
+            if not page["ids"]:
+                return copied
+            with self.lock:
+                self.collection.add(
+                    ids=page["ids"],
+                    embeddings=page["embeddings"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"],
+                )
+            copied += len(page["ids"])
+
+    def iter_prepare_file(self, file: str) -> Iterator[ChunkBatch]:
+        """
+        Split file into chunks with ids and metadata, ready to index, yielding
+        batches of batch_size as the splitter produces them, so memory doesn't
+        grow with the file. Yields at least one (maybe empty) batch; call
+        finish_file with the ids of all batches after the last one is written.
+        """
+        chunks = self.text_splitter.iter_split(file)
+        return self._iter_batches(chunks, str(Path(file).resolve()))
+
+    def plan_chunks(self, chunks: ChunkBatch) -> tuple[ChunkBatch, ChunkBatch]:
+        """
+        Check which chunks exist with one bulk get.
+        Returns (new chunks, existing chunks whose rule_id changed).
+        """
+        new: ChunkBatch = {"ids": [], "documents": [], "metadatas": []}
+        updated: ChunkBatch = {"ids": [], "documents": [], "metadatas": []}
+        if not chunks["ids"]:
+            return new, updated
+        with self.lock:
+            existing = self.collection.get(ids=chunks["ids"], include=["metadatas"])
+        existing_metas = dict(zip(existing["ids"], existing.get("metadatas") or []))
+        for chunk_id, chunk, meta in zip(
+            chunks["ids"], chunks["documents"], chunks["metadatas"]
+        ):
+            if chunk_id not in existing_metas:
+                self._append_chunk(new, chunk_id, chunk, meta)
+                continue
+            # skip if chunk already exists, but ensure rule_id is set if chunk matches
+            existing_meta = existing_metas[chunk_id] or {}
+            if "rule_id" not in meta or existing_meta.get("rule_id") == meta["rule_id"]:
+                continue
+            self._append_chunk(updated, chunk_id, chunk, {**existing_meta, **meta})
+        return new, updated
+
+    def embed_chunks(self, chunks: ChunkBatch) -> list[Embedding] | None:
+        """Embed chunk documents with embedder, or None to leave it to Chroma."""
+        if self.embedder is None or not chunks["ids"]:
+            return None
+        with timed(self.metrics, "index_embed"):
+            return self.embedder.embed(chunks["documents"])
+
+    def write_chunks(
+        self,
+        new: ChunkBatch,
+        updated: ChunkBatch,
+        embeddings: list[Embedding] | None = None,
+    ) -> None:
+        """
+        Add new chunks and update changed ones in batches of batch_size.
+        embeddings (one per new chunk) skip Chroma's embedding step when given.
+        """
+        with timed(self.metrics, "index_write"):
+            for start in range(0, len(new["ids"]), self.batch_size):
+                end = start + self.batch_size
+                with self.lock:
+                    self.collection.add(
+                        ids=new["ids"][start:end],
+                        documents=new["documents"][start:end],
+                        metadatas=new["metadatas"][start:end],
+                        embeddings=embeddings[start:end] if embeddings else None,
+                    )
+            for start in range(0, len(updated["ids"]), self.batch_size):
+                end = start + self.batch_size
+                # text is unchanged (it is part of the id): update metadata only,
+                # so Chroma doesn't embed the documents again
+                with self.lock:
+                    self.collection.update(
+                        ids=updated["ids"][start:end],
+                        metadatas=updated["metadatas"][start:end],
+                    )
+        for batch in (new, updated):
+            if batch["ids"]:
+                self._notify_upsert(
+                    batch["ids"], batch["documents"], batch["metadatas"]
+                )
+
+    def finish_file(self, file: str, ids: list[str]) -> None:
+        """Delete chunks that vanished from file and record its hash and chunk ids."""
+        norm_file = str(Path(file).resolve())
+        self._delete_stale_chunks(norm_file, ids)
+        self.hash_manager.update(norm_file, ids)
+
     def _get_files_to_process(self, files: list[str]) -> list[str]:
-        """Return list of files that are new or have mtime different from stored hash."""
+        """Return list of files that are new or whose content differs from stored hash."""
         files_to_process = []
         for file in files:
             norm_file = str(Path(file).resolve())
-            file_stat = Path(norm_file).stat()
-            file_mtime = file_stat.st_mtime
-            file_hashes = self.hash_manager.file_hashes
-            if norm_file in file_hashes and file_hashes[norm_file] == file_mtime:
+            if self.hash_manager.is_unchanged(norm_file):
                 continue
             files_to_process.append(norm_file)
         return files_to_process
 
-    def _add_chunk(self, chunk: str, source: str, chunk_index: int) -> None:
-        """Add a chunk to collection"""
-        chunk_id = self._generate_md5_hash(chunk, source)
-        # match rule_id: ## **(numbers).(numbers)(spaces)(rule_id).
-        # rule_id: (3 or more uppercase letters)(digits)-C(optional PP)
-        rule_id_match = re.search(
-            r"## \*\*\d+\.\d+\s+([A-Z]{3,}\d+-C(?:PP)?)\.", chunk[:2000]
-        )
-        with self.lock:
-            existing = self.collection.get(ids=[chunk_id], include=["metadatas"])
-            # skip if chunk already exists, but ensure rule_id is set if chunk matches
-            if existing and existing.get("ids"):
-                if not rule_id_match:
-                    return
-                existing_meta = existing.get("metadatas")
-                if existing_meta and existing_meta[0].get(
-                    "rule_id"
-                ) != rule_id_match.group(1):
-                    new_meta = {
-                        **existing_meta[0],
-                        "source": source,
-                        "chunk_index": chunk_index,
-                        "rule_id": rule_id_match.group(1),
-                    }
-                    self.collection.update(
-                        documents=[chunk], metadatas=[new_meta], ids=[chunk_id]
-                    )
-                return
-            meta = {"source": source, "chunk_index": chunk_index}
+    def _iter_batches(self, chunks: Iterable[str], source: str) -> Iterator[ChunkBatch]:
+        """
+        Hash chunks and extract rule_id up front, in batches of batch_size
+        chunks. Skips blank and duplicate chunks.
+        """
+        batch: ChunkBatch = {"ids": [], "documents": [], "metadatas": []}
+        seen_ids = set()
+        for chunk_index, chunk in enumerate(chunks):
+            if not chunk.strip():
+                continue
+            chunk_id = self._generate_md5_hash(chunk, source)
+            if chunk_id in seen_ids:  # same text twice in one file: keep first
+                continue
+            seen_ids.add(chunk_id)
+            meta: dict[str, str | int] = {"source": source, "chunk_index": chunk_index}
+            rule_id_match = RULE_HEADER_PATTERN.search(chunk[:2000])
             if rule_id_match:
                 meta["rule_id"] = rule_id_match.group(1)
-            self.collection.add(documents=[chunk], metadatas=[meta], ids=[chunk_id])
+            self._append_chunk(batch, chunk_id, chunk, meta)
+            if len(batch["ids"]) >= self.batch_size:
+                yield batch
+                batch = {"ids": [], "documents": [], "metadatas": []}
+        if batch["ids"] or not seen_ids:  # a file without chunks gets an empty batch
+            yield batch
+
+    def _add_chunks(self, chunks: ChunkBatch) -> None:
+        """
+        Add new chunks to collection in batches of batch_size.
+        Existing chunks are skipped, but their rule_id is updated if it changed.
+        """
+        new, updated = self.plan_chunks(chunks)
+        self.write_chunks(new, updated, self.embed_chunks(new))
+
+    def _delete_stale_chunks(self, source: str, ids: list[str]) -> None:
+        """Delete chunks previously indexed from source that are not in ids."""
+        old_ids = self.hash_manager.get_chunks(source)
+        if old_ids is None:  # no manifest yet: ask the collection
+            with self.lock:
+                existing = self.collection.get(where={"source": source}, include=[])
+            old_ids = existing["ids"]
+        current = set(ids)
+        stale_ids = [chunk_id for chunk_id in old_ids if chunk_id not in current]
+        for start in range(0, len(stale_ids), self.batch_size):
+            with self.lock:
+                self.collection.delete(ids=stale_ids[start : start + self.batch_size])
+        if stale_ids:
+            self._notify_delete(stale_ids)
+
+    @staticmethod
+    def _append_chunk(
+        batch: ChunkBatch, chunk_id: str, chunk: str, meta: Metadata
+    ) -> None:
+        batch["ids"].append(chunk_id)
+        batch["documents"].append(chunk)
+        batch["metadatas"].append(meta)
+
+    def _notify_upsert(
+        self, ids: list[str], documents: list[str], metadatas: list[Metadata]
+    ) -> None:
+        """Tell listeners chunks were added or updated."""
+        for listener in self.listeners:
+            listener.on_upsert(ids, documents, metadatas)
+
+    def _notify_delete(self, ids: list[str]) -> None:
+        """Tell listeners chunks were deleted."""
+        for listener in self.listeners:
+            listener.on_delete(ids)
 
     @staticmethod
     def _generate_md5_hash(text: str, source: str) -> str:
@@ -0,0 +1,178 @@
+"""BM25 inverted index over chunk text, for exact tokens embeddings miss (strncpy, INT30-C)."""
+
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+
+from chromadb import Collection, Metadata
+
+logger = logging.getLogger("Bm25Index")
+
+# identifiers, numbers and hyphenated ids (int30-c) after lowercasing
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+(?:-[a-z0-9_]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class Bm25Index:
+    """
+    Inverted index with BM25 scoring, persisted to a JSON file.
+    load() reconciles the file with the collection (adding and dropping chunks
+    by id), then it is kept in sync as a collection listener on ChromaIndexer.
+    A read_only index (query worker next to a writer process) never saves.
+    """
+
+    K1 = 1.2  # term frequency saturation
+    B = 0.75  # document length normalization
+    LOAD_PAGE_SIZE = 1000
+
+    def __init__(self, index_file: Path | str, read_only: bool = False) -> None:
+        self.index_file = Path(index_file)
+        self.read_only = read_only
+        # chunk id -> term frequencies
+        self._chunks: dict[str, dict[str, int]] = {}
+        # term -> chunk id -> term frequency
+        self._postings: dict[str, dict[str, int]] = {}
+        # chunk id -> number of tokens
+        self._lengths: dict[str, int] = {}
+        self._total_length = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def load(
+        self, collection: Collection, index_file: Path | str | None = None
+    ) -> None:
+        """
+        Read the index file (index_file replaces the current path when given),
+        then add chunks it is missing and drop chunks the collection no longer has.
+        """
+        if index_file is not None:
+            self.index_file = Path(index_file)
+        chunks: dict[str, dict[str, int]] = {}
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    chunks = json.load(f)
+            except Exception as e:
+                logger.warning(f"Error loading BM25 index: {e}")
+        ids = self._collection_ids(collection)
+        missing = [chunk_id for chunk_id in ids if chunk_id not in chunks]
+        stale = chunks.keys() - set(ids)
+        with self._lock:
+            self._chunks = {}
+            self._postings = {}
+            self._lengths = {}
+            self._total_length = 0
+            for chunk_id, terms in chunks.items():
+                if chunk_id not in stale:
+                    self._add(chunk_id, terms)
+            self._dirty = bool(missing or stale)
+        for start in range(0, len(missing), self.LOAD_PAGE_SIZE):
+            page = collection.get(
+                ids=missing[start : start + self.LOAD_PAGE_SIZE], include=["documents"]
+            )
+            with self._lock:
+                for chunk_id, doc in zip(page["ids"], page.get("documents") or []):
+                    self._add(chunk_id, Counter(tokenize(doc or "")))
+        if self._dirty:
+            self.save()
+        logger.info(
+            f"Loaded BM25 index: {len(self._chunks)} chunks "
+            f"({len(missing)} added, {len(stale)} dropped)"
+        )
+
+    def save(self) -> None:
+        """Write the index atomically if it changed since the last save."""
+        with self._lock:
+            if not self._dirty or self.read_only:
+                return
+            data = json.dumps(self._chunks)
+            self._dirty = False
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.index_file.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self.index_file)
+        except Exception as e:
+            logger.error(f"Error saving BM25 index: {e}")
+
+    def search(self, query: str, limit: int) -> list[tuple[str, float]]:
+        """Return up to limit (chunk id, BM25 score) pairs, best first."""
+        terms = set(tokenize(query))
+        scores: Counter[str] = Counter()
+        with self._lock:
+            n = len(self._chunks)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log((n - df + 0.5) / (df + 0.5) + 1)
+                for chunk_id, tf in postings.items():
+                    length = self._lengths[chunk_id]
+                    norm = self.K1 * (1 - self.B + self.B * length / avg_length)
+                    scores[chunk_id] += idf * tf * (self.K1 + 1) / (tf + norm)
+        return scores.most_common(limit)
+
+    # collection listener hooks (see ChromaIndexer)
+    def on_upsert(
+        self, ids: list[str], documents: list[str], metadatas: list[Metadata]
+    ) -> None:
+        with self._lock:
+            for chunk_id, doc in zip(ids, documents):
+                self._discard(chunk_id)
+                self._add(chunk_id, Counter(tokenize(doc)))
+            self._dirty = True
+
+    def on_delete(self, ids: list[str]) -> None:
+        with self._lock:
+            for chunk_id in ids:
+                self._discard(chunk_id)
+            self._dirty = True
+
+    def _add(self, chunk_id: str, terms: dict[str, int]) -> None:
+        """Index chunk term frequencies. Caller holds the lock."""
+        self._chunks[chunk_id] = dict(terms)
+        self._lengths[chunk_id] = sum(terms.values())
+        self._total_length += self._lengths[chunk_id]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[chunk_id] = tf
+
+    def _discard(self, chunk_id: str) -> None:
+        """Remove chunk_id from the index, if present. Caller holds the lock."""
+        terms = self._chunks.pop(chunk_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(chunk_id)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(chunk_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def _collection_ids(self, collection: Collection) -> list[str]:
+        ids: list[str] = []
+        while True:
+            page = collection.get(
+                include=[], limit=self.LOAD_PAGE_SIZE, offset=len(ids)
+            )
+            ids.extend(page["ids"])
+            if len(page["ids"]) < self.LOAD_PAGE_SIZE:
+                return ids
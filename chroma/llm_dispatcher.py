@@ -0,0 +1,211 @@
+"""LLM admission control: bounded in-flight calls, load shedding and retries with backoff."""
+
+import asyncio
+import logging
+import math
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any, TypeVar
+
+from chroma.metrics import Metrics
+
+logger = logging.getLogger("LlmDispatcher")
+
+T = TypeVar("T")
+
+# rate limited, or a transient provider/gateway failure
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+
+class LlmUnavailable(Exception):
+    """
+    The call was shed, timed out or kept failing. status_code (429, 503 or 504)
+    and retry_after (seconds) are meant for the HTTP response to the client.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: float) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def retry_hint(error: BaseException) -> float | None:
+    """
+    Seconds the provider asked to wait: a numeric Retry-After header on the
+    error's response, or a google.rpc.RetryInfo retryDelay ("13s") in its details.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []) or []:
+            delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return float(delay[:-1])
+                except ValueError:
+                    pass
+    return None
+
+
+class LlmDispatcher:
+    """
+    Runs LLM calls with at most max_in_flight at once. Up to max_queue more wait
+    for a slot; beyond that, or when the estimated wait would pass the call's
+    deadline (timeout seconds after dispatch), calls are shed at once with
+    LlmUnavailable(503). Calls failing with a retryable status (an error with
+    .code in RETRYABLE_CODES, like google.genai's APIError) are retried up to
+    max_retries times, after the provider's retry hint or a jittered
+    exponential backoff, as long as the deadline allows.
+    """
+
+    DEFAULT_MAX_IN_FLIGHT = 8
+    DEFAULT_MAX_QUEUE = 64
+    DEFAULT_TIMEOUT = 30.0  # seconds per call, including waiting and retries
+    DEFAULT_MAX_RETRIES = 3
+    DEFAULT_BASE_DELAY = 0.5  # seconds, doubled per retry
+    DEFAULT_MAX_DELAY = 8.0  # seconds
+    LATENCY_SMOOTHING = 0.2  # weight of the newest call in the latency average
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        metrics: Metrics | None = None,
+    ) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+        self.retries = 0
+        # moving average of successful call time, to estimate queue waits
+        self.latency = base_delay
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "shed": self.shed,
+            "retries": self.retries,
+            "latency": self.latency,
+        }
+
+    async def call(
+        self, fn: Callable[[], Awaitable[T]], deadline: float | None = None
+    ) -> T:
+        """Await fn() in a slot, with retries. deadline is a time.monotonic() value."""
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        async with self.slot(deadline):
+            return await self.retry(fn, deadline)
+
+    @asynccontextmanager
+    async def slot(self, deadline: float | None = None) -> AsyncIterator[None]:
+        """Hold one of max_in_flight slots (e.g. for a whole stream), or shed."""
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        started = time.monotonic()
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                raise self.reject("LLM queue is full")
+            # callers ahead of this one are served max_in_flight at a time
+            rounds = self.waiting // self.max_in_flight + 1
+            if started + rounds * self.latency > deadline:
+                raise self.reject("LLM queue wait would exceed the deadline")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(
+                self._slots.acquire(), timeout=max(0.0, deadline - started)
+            )
+        except asyncio.TimeoutError:  # noqa: UP041  # not builtin before 3.11
+            raise self.reject("Timed out waiting for an LLM slot") from None
+        finally:
+            self.waiting -= 1
+        if self.metrics is not None:
+            self.metrics.observe("llm_queue", time.monotonic() - started)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def retry(self, fn: Callable[[], Awaitable[T]], deadline: float) -> T:
+        """Await fn(), retrying retryable failures until max_retries or deadline."""
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            remaining = deadline - started
+            if remaining <= 0:
+                raise LlmUnavailable("LLM deadline exceeded", 504, self.base_delay)
+            try:
+                result = await asyncio.wait_for(fn(), timeout=remaining)
+            except asyncio.TimeoutError:  # noqa: UP041  # not builtin before 3.11
+                raise LlmUnavailable(
+                    "LLM deadline exceeded", 504, self.base_delay
+                ) from None
+            except Exception as e:
+                code = getattr(e, "code", None)
+                if code not in RETRYABLE_CODES:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                status = 429 if code == 429 else 503
+                if attempt >= self.max_retries:
+                    raise LlmUnavailable(
+                        f"LLM failed after {attempt + 1} attempts: {code}",
+                        status,
+                        delay,
+                    ) from e
+                if time.monotonic() + delay > deadline:
+                    raise LlmUnavailable(
+                        f"LLM retry would exceed the deadline: {code}", status, delay
+                    ) from e
+                attempt += 1
+                self.retries += 1
+                logger.warning(
+                    f"LLM call failed ({code}), retry {attempt} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            elapsed = time.monotonic() - started
+            self.latency += self.LATENCY_SMOOTHING * (elapsed - self.latency)
+            return result
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Provider hint plus a little jitter, else full-jitter exponential backoff."""
+        hint = retry_hint(error)
+        if hint is not None:
+            return hint + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def reject(self, reason: str) -> LlmUnavailable:
+        """Count a shed call; returns the LlmUnavailable(503) to raise."""
+        self.shed += 1
+        # by then the queue ahead has had a round of calls to drain
+        retry_after = max(1.0, self.latency * (self.waiting // self.max_in_flight + 1))
+        logger.warning(f"Shedding LLM call: {reason}")
+        return LlmUnavailable(reason, 503, retry_after)
+
+
+def retry_after_header(error: LlmUnavailable) -> dict[str, Any]:
+    """Retry-After header (whole seconds, at least 1) for an HTTP error response."""
+    return {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
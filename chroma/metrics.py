@@ -0,0 +1,149 @@
+"""Hot-path timings: Prometheus histograms plus per-request Server-Timing entries."""
+
+import bisect
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+
+# name -> (unit, help); exported as rag_<name>_<unit> (unit not repeated)
+HISTOGRAMS = {
+    "get_context": ("seconds", "RagClient.get_context: retrieval and context packing"),
+    "rule_lookup": ("seconds", "Rule-id lookup"),
+    "collection_query": ("seconds", "Chroma semantic query"),
+    "lexical_search": ("seconds", "BM25 search and rank fusion"),
+    "context_format": ("seconds", "MMR selection and context packing"),
+    "llm_generate": ("seconds", "LLM call, until the whole reply is received"),
+    "llm_queue": ("seconds", "Wait for an LLM slot (LlmDispatcher)"),
+    "index_embed": ("seconds", "Indexer: embedding the new chunks of one file"),
+    "index_write": ("seconds", "Indexer: Chroma writes for one file"),
+    "prompt": ("chars", "Prompt size sent to the LLM"),
+    "context_chunks": ("chunks", "Chunks packed into the context"),
+    "query_batch": ("queries", "Queries per batched Chroma query (QueryBatcher)"),
+}
+BUCKETS = {
+    "seconds": (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    "chars": (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+    "chunks": (1, 2, 5, 10, 20, 50),
+    "queries": (1, 2, 4, 8, 16, 32, 64),
+}
+
+# timings of the request being served; asyncio.to_thread copies the context,
+# so worker threads add to the same dict
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar(
+    "request_timings", default=None
+)
+
+_NO_TIMER = nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...]) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Metrics:
+    """
+    Histograms for the names in HISTOGRAMS. Values observed while a request()
+    block is active are also kept for that request's Server-Timing header.
+    Components take metrics=None to disable timing; see timed().
+    """
+
+    def __init__(self) -> None:
+        self.histograms = {
+            name: Histogram(
+                f"rag_{name}" if name.endswith(unit) else f"rag_{name}_{unit}",
+                help,
+                BUCKETS[unit],
+            )
+            for name, (unit, help) in HISTOGRAMS.items()
+        }
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float) -> None:
+        """Add value to histogram name and to the current request's timings."""
+        with self._lock:
+            self.histograms[name].observe(value)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + value
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """Observe the seconds spent in the block under name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    @contextmanager
+    def request(self) -> Iterator[dict[str, float]]:
+        """Collect timings observed in the block (and threads it starts) into a dict."""
+        timings: dict[str, float] = {}
+        token = _request_timings.set(timings)
+        try:
+            yield timings
+        finally:
+            _request_timings.reset(token)
+
+    @staticmethod
+    def current_request() -> dict[str, float] | None:
+        """Timings dict of the request() block active in this context, or None."""
+        return _request_timings.get()
+
+    @staticmethod
+    def add_timings(target: dict[str, float], timings: dict[str, float]) -> None:
+        """Add timings (e.g. of work done on another thread) to a request's dict."""
+        for name, value in timings.items():
+            target[name] = target.get(name, 0.0) + value
+
+    @staticmethod
+    def server_timing(timings: dict[str, float]) -> str:
+        """Format request timings as a Server-Timing header value (durations in ms)."""
+        entries = []
+        for name, value in timings.items():
+            if HISTOGRAMS[name][0] == "seconds":
+                entries.append(f"{name};dur={value * 1000:.1f}")
+            else:
+                entries.append(f'{name};desc="{value:g}"')
+        return ", ".join(entries)
+
+    def render(self) -> str:
+        """All histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for histogram in self.histograms.values():
+                lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+def timed(metrics: Metrics | None, name: str) -> AbstractContextManager[None]:
+    """metrics.time(name), or a shared no-op context manager when metrics is None."""
+    if metrics is None:
+        return _NO_TIMER
+    return metrics.time(name)
@@ -1,6 +1,71 @@
+from typing import TypedDict
+
+from chromadb import Metadata
+from chromadb.api.types import Embedding
 from pydantic import BaseModel
 
 
+class StageStats(BaseModel):
+    name: str
+    items: int = 0  # items the stage handled (in for most stages, out for discovery)
+    errors: int = 0
+    busy_seconds: float = 0.0  # wall time not spent waiting on other stages
+    wait_seconds: float = 0.0  # blocked on an empty input or a full output queue
+    items_per_second: float = 0.0  # items / busy_seconds
+
+
 class CollectionResult(BaseModel):
     files: list[str]
     errors: list[str]
+    stages: list[StageStats] = []  # per-stage throughput of a pipeline run
+
+
+class ConversionResult(BaseModel):
+    pdf: str
+    md_file: str | None = None
+    pages: int = 0
+    cached_pages: int = 0  # pages taken from the page cache instead of converted
+    seconds: float = 0.0  # wall time from submitting the file until it was written
+    error: str | None = None
+
+
+class ChunkBatch(TypedDict):
+    ids: list[str]
+    documents: list[str]
+    metadatas: list[Metadata]
+
+
+class RetrievalResult(TypedDict):
+    id: str
+    content: str
+    metadata: Metadata
+    distance: float | None
+    embedding: Embedding | None
+
+
+class ContextResult(TypedDict):
+    context: str
+    results: list[RetrievalResult]  # chunks packed into context, in context order
+    chars_used: int
+    char_budget: int  # 0 means unlimited
+
+
+class WatcherStatus(BaseModel):
+    running: bool
+    backend: str  # "inotify" or "poll"
+    queue_depth: int  # changed/deleted paths waiting to be indexed
+    indexing: bool  # a batch is being indexed right now
+    last_index_time: float | None = None  # unix time the last batch finished
+    last_files: list[str] = []  # files indexed or removed by the last batch
+    last_errors: list[str] = []
+
+
+class ChatTurn(TypedDict):
+    question: str
+    answer: str
+
+
+class SessionState(TypedDict):
+    summary: str  # compacted older turns, one line per turn
+    turns: list[ChatTurn]  # recent turns, oldest first
+    updated: float  # unix time of the last change
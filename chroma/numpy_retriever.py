@@ -0,0 +1,373 @@
+"""Exact vector search over a memory-mapped NumPy export of a Chroma collection."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from chromadb import Collection, Documents, EmbeddingFunction, Metadata, QueryResult
+
+from chroma.cache import RetrievalCache
+from chroma.lexical_index import Bm25Index
+from chroma.metrics import Metrics
+from chroma.models import RetrievalResult
+from chroma.retriever import ChromaRetriever
+from chroma.rule_index import RuleIndex
+
+logger = logging.getLogger("NumpyRetriever")
+
+DTYPES = ("float32", "float16", "int8")
+SPACES = ("l2", "ip", "cosine")
+
+
+def collection_fingerprint(collection: Collection) -> str:
+    """
+    sha1 of the collection's sorted chunk ids. Chunk ids hash source and text,
+    so any added, removed or edited chunk changes it.
+    """
+    ids: list[str] = []
+    while True:
+        page = collection.get(
+            include=[], limit=NumpyVectorIndex.PAGE_SIZE, offset=len(ids)
+        )
+        ids.extend(page["ids"])
+        if len(page["ids"]) < NumpyVectorIndex.PAGE_SIZE:
+            break
+    digest = hashlib.sha1()
+    for chunk_id in sorted(ids):
+        digest.update(chunk_id.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class NumpyVectorIndex:
+    """
+    A collection's embeddings as one matrix (a row per chunk) in embeddings.npy,
+    with ids, documents and metadatas in chunks.json. open() memory-maps the
+    matrix, so loading is near-instant and processes share its pages.
+    dtype float16 halves the matrix; int8 quarters it, each row scaled by its
+    largest absolute value (scales.npy). Norms of the original vectors
+    (norms.npy) keep l2 and cosine distances close to Chroma's.
+    """
+
+    PAGE_SIZE = 1000
+    BLOCK_ROWS = 65536  # rows scored at a time, bounds float32 temporaries
+    SIDECAR = "chunks.json"
+
+    def __init__(
+        self,
+        fingerprint: str,
+        space: str,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[Metadata],
+        matrix: np.ndarray,
+        norms: np.ndarray,
+        scales: np.ndarray | None = None,
+    ) -> None:
+        if space not in SPACES:
+            raise ValueError(f"Unsupported distance space: {space}")
+        self.fingerprint = fingerprint
+        self.space = space
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.matrix = matrix
+        self.norms = norms
+        self.scales = scales
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dtype(self) -> str:
+        return str(self.matrix.dtype)
+
+    @classmethod
+    def from_collection(
+        cls,
+        collection: Collection,
+        dtype: str = "float32",
+        fingerprint: str | None = None,
+    ) -> "NumpyVectorIndex":
+        """Read every chunk and its stored embedding from collection, in memory."""
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype}")
+        ids: list[str] = []
+        documents: list[str] = []
+        metadatas: list[Metadata] = []
+        vectors = []
+        while True:
+            page = collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=cls.PAGE_SIZE,
+                offset=len(ids),
+            )
+            ids.extend(page["ids"])
+            documents.extend(doc or "" for doc in page.get("documents") or [])
+            metadatas.extend(meta or {} for meta in page.get("metadatas") or [])
+            if len(page["ids"]):
+                vectors.append(np.asarray(page["embeddings"], dtype=np.float32))
+            if len(page["ids"]) < cls.PAGE_SIZE:
+                break
+        full = np.concatenate(vectors) if vectors else np.zeros((0, 0), np.float32)
+        norms = np.linalg.norm(full, axis=1).astype(np.float32)
+        scales = None
+        if dtype == "int8":
+            scales = np.abs(full).max(axis=1, initial=0.0) / 127
+            scales[scales == 0] = 1.0
+            matrix = np.round(full / scales[:, None]).astype(np.int8)
+            scales = scales.astype(np.float32)
+        else:
+            matrix = full.astype(dtype)
+        hnsw = (collection.configuration or {}).get("hnsw") or {}
+        return cls(
+            fingerprint or collection_fingerprint(collection),
+            hnsw.get("space") or "l2",
+            ids,
+            documents,
+            metadatas,
+            matrix,
+            norms,
+            scales,
+        )
+
+    def save(self, directory: Path | str) -> None:
+        """
+        Write the index to directory. Each file is replaced atomically and the
+        sidecar goes last, so open() never pairs it with a partial matrix.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {"embeddings.npy": self.matrix, "norms.npy": self.norms}
+        if self.scales is not None:
+            arrays["scales.npy"] = self.scales
+        for name, array in arrays.items():
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, directory / name)
+        sidecar = {
+            "fingerprint": self.fingerprint,
+            "space": self.space,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+        }
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(sidecar, f)
+        os.replace(tmp, directory / self.SIDECAR)
+
+    @classmethod
+    def open(cls, directory: Path | str) -> "NumpyVectorIndex | None":
+        """Open a saved index with the matrix memory-mapped; None if missing or broken."""
+        directory = Path(directory)
+        if not (directory / cls.SIDECAR).exists():
+            return None
+        try:
+            with open(directory / cls.SIDECAR, "r", encoding="utf-8") as f:
+                sidecar = json.load(f)
+            # an empty file can't be mapped
+            mmap_mode = "r" if sidecar["ids"] else None
+            matrix = np.load(directory / "embeddings.npy", mmap_mode=mmap_mode)
+            norms = np.load(directory / "norms.npy")
+            scales = None
+            if matrix.dtype == np.int8:
+                scales = np.load(directory / "scales.npy")
+            if len(matrix) != len(sidecar["ids"]):
+                raise ValueError("matrix and sidecar row counts differ")
+            return cls(
+                sidecar["fingerprint"],
+                sidecar["space"],
+                sidecar["ids"],
+                sidecar["documents"],
+                sidecar["metadatas"],
+                matrix,
+                norms,
+                scales,
+            )
+        except Exception as e:
+            logger.warning(f"Error opening vector index {directory}: {e}")
+            return None
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Exact nearest k rows for each query vector as (rows, distances), both
+        shaped (len(queries), min(k, len(self))), nearest first. Distances are
+        in the collection's space, like Chroma's: squared l2, 1 - dot (ip)
+        or 1 - cosine.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        k = min(k, len(self))
+        if k <= 0:
+            empty = np.zeros((len(queries), 0))
+            return empty.astype(np.int64), empty
+        dots = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), self.BLOCK_ROWS):
+            block = np.asarray(
+                self.matrix[start : start + self.BLOCK_ROWS], dtype=np.float32
+            )
+            dots[:, start : start + len(block)] = queries @ block.T
+        if self.scales is not None:
+            dots *= self.scales
+        query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        if self.space == "l2":
+            distances = query_norms**2 + self.norms**2 - 2 * dots
+        elif self.space == "ip":
+            distances = 1 - dots
+        else:
+            denominator = np.maximum(query_norms * self.norms, 1e-12)
+            distances = 1 - dots / denominator
+        rows = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        nearest = np.take_along_axis(distances, rows, axis=1)
+        order = np.argsort(nearest, axis=1, kind="stable")
+        return (
+            np.take_along_axis(rows, order, axis=1),
+            np.take_along_axis(nearest, order, axis=1),
+        )
+
+    def embedding(self, row: int) -> np.ndarray:
+        """Stored vector of row as float32 (dequantized for int8)."""
+        vector = np.asarray(self.matrix[row], dtype=np.float32)
+        if self.scales is not None:
+            vector = vector * self.scales[row]
+        return vector
+
+
+class NumpyRetriever(ChromaRetriever):
+    """
+    ChromaRetriever whose semantic search is exact top-k over a NumpyVectorIndex
+    of the collection instead of Chroma's query path (client, SQLite, HNSW).
+    The index is saved under index_dir/<collection name> and reused while the
+    collection's chunk ids match (see collection_fingerprint); a read_only
+    retriever builds a missing or outdated one in memory instead of saving it.
+    As a collection listener on ChromaIndexer it reloads after writes.
+    Rule lookup, BM25 fusion and context packing are ChromaRetriever's.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        index_dir: Path | str,
+        embedding_function: EmbeddingFunction[Documents],
+        dtype: str = "float32",
+        cache: RetrievalCache | None = None,
+        rule_index: RuleIndex | None = None,
+        context_budget: int = ChromaRetriever.DEFAULT_CONTEXT_BUDGET,
+        mmr_lambda: float = ChromaRetriever.DEFAULT_MMR_LAMBDA,
+        lexical_index: Bm25Index | None = None,
+        metrics: Metrics | None = None,
+        read_only: bool = False,
+    ) -> None:
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype}")
+        super().__init__(
+            collection,
+            cache,
+            rule_index,
+            context_budget,
+            mmr_lambda,
+            lexical_index,
+            metrics,
+        )
+        self.index_dir = Path(index_dir)
+        self.embedding_function = embedding_function
+        self.dtype = dtype
+        self.read_only = read_only
+        self._index: NumpyVectorIndex | None = None
+        # bumped on every collection write or swap; the index loaded for an
+        # older generation is reloaded on next use
+        self._generation = 0
+        self._loaded_generation = -1
+        self._lock = threading.Lock()
+
+    def warmup(self) -> None:
+        self.index()
+
+    def use_collection(self, collection: Collection) -> None:
+        super().use_collection(collection)
+        self._generation += 1
+
+    def index(self) -> NumpyVectorIndex:
+        """The collection's index, opened or rebuilt if the collection changed."""
+        with self._lock:
+            generation = self._generation
+            if self._index is None or self._loaded_generation != generation:
+                self._index = self._load(self.collection)
+                self._loaded_generation = generation
+            return self._index
+
+    def export(self, collection: Collection) -> None:
+        """
+        Save collection's index ahead of a swap to it (see RagClient), so
+        readers in other processes open it instead of building it.
+        """
+        directory = self.index_dir / collection.name
+        index = NumpyVectorIndex.from_collection(collection, self.dtype)
+        index.save(directory)
+        logger.info(f"Exported vector index {directory} ({len(index)} chunks)")
+
+    # collection listener hooks (see ChromaIndexer)
+    def on_upsert(
+        self, ids: list[str], documents: list[str], metadatas: list[Metadata]
+    ) -> None:
+        self._generation += 1
+
+    def on_delete(self, ids: list[str]) -> None:
+        self._generation += 1
+
+    def _load(self, collection: Collection) -> NumpyVectorIndex:
+        directory = self.index_dir / collection.name
+        fingerprint = collection_fingerprint(collection)
+        index = NumpyVectorIndex.open(directory)
+        if (
+            index is not None
+            and index.fingerprint == fingerprint
+            and index.dtype == self.dtype
+        ):
+            logger.info(f"Opened vector index {directory} ({len(index)} chunks)")
+            return index
+        index = NumpyVectorIndex.from_collection(collection, self.dtype, fingerprint)
+        if self.read_only:
+            logger.info(f"Built vector index in memory ({len(index)} chunks)")
+            return index
+        index.save(directory)
+        logger.info(f"Exported vector index {directory} ({len(index)} chunks)")
+        # reopen, so the matrix is memory-mapped rather than held in memory
+        return NumpyVectorIndex.open(directory) or index
+
+    def _semantic_query(self, messages: list[str], n_results: int) -> QueryResult:
+        index = self.index()
+        queries = np.asarray(self.embedding_function(messages), dtype=np.float32)
+        rows, distances = index.search(queries, n_results)
+        results: dict[str, Any] = {
+            "ids": [[index.ids[r] for r in row] for row in rows],
+            "documents": [[index.documents[r] for r in row] for row in rows],
+            "metadatas": [[index.metadatas[r] for r in row] for row in rows],
+            "distances": distances.tolist(),
+            "embeddings": [[index.embedding(r) for r in row] for row in rows],
+        }
+        return results  # type: ignore[return-value]
+
+    def _get_chunks(self, ids: list[str]) -> dict[str, RetrievalResult]:
+        index = self.index()
+        found: dict[str, RetrievalResult] = {}
+        for chunk_id in ids:
+            row = index.rows.get(chunk_id)
+            if row is None:
+                continue
+            found[chunk_id] = {
+                "id": chunk_id,
+                "content": index.documents[row],
+                "metadata": index.metadatas[row],
+                "distance": None,
+                "embedding": index.embedding(row),
+            }
+        return found
@@ -0,0 +1,183 @@
+"""On-disk cache of converted PDF pages, so an edited PDF only reconverts the pages that changed."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Set as AbstractSet
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import TYPE_CHECKING, TypedDict
+
+if TYPE_CHECKING:
+    import pymupdf
+
+logger = logging.getLogger("PageCache")
+
+
+class PdfPages(TypedDict):
+    pages: list[str]  # page keys, in page order
+    used: float  # time the PDF was last converted, for LRU eviction
+
+
+def converter_tag() -> str:
+    """Converter and options in every page key, so upgrading pymupdf4llm reconverts."""
+    try:
+        converter = f"pymupdf4llm {version('pymupdf4llm')}"
+    except PackageNotFoundError:
+        converter = "pymupdf4llm"
+    return f"{converter} header=False footer=False"
+
+
+class PageCache:
+    """
+    Stores the markdown of single PDF pages as one .md file each, named by
+    page_key, a hash of everything on the page the conversion reads. A JSON
+    manifest maps each PDF to its page keys. Bounded to max_pages page files:
+    pages of the PDFs converted longest ago go first, and prune() drops the
+    pages of PDFs that no longer exist. A page shared by several PDFs (same
+    content) is kept while any of them uses it.
+    """
+
+    DEFAULT_MAX_PAGES = 20000
+    MANIFEST = "manifest.json"
+
+    def __init__(
+        self, cache_dir: Path | str, max_pages: int = DEFAULT_MAX_PAGES
+    ) -> None:
+        if max_pages < 1:
+            raise ValueError("max_pages must be at least 1")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_pages = max_pages
+        self.tag = converter_tag()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # pdf path -> its page keys and last use
+        self._pdfs: dict[str, PdfPages] = self._load()
+
+    def page_key(self, page: "pymupdf.Page") -> str:
+        """
+        sha256 of the page's size, rotation, content stream, fonts, images and
+        links, plus the converter tag. Cheap next to converting the page.
+        """
+        doc = page.parent
+        digest = hashlib.sha256(self.tag.encode("utf-8"))
+        digest.update(repr((tuple(page.rect), page.rotation)).encode("utf-8"))
+        digest.update(page.read_contents())
+        digest.update(repr(page.get_fonts()).encode("utf-8"))
+        for image in page.get_images():
+            digest.update(repr(image).encode("utf-8"))
+            digest.update(doc.xref_stream_raw(image[0]) or b"")
+        links = [link.get("uri") or link.get("page") for link in page.get_links()]
+        digest.update(repr(links).encode("utf-8"))
+        return digest.hexdigest()
+
+    def has(self, key: str) -> bool:
+        """Whether page key is cached, without reading it."""
+        return self._path(key).exists()
+
+    def get(self, key: str) -> str | None:
+        """Return the cached markdown for page key, or None."""
+        try:
+            markdown = self._path(key).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            markdown = None
+        except Exception as e:
+            logger.warning(f"Error reading cached page {key}: {e}")
+            markdown = None
+        with self._lock:
+            if markdown is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return markdown
+
+    def set(self, key: str, markdown: str) -> None:
+        """Write markdown for page key (temp file + rename, never partial)."""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(markdown)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.error(f"Error caching page {key}: {e}")
+
+    def record(self, pdf: str, keys: list[str]) -> None:
+        """
+        Remember keys as the pages of pdf, drop its pages no longer used, then
+        evict least recently converted PDFs (never pdf) beyond max_pages.
+        """
+        with self._lock:
+            old = self._pdfs.pop(pdf, None)
+            self._pdfs[pdf] = {"pages": keys, "used": time.time()}
+            dropped = set(old["pages"]) if old is not None else set()
+            used = self._used_keys()
+            for other in sorted(self._pdfs, key=lambda p: self._pdfs[p]["used"]):
+                if len(used) <= self.max_pages or other == pdf:
+                    break
+                dropped.update(self._pdfs.pop(other)["pages"])
+                used = self._used_keys()
+            self._delete_pages(dropped - used)
+            self._save()
+
+    def prune(self) -> None:
+        """Forget PDFs that no longer exist and delete their pages."""
+        with self._lock:
+            gone = [pdf for pdf in self._pdfs if not Path(pdf).exists()]
+            if not gone:
+                return
+            dropped = set()
+            for pdf in gone:
+                dropped.update(self._pdfs.pop(pdf)["pages"])
+            self._delete_pages(dropped - self._used_keys())
+            self._save()
+        logger.info(f"Pruned cached pages of {len(gone)} deleted PDFs")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "pdfs": len(self._pdfs),
+                "pages": len(self._used_keys()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _used_keys(self) -> AbstractSet[str]:
+        """Page keys of every recorded PDF. Caller holds the lock."""
+        return {key for entry in self._pdfs.values() for key in entry["pages"]}
+
+    def _delete_pages(self, keys: AbstractSet[str]) -> None:
+        for key in keys:
+            self._path(key).unlink(missing_ok=True)
+
+    def _load(self) -> dict[str, PdfPages]:
+        path = self.cache_dir / self.MANIFEST
+        if not path.exists():
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Error loading page cache manifest: {e}")
+            return {}
+
+    def _save(self) -> None:
+        """Write the manifest atomically. Caller holds the lock."""
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._pdfs, f)
+            os.replace(tmp, self.cache_dir / self.MANIFEST)
+        except Exception as e:
+            logger.error(f"Error saving page cache manifest: {e}")
+
+    def _path(self, key: str) -> Path:
+        # two-character shards keep directories small
+        return self.cache_dir / key[:2] / f"{key}.md"
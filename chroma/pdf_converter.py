@@ -0,0 +1,277 @@
+"""PDF to markdown conversion: page batches converted in a process pool, streamed to disk in order."""
+
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import TextIO
+
+from chroma.models import ConversionResult
+from chroma.page_cache import PageCache
+
+logger = logging.getLogger("PdfConverter")
+
+# (pdf, page numbers) of one conversion task
+Batch = tuple[str, list[int]]
+
+
+class Converting:
+    """
+    A PDF whose pages are being converted. Pages are appended to a .part file
+    next to the PDF as soon as every page before them is in; only pages that
+    finished out of order are held in memory.
+    """
+
+    def __init__(
+        self, result: ConversionResult, keys: list[str] | None, cached: list[bool]
+    ) -> None:
+        self.result = result
+        self.keys = keys  # page cache key of each page
+        self.cached = cached  # pages to read from the page cache when written
+        self.ready: dict[int, str] = {}  # converted pages not written yet
+        self.written = 0  # pages written so far
+        self.md_path = Path(result.pdf).with_suffix(".md")
+        # not .md, so watchers and discovery ignore the file until it is complete
+        self.part_path = self.md_path.with_name(f".{self.md_path.name}.part")
+        self.out: TextIO | None = None
+        self.started = time.perf_counter()
+
+    def write(self, markdown: str) -> None:
+        if self.out is None:
+            self.out = open(self.part_path, "w", encoding="utf-8")  # noqa: SIM115
+        self.out.write(markdown)
+        self.written += 1
+
+    def close(self, keep: bool) -> None:
+        """Close the .part file and move it to the .md path, or delete it."""
+        if self.out is not None:
+            self.out.close()
+        if keep:
+            os.replace(self.part_path, self.md_path)
+        else:
+            self.part_path.unlink(missing_ok=True)
+
+
+def convert_pages(pdf: str, pages: list[int]) -> list[str]:
+    """Convert pages of pdf to markdown, one string per page (runs in a worker process)."""
+    import pymupdf4llm  # slow to import: only where PDFs are converted
+
+    chunks = pymupdf4llm.to_markdown(
+        pdf, pages=pages, header=False, footer=False, page_chunks=True
+    )
+    if not isinstance(chunks, list) or len(chunks) != len(pages):
+        raise TypeError(f"Unexpected markdown output for pages {pages[0]}-{pages[-1]}")
+    return [chunk["text"] for chunk in chunks]
+
+
+def worker_context() -> multiprocessing.context.BaseContext:
+    """
+    Start method for conversion workers: never fork, since conversion runs on
+    threads of the server (watcher, ingestion pipeline) and a forked child
+    can inherit locks held by other threads.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+class PdfConverter:
+    """
+    Converts PDFs to markdown next to the source file.
+    Each PDF is split into batches of pages_per_batch pages; batches of all PDFs
+    share one process pool of max_workers (default: CPU count), so a large PDF
+    uses every core and small ones don't wait behind it.
+    At most IN_FLIGHT_PER_WORKER batches per worker are submitted at a time and
+    pages are written to disk in order as they arrive, so memory is bounded by
+    the batches in flight, not by the size of the PDF.
+    With a page_cache, pages whose content hash is cached are not converted
+    again: an edited PDF only reconverts the pages that changed.
+    """
+
+    DEFAULT_PAGES_PER_BATCH = 50
+    IN_FLIGHT_PER_WORKER = 2
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        pages_per_batch: int = DEFAULT_PAGES_PER_BATCH,
+        page_cache: PageCache | None = None,
+    ) -> None:
+        if pages_per_batch < 1:
+            raise ValueError("pages_per_batch must be at least 1")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_batch = pages_per_batch
+        self.page_cache = page_cache
+        self.max_in_flight = self.max_workers * self.IN_FLIGHT_PER_WORKER
+
+    def convert(self, pdfs: list[str]) -> list[ConversionResult]:
+        """Convert pdfs to .md files. Returns one result per PDF, in input order."""
+        results = {result.pdf: result for result in self.iter_convert(pdfs)}
+        return [results[pdf] for pdf in pdfs]
+
+    def iter_convert(self, pdfs: Iterable[str]) -> Iterator[ConversionResult]:
+        """
+        Convert pdfs to .md files, yielding each result as soon as its file is done.
+        pdfs is consumed lazily, so it can be fed while earlier files convert; the
+        next PDF is taken once every batch of the previous one is submitted.
+        """
+        pending: dict[Future[list[str]], Batch] = {}
+        backlog: deque[Batch] = deque()  # batches waiting for a free slot
+        converting: dict[str, Converting] = {}
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=worker_context()
+        ) as executor:
+            try:
+                for pdf in pdfs:
+                    result = self._submit(pdf, backlog, converting)
+                    if result is not None:
+                        yield result
+                    self._fill(executor, pending, backlog, converting)
+                    yield from self._collect(pending, backlog, converting, block=False)
+                    while backlog:
+                        yield from self._collect(
+                            pending, backlog, converting, block=True
+                        )
+                        self._fill(executor, pending, backlog, converting)
+                while pending:
+                    yield from self._collect(pending, backlog, converting, block=True)
+                    self._fill(executor, pending, backlog, converting)
+            finally:
+                for state in converting.values():  # abandoned by the caller
+                    state.close(keep=False)
+        if self.page_cache is not None:
+            self.page_cache.prune()
+
+    def _submit(
+        self, pdf: str, backlog: deque[Batch], converting: dict[str, Converting]
+    ) -> ConversionResult | None:
+        """
+        Queue batches of the pages of pdf that aren't cached. Returns the result
+        right away if pdf can't be opened or every page came from the cache.
+        """
+        import pymupdf
+
+        result = ConversionResult(pdf=pdf)
+        keys: list[str] | None = None
+        try:
+            with pymupdf.open(pdf) as doc:
+                page_count = doc.page_count
+                if self.page_cache is not None:
+                    keys = [self.page_cache.page_key(page) for page in doc]
+        except Exception as e:
+            result.error = f"Error opening {pdf}: {e}"
+            return self._log(result)
+        if page_count == 0:
+            result.error = f"No pages in {pdf}"
+            return self._log(result)
+        result.pages = page_count
+        cached = [False] * page_count
+        if self.page_cache is not None and keys is not None:
+            cached = [self.page_cache.has(key) for key in keys]
+        missing = [number for number, hit in enumerate(cached) if not hit]
+        result.cached_pages = page_count - len(missing)
+        state = Converting(result, keys, cached)
+        converting[pdf] = state
+        for start in range(0, len(missing), self.pages_per_batch):
+            backlog.append((pdf, missing[start : start + self.pages_per_batch]))
+        return self._advance(state, backlog, converting)
+
+    def _fill(
+        self,
+        executor: ProcessPoolExecutor,
+        pending: dict[Future[list[str]], Batch],
+        backlog: deque[Batch],
+        converting: dict[str, Converting],
+    ) -> None:
+        """Submit backlog batches until max_in_flight are pending."""
+        while backlog and len(pending) < self.max_in_flight:
+            pdf, pages = backlog.popleft()
+            if pdf not in converting:  # file already failed
+                continue
+            pending[executor.submit(convert_pages, pdf, pages)] = (pdf, pages)
+
+    def _collect(
+        self,
+        pending: dict[Future[list[str]], Batch],
+        backlog: deque[Batch],
+        converting: dict[str, Converting],
+        block: bool,
+    ) -> Iterator[ConversionResult]:
+        """Take finished batches; yield results of files that are complete or failed."""
+        done, _ = wait(
+            pending, timeout=None if block else 0, return_when=FIRST_COMPLETED
+        )
+        for future in done:
+            pdf, pages = pending.pop(future)
+            if pdf not in converting:  # file already failed
+                continue
+            state = converting[pdf]
+            try:
+                for number, markdown in zip(pages, future.result()):
+                    state.ready[number] = markdown
+                    if self.page_cache is not None and state.keys is not None:
+                        self.page_cache.set(state.keys[number], markdown)
+            except Exception as e:
+                state.result.error = f"Error extracting text from {pdf}: {e}"
+            result = self._advance(state, backlog, converting)
+            if result is not None:
+                yield result
+
+    def _advance(
+        self,
+        state: Converting,
+        backlog: deque[Batch],
+        converting: dict[str, Converting],
+    ) -> ConversionResult | None:
+        """
+        Write the pages of state that are next in order. Returns the logged
+        result once the file is complete or failed, else None.
+        """
+        result = state.result
+        try:
+            while result.error is None and state.written < result.pages:
+                number = state.written
+                markdown = state.ready.pop(number, None)
+                if markdown is None and state.cached[number]:
+                    markdown = self._cached_page(state, number)
+                    if markdown is None:  # evicted since: convert it next
+                        state.cached[number] = False
+                        result.cached_pages -= 1
+                        backlog.appendleft((result.pdf, [number]))
+                        return None
+                if markdown is None:
+                    return None
+                state.write(markdown)
+        except Exception as e:
+            result.error = f"Error writing markdown for {result.pdf}: {e}"
+        del converting[result.pdf]
+        try:
+            state.close(keep=result.error is None)
+            if result.error is None:
+                result.md_file = str(state.md_path.resolve())
+                if self.page_cache is not None and state.keys is not None:
+                    self.page_cache.record(str(Path(result.pdf).resolve()), state.keys)
+        except Exception as e:
+            result.error = f"Error writing markdown for {result.pdf}: {e}"
+        result.seconds = time.perf_counter() - state.started
+        return self._log(result)
+
+    def _cached_page(self, state: Converting, number: int) -> str | None:
+        if self.page_cache is None or state.keys is None:
+            return None
+        return self.page_cache.get(state.keys[number])
+
+    @staticmethod
+    def _log(result: ConversionResult) -> ConversionResult:
+        if result.error:
+            logger.error(result.error)
+        else:
+            logger.info(
+                f"Converted {result.pdf}: {result.pages} pages "
+                f"({result.cached_pages} from cache) in {result.seconds:.2f}s"
+            )
+        return result
@@ -0,0 +1,296 @@
+"""Streaming ingestion: discovery -> PDF conversion -> splitting -> embedding -> write.
+
+Each stage runs in its own thread and hands work to the next through a bounded
+queue, so a slow stage applies backpressure instead of buffering everything.
+Discovery sends markdown straight to splitting, so markdown that is ready gets
+indexed while PDFs are still converting.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+from chromadb.api.types import Embedding
+
+from chroma.indexer import ChromaIndexer
+from chroma.models import ChunkBatch, CollectionResult, StageStats
+from chroma.pdf_converter import PdfConverter
+
+logger = logging.getLogger("IngestionPipeline")
+
+# (md files, errors, pdfs to convert), as returned by RagClient._discover_files
+Discovery = tuple[list[str], list[str], list[str]]
+
+# (file, one batch of its chunks, last batch of the file); a None batch means
+# splitting the file failed after earlier batches were sent
+FileBatch = tuple[str, ChunkBatch | None, bool]
+# FileBatch plus (new chunks, updated chunks, embeddings of the new ones)
+PlannedBatch = tuple[
+    str, ChunkBatch | None, bool, ChunkBatch, ChunkBatch, list[Embedding] | None
+]
+
+_DONE = object()  # end-of-stream marker passed down every queue
+
+
+class IngestionPipeline:
+    """Runs discovery, PDF conversion, splitting, embedding and Chroma writes concurrently."""
+
+    DEFAULT_QUEUE_SIZE = 8
+
+    def __init__(
+        self,
+        indexer: ChromaIndexer,
+        pdf_converter: PdfConverter,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        self.indexer = indexer
+        self.pdf_converter = pdf_converter
+        self.queue_size = queue_size
+
+    def run(self, discover: Callable[[], Discovery]) -> CollectionResult:
+        """Index every changed file found by discover. Returns files, errors and stage stats."""
+        names = ["discovery", "conversion", "splitting", "embedding", "writing"]
+        stats = {name: StageStats(name=name) for name in names}
+        # PDF paths queue without bound: the converter limits its own work in
+        # flight, and discovery must never block on it before sending markdown
+        queues: list[queue.Queue[Any]] = [queue.Queue()] + [
+            queue.Queue(maxsize=self.queue_size) for _ in names[2:]
+        ]
+        files_indexed: list[str] = []
+        errors: list[str] = []
+        # discovery feeds PDFs to conversion and markdown to splitting, so
+        # splitting waits for _DONE from both
+        stages = [
+            (self._discover, None, [queues[0], queues[1]]),
+            (self._convert, queues[0], [queues[1]]),
+            (self._split, queues[1], [queues[2]]),
+            (self._embed, queues[2], [queues[3]]),
+            (self._write, queues[3], []),
+        ]
+        threads = []
+        for name, (stage, inbox, outboxes) in zip(names, stages):
+            senders = sum(inbox in boxes for _, _, boxes in stages)
+            thread = threading.Thread(
+                target=self._run_stage,
+                args=(stage, inbox, senders, outboxes, stats[name], errors),
+                kwargs={"discover": discover, "files_indexed": files_indexed},
+                name=f"ingest-{name}",
+            )
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        if self.indexer.hash_manager.dirty:
+            self.indexer.hash_manager.save(self.indexer.hash_manager.file_hashes)
+        if stats["splitting"].items == 0:
+            errors.append("No files to index")
+        for stage_stats in stats.values():
+            logger.info(
+                f"Stage {stage_stats.name}: {stage_stats.items} items, "
+                f"{stage_stats.busy_seconds:.2f}s busy, "
+                f"{stage_stats.items_per_second:.2f} items/s"
+            )
+        return CollectionResult(
+            files=files_indexed, errors=errors, stages=list(stats.values())
+        )
+
+    def _run_stage(
+        self,
+        stage: Callable[..., Iterator[Any]],
+        inbox: "queue.Queue[Any] | None",
+        senders: int,
+        outboxes: "list[queue.Queue[Any]]",
+        stats: StageStats,
+        errors: list[str],
+        files_indexed: list[str],
+        discover: Callable[[], Discovery],
+    ) -> None:
+        """
+        Drive one stage: feed it items from inbox until each of its senders is
+        done, put its outputs on the first outbox (send(output, to) picks
+        another). Always drains inbox and sends _DONE on every outbox, so one
+        failing stage can't hang the rest.
+        """
+        started = time.perf_counter()
+        items = self._receive(inbox, senders, stats) if inbox is not None else iter(())
+
+        def send(output: Any, to: int = 0) -> None:
+            if not outboxes:
+                return
+            wait_started = time.perf_counter()
+            outboxes[to].put(output)  # blocks while the next stage is behind
+            stats.wait_seconds += time.perf_counter() - wait_started
+
+        try:
+            outputs = stage(
+                items=items,
+                stats=stats,
+                errors=errors,
+                files_indexed=files_indexed,
+                discover=discover,
+                send=send,
+            )
+            for output in outputs:
+                send(output)
+        except Exception as e:
+            errors.append(f"Stage {stats.name} failed: {e}")
+            for _ in items:  # keep upstream from blocking on a full queue
+                pass
+        finally:
+            for outbox in outboxes:
+                outbox.put(_DONE)
+            stats.busy_seconds = time.perf_counter() - started - stats.wait_seconds
+            if stats.busy_seconds > 0:
+                stats.items_per_second = stats.items / stats.busy_seconds
+
+    @staticmethod
+    def _receive(
+        inbox: "queue.Queue[Any]", senders: int, stats: StageStats
+    ) -> Iterator[Any]:
+        """Yield items from inbox until senders _DONE markers, counting time spent waiting."""
+        while senders:
+            wait_started = time.perf_counter()
+            item = inbox.get()
+            stats.wait_seconds += time.perf_counter() - wait_started
+            if item is _DONE:
+                senders -= 1
+                continue
+            yield item
+
+    @staticmethod
+    def _discover(
+        stats: StageStats,
+        errors: list[str],
+        discover: Callable[[], Discovery],
+        send: Callable[[str, int], None],
+        **_,
+    ) -> Iterator[str]:
+        """
+        Emit PDFs for conversion and send markdown straight to splitting, so it
+        never waits behind the converter's backpressure.
+        """
+        md_files, discovery_errors, pdfs = discover()
+        errors.extend(discovery_errors)
+        # PDFs first, so conversion starts as early as possible
+        for file in pdfs:
+            stats.items += 1
+            yield file
+        for file in md_files:
+            stats.items += 1
+            send(file, 1)
+
+    def _convert(
+        self, items: Iterator[str], stats: StageStats, errors: list[str], **_
+    ) -> Iterator[str]:
+        """Convert PDFs and emit their .md when done."""
+        for result in self.pdf_converter.iter_convert(items):
+            stats.items += 1
+            if result.error:
+                stats.errors += 1
+                errors.append(result.error)
+            elif result.md_file:
+                yield result.md_file
+
+    def _split(
+        self, items: Iterator[str], stats: StageStats, errors: list[str], **_
+    ) -> Iterator[FileBatch]:
+        """
+        Split changed files into batches of the indexer's batch_size chunks as
+        the splitter produces them; unchanged files stop here.
+        """
+        hash_manager = self.indexer.hash_manager
+        for file in items:
+            stats.items += 1
+            norm_file = str(Path(file).resolve())
+            sent = False
+            try:
+                if hash_manager.is_unchanged(norm_file):
+                    continue
+                previous = None
+                # hold one batch back, so the last one can be marked
+                for batch in self.indexer.iter_prepare_file(norm_file):
+                    if previous is not None:
+                        sent = True
+                        yield norm_file, previous, False
+                    previous = batch
+                if previous is not None:
+                    yield norm_file, previous, True
+            except Exception as e:
+                stats.errors += 1
+                errors.append(f"Error processing file {file}: {e}")
+                if sent:
+                    yield norm_file, None, True
+
+    def _embed(
+        self,
+        items: Iterator[FileBatch],
+        stats: StageStats,
+        errors: list[str],
+        **_,
+    ) -> Iterator[PlannedBatch]:
+        """Find which chunks are new and embed only those (see ChromaIndexer.embedder)."""
+        empty: ChunkBatch = {"ids": [], "documents": [], "metadatas": []}
+        failed: set[str] = set()  # files with a failed batch: rest is skipped
+        for file, chunks, last in items:
+            stats.items += 1
+            if file in failed or chunks is None:
+                if last:
+                    failed.discard(file)
+                    yield file, None, True, empty, empty, None
+                continue
+            try:
+                new, updated = self.indexer.plan_chunks(chunks)
+                embeddings = self.indexer.embed_chunks(new)
+                yield file, chunks, last, new, updated, embeddings
+            except Exception as e:
+                stats.errors += 1
+                errors.append(f"Error processing file {file}: {e}")
+                if last:
+                    yield file, None, True, empty, empty, None
+                else:
+                    failed.add(file)
+
+    def _write(
+        self,
+        items: Iterator[PlannedBatch],
+        stats: StageStats,
+        errors: list[str],
+        files_indexed: list[str],
+        **_,
+    ) -> Iterator[None]:
+        """
+        Write chunks with precomputed embeddings; after the last batch of a
+        file, drop its stale chunks and record its hash. A file with a failed
+        batch is not recorded, so it is indexed again next time.
+        """
+        # ids written so far per file, None once a batch of it failed
+        written: dict[str, list[str] | None] = {}
+        for file, chunks, last, new, updated, embeddings in items:
+            stats.items += 1
+            ids = written.setdefault(file, [])
+            if chunks is None:
+                ids = written[file] = None
+            if ids is not None and chunks is not None:
+                try:
+                    self.indexer.write_chunks(new, updated, embeddings)
+                    ids.extend(chunks["ids"])
+                except Exception as e:
+                    stats.errors += 1
+                    errors.append(f"Error processing file {file}: {e}")
+                    ids = written[file] = None
+            if not last:
+                continue
+            del written[file]
+            if ids is None:
+                continue
+            try:
+                self.indexer.finish_file(file, ids)
+                files_indexed.append(file)
+            except Exception as e:
+                stats.errors += 1
+                errors.append(f"Error processing file {file}: {e}")
+        yield from ()
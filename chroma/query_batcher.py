@@ -0,0 +1,158 @@
+"""Micro-batching of concurrent retrieval queries into one batched Chroma query."""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+from chroma.cache import CacheKey, RetrievalCache
+from chroma.metrics import Metrics
+from chroma.models import RetrievalResult
+from chroma.retriever import ChromaRetriever
+
+logger = logging.getLogger("QueryBatcher")
+
+
+class QueryBatcher:
+    """
+    Sits in front of ChromaRetriever.get_query_results. Queries submitted from
+    any thread within window seconds of the first are run together through
+    get_query_results_batch on a dispatcher thread (one embedding call, one
+    Chroma query), and each caller gets its own results. Identical queries in
+    flight (same normalized message and n_results) share one slot in a batch.
+    While a batch runs, new queries collect for the next one. Timings of a
+    batch are added to the Server-Timing of every request waiting on it.
+    """
+
+    DEFAULT_WINDOW = 0.005  # seconds
+    DEFAULT_MAX_BATCH = 32
+
+    def __init__(
+        self,
+        retriever: ChromaRetriever,
+        window: float = DEFAULT_WINDOW,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        metrics: Metrics | None = None,
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.retriever = retriever
+        self.window = window
+        self.max_batch = max_batch
+        self.metrics = metrics
+        self.batches = 0
+        self.queries = 0  # submitted, including coalesced ones
+        self.coalesced = 0
+        self._pending: list[tuple[CacheKey, str, int]] = []
+        self._in_flight: dict[CacheKey, Future[list[RetrievalResult]]] = {}
+        # request timings (see Metrics.request) of the callers waiting per key
+        self._timings: dict[CacheKey, list[dict[str, float]]] = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def get_query_results(self, message: str, n_results: int) -> list[RetrievalResult]:
+        """Same as ChromaRetriever.get_query_results; blocks until the batch ran."""
+        key = RetrievalCache.make_key(message, n_results)
+        # the dispatcher thread doesn't share the caller's context
+        timings = Metrics.current_request() if self.metrics is not None else None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("QueryBatcher is closed")
+            self.queries += 1
+            if timings is not None:
+                self._timings.setdefault(key, []).append(timings)
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                self._pending.append((key, message, n_results))
+                self._start()
+                self._cond.notify()
+        return list(future.result())
+
+    def stats(self) -> dict[str, int]:
+        """Batches run, queries submitted and queries coalesced into another."""
+        with self._cond:
+            return {
+                "batches": self.batches,
+                "queries": self.queries,
+                "coalesced": self.coalesced,
+            }
+
+    def close(self) -> None:
+        """Stop the dispatcher after the queries already submitted."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _start(self) -> None:
+        """Start the dispatcher thread on first use. Caller holds the lock."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._dispatch, name="QueryBatcher", daemon=True
+            )
+            self._thread.start()
+
+    def _dispatch(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._run(batch)
+
+    def _next_batch(self) -> list[tuple[CacheKey, str, int]] | None:
+        """
+        Wait for a query, then up to window seconds (or until max_batch) for
+        more. Returns None once closed with nothing pending.
+        """
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            deadline = time.monotonic() + self.window
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            self.batches += 1
+            return batch
+
+    def _run(self, batch: list[tuple[CacheKey, str, int]]) -> None:
+        """
+        Run one batched retrieval and hand each caller its results (or the
+        error), after adding the batch's timings to each caller's request.
+        """
+        request = nullcontext(None) if self.metrics is None else self.metrics.request()
+        with request as batch_timings:
+            if self.metrics is not None:
+                self.metrics.observe("query_batch", len(batch))
+            try:
+                results = self.retriever.get_query_results_batch(
+                    [(message, n_results) for _, message, n_results in batch]
+                )
+            except Exception as e:
+                logger.error(f"Error running query batch of {len(batch)}: {e}")
+                results = None
+                error = e
+        with self._cond:
+            futures = [self._in_flight.pop(key) for key, _, _ in batch]
+            waiting = [self._timings.pop(key, []) for key, _, _ in batch]
+        if batch_timings:
+            for timings in (t for caller_timings in waiting for t in caller_timings):
+                Metrics.add_timings(timings, batch_timings)
+        for i, future in enumerate(futures):
+            if results is None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
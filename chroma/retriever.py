@@ -1,106 +1,420 @@
 """ChromaDB retrieval: semantic search plus rule-id boost for CERT-style queries."""
 
-import re
-from typing import TypedDict
-
+import numpy as np
 from chromadb import Collection, Metadata, QueryResult
+from chromadb.api.types import Embedding
 
-
-class RetrievalResult(TypedDict):
-    content: str
-    metadata: Metadata
-    distance: float | None
+from chroma.cache import RetrievalCache
+from chroma.lexical_index import Bm25Index
+from chroma.metrics import Metrics, timed
+from chroma.models import ContextResult, RetrievalResult
+from chroma.rule_index import RuleIndex
 
 
 class ChromaRetriever:
     """Retrieves chunks by semantic similarity, prepends rule chunk when message matches rule id."""
 
-    def __init__(self, collection: Collection) -> None:
+    DEFAULT_CONTEXT_BUDGET = 24000  # characters (~6000 tokens)
+    DEFAULT_MMR_LAMBDA = 0.7  # 1.0 = relevance only, 0.0 = diversity only
+    RRF_K = 60  # reciprocal rank fusion: score = sum of 1 / (RRF_K + rank)
+
+    def __init__(
+        self,
+        collection: Collection,
+        cache: RetrievalCache | None = None,
+        rule_index: RuleIndex | None = None,
+        context_budget: int = DEFAULT_CONTEXT_BUDGET,
+        mmr_lambda: float = DEFAULT_MMR_LAMBDA,
+        lexical_index: Bm25Index | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        self.collection = collection
+        self.cache = cache
+        self.rule_index = rule_index
+        # hybrid search: BM25 results fused with semantic results when set
+        self.lexical_index = lexical_index
+        self.context_budget = context_budget
+        self.mmr_lambda = mmr_lambda
+        # hot-path timings (rule lookup, query, BM25, packing) when set
+        self.metrics = metrics
+
+    def warmup(self) -> None:
+        """Load the collection's vector index now, so the first query doesn't wait."""
+        if self.collection.count() > 0:
+            self.collection.query(query_texts=["warmup"], n_results=1, include=[])
+
+    def use_collection(self, collection: Collection) -> None:
+        """Serve reads from collection from now on (blue-green swap); clears the cache."""
         self.collection = collection
+        if self.cache is not None:
+            self.cache.clear()
 
-    def get_context(self, results: list[RetrievalResult]) -> str:
-        """Format list of {content, metadata} into a single context string with source labels."""
-        if not results:
-            return ""
+    def get_context(self, results: list[RetrievalResult]) -> ContextResult:
+        """
+        Pack results into a context string with source labels, up to context_budget
+        characters (0 = unlimited). Chunks are picked by maximal marginal relevance,
+        so near-duplicate (e.g. overlapping) chunks give way to diverse ones.
+        """
         context_chunks = []
-        for i, result in enumerate(results, 1):
+        packed = []
+        with timed(self.metrics, "context_format"):
+            for result in self._select_results(results):
+                source = result["metadata"].get("source", "unknown")
+                context_chunks.append(
+                    f"[source {len(context_chunks) + 1}: {source}]\n{result['content']}"
+                )
+                packed.append(result)
+            context = "\n\n".join(context_chunks)
+        return {
+            "context": context,
+            "results": packed,
+            "chars_used": len(context),
+            "char_budget": self.context_budget,
+        }
+
+    @staticmethod
+    def get_sources(results: list[RetrievalResult]) -> list[str]:
+        """Return unique source labels of results, in retrieval order."""
+        sources = []
+        for result in results:
             source = result["metadata"].get("source", "unknown")
-            content = result["content"]
-            context_chunks.append(f"[source {i}: {source}]\n{content}")
-        return "\n\n".join(context_chunks)
+            if source not in sources:
+                sources.append(source)
+        return sources
 
     def get_query_results(self, message: str, n_results: int) -> list[RetrievalResult]:
         """
         Rule-id match first (if any), then semantic search.
-        Dedupe and return up to n_results.
-        """
-        retrieved = []
-        seen_ids = set()
-        self._get_rule_results(message, seen_ids, retrieved)
-        results = self.collection.query(
-            query_texts=[message],
-            n_results=n_results * 2,
-            include=["documents", "metadatas", "distances"],
+        Dedupe and return up to n_results. Served from cache when enabled.
+        """
+        if self.cache is None:
+            return self._query_collection(message, n_results)
+        key = self.cache.make_key(message, n_results)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        generation = self.cache.generation
+        retrieved = self._query_collection(message, n_results)
+        self.cache.set(key, retrieved, generation)
+        return retrieved
+
+    def get_query_results_batch(
+        self, queries: list[tuple[str, int]]
+    ) -> list[list[RetrievalResult]]:
+        """
+        get_query_results for each (message, n_results), with one semantic query
+        (one embedding call) for all messages not served from cache.
+        """
+        batch: list[list[RetrievalResult] | None] = [None] * len(queries)
+        generation = 0
+        if self.cache is not None:
+            generation = self.cache.generation
+            for i, (message, n_results) in enumerate(queries):
+                batch[i] = self.cache.get(self.cache.make_key(message, n_results))
+        misses = [i for i, results in enumerate(batch) if results is None]
+        if misses:
+            retrieved = self._query_collection_batch([queries[i] for i in misses])
+            for i, results in zip(misses, retrieved):
+                batch[i] = results
+                if self.cache is not None:
+                    self.cache.set(
+                        self.cache.make_key(*queries[i]), results, generation
+                    )
+        return [results or [] for results in batch]
+
+    def _select_results(self, results: list[RetrievalResult]) -> list[RetrievalResult]:
+        """
+        Greedy MMR selection of results that fit in context_budget. Relevance is
+        the similarity from each distance; with lexical search it is averaged
+        with the fused rank.
+        """
+        if not results:
+            return []
+        semantic = np.array([self._relevance(r["distance"]) for r in results])
+        if self.lexical_index is not None:
+            # lexical-only hits have no distance, but they ranked below every
+            # semantic hit, so the weakest known distance bounds them; average
+            # with the fused rank so BM25 still counts
+            known = semantic[[r["distance"] is not None for r in results]]
+            if known.size:
+                semantic = np.maximum(semantic, known.min())
+            semantic = (semantic + np.linspace(1.0, 0.0, len(results))) / 2
+        relevance = self.mmr_lambda * semantic
+        similarity = self._similarity_matrix(results)
+        # highest similarity of each candidate to anything already selected
+        max_similarity = np.zeros(len(results))
+        remaining = np.ones(len(results), dtype=bool)
+        selected = []
+        chars_used = 0
+        while remaining.any():
+            scores = relevance - (1 - self.mmr_lambda) * max_similarity
+            scores[~remaining] = -np.inf
+            picked = None
+            for i in np.argsort(-scores, kind="stable"):
+                if not remaining[i]:
+                    break
+                cost = self._chunk_cost(results[i], len(selected) + 1)
+                if not self.context_budget or chars_used + cost <= self.context_budget:
+                    picked = int(i)
+                    chars_used += cost
+                    break
+                remaining[i] = False  # does not fit now, never will
+            if picked is None:
+                break
+            selected.append(results[picked])
+            remaining[picked] = False
+            max_similarity = np.maximum(max_similarity, similarity[picked])
+        return selected
+
+    @staticmethod
+    def _chunk_cost(result: RetrievalResult, position: int) -> int:
+        """Characters a chunk adds to the context: label, content, separator."""
+        source = result["metadata"].get("source", "unknown")
+        label = f"[source {position}: {source}]\n"
+        separator = 2 if position > 1 else 0
+        return separator + len(label) + len(result["content"])
+
+    @staticmethod
+    def _relevance(distance: float | None) -> float:
+        """
+        Convert a Chroma distance to a similarity in [-1, 1].
+        Default space is squared L2 over unit vectors: d = 2 - 2 * cos.
+        """
+        if distance is None:
+            return -1.0
+        return 1.0 - distance / 2
+
+    @staticmethod
+    def _similarity_matrix(results: list[RetrievalResult]) -> np.ndarray:
+        """Pairwise cosine similarity of result embeddings (0 where missing)."""
+        n = len(results)
+        dims = next(
+            (len(r["embedding"]) for r in results if r["embedding"] is not None), 0
         )
+        if not dims:
+            return np.zeros((n, n))
+        matrix = np.zeros((n, dims), dtype=np.float32)
+        for i, result in enumerate(results):
+            if result["embedding"] is not None:
+                matrix[i] = result["embedding"]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        return matrix @ matrix.T
+
+    def _query_collection(self, message: str, n_results: int) -> list[RetrievalResult]:
+        """Run rule-id lookup, semantic query and (if enabled) BM25 search."""
+        return self._query_collection_batch([(message, n_results)])[0]
+
+    def _query_collection_batch(
+        self, queries: list[tuple[str, int]]
+    ) -> list[list[RetrievalResult]]:
+        """
+        One semantic query for all messages, then per message: rule-id lookup,
+        parsing of its result row and (if enabled) BM25 search. Chunks found
+        only by BM25 are fetched for all messages at once before fusion.
+        """
+        with timed(self.metrics, "collection_query"):
+            results = self._semantic_query(
+                [message for message, _ in queries],
+                max(n_results for _, n_results in queries) * 2,
+            )
+        rows = []
+        for row, (message, n_results) in enumerate(queries):
+            retrieved: list[RetrievalResult] = []
+            seen_ids: set[str] = set()
+            with timed(self.metrics, "rule_lookup"):
+                self._get_rule_results(message, seen_ids, retrieved)
+            semantic = self._parse_query_results(results, seen_ids, row, n_results * 2)
+            lexical = []
+            if self.lexical_index is not None:
+                with timed(self.metrics, "lexical_search"):
+                    lexical = [
+                        chunk_id
+                        for chunk_id, _ in self.lexical_index.search(
+                            message, n_results * 2
+                        )
+                    ]
+            rows.append((retrieved, seen_ids, semantic, lexical))
+        fetched: dict[str, RetrievalResult] = {}
+        if self.lexical_index is not None:
+            missing = {
+                chunk_id
+                for _, seen_ids, _, lexical in rows
+                for chunk_id in lexical
+                if chunk_id not in seen_ids
+            }
+            with timed(self.metrics, "lexical_search"):
+                fetched = self._get_chunks(list(missing))
+        batch = []
+        for (_, n_results), row in zip(queries, rows):
+            retrieved, seen_ids, semantic, lexical = row
+            if self.lexical_index is not None:
+                semantic = self._fuse(semantic, lexical, seen_ids, fetched)
+            retrieved.extend(semantic)
+            batch.append(retrieved[:n_results])
+        return batch
+
+    def _semantic_query(self, messages: list[str], n_results: int) -> QueryResult:
+        """Nearest n_results chunks for each message, one result row per message."""
+        return self.collection.query(
+            query_texts=messages,
+            n_results=n_results,
+            include=["documents", "metadatas", "distances", "embeddings"],
+        )
+
+    def _parse_query_results(
+        self,
+        results: QueryResult,
+        seen_ids: set[str],
+        row: int = 0,
+        limit: int | None = None,
+    ) -> list[RetrievalResult]:
+        """
+        Turn row (query index) of a Chroma query result into RetrievalResults,
+        at most its first limit hits, skipping seen ids.
+        """
         documents = results.get("documents")
-        if not documents or not documents[0]:
-            return retrieved
-        ids = results["ids"][0] if results.get("ids") else []
-        for i, doc in enumerate(documents[0]):
-            if len(retrieved) >= n_results:
-                break
+        if not documents or not documents[row]:
+            return []
+        ids = results["ids"][row] if results.get("ids") else []
+        parsed: list[RetrievalResult] = []
+        for i, doc in enumerate(documents[row][:limit]):
+            doc_id = ""
             if ids and i < len(ids):
                 doc_id = ids[i]
                 if doc_id in seen_ids:
                     continue
                 seen_ids.add(doc_id)
-            retrieved.append(
+            parsed.append(
                 {
+                    "id": doc_id,
                     "content": doc,
-                    "metadata": self._get_metadata(results, i),
-                    "distance": self._get_distance(results, i),
+                    "metadata": self._get_metadata(results, i, row),
+                    "distance": self._get_distance(results, i, row),
+                    "embedding": self._get_embedding(results, i, row),
                 }
             )
-        return retrieved[:n_results]
+        return parsed
+
+    def _fuse(
+        self,
+        semantic: list[RetrievalResult],
+        lexical: list[str],
+        seen_ids: set[str],
+        fetched: dict[str, RetrievalResult],
+    ) -> list[RetrievalResult]:
+        """
+        Reciprocal rank fusion of semantic results with BM25 hits (chunk ids, best
+        first). Chunks found only by BM25 come from fetched (see _get_chunks);
+        chunks already taken by the rule-id boost are left out.
+        """
+        semantic_ids = {r["id"] for r in semantic}
+        lexical = [
+            chunk_id
+            for chunk_id in lexical
+            if chunk_id in semantic_ids or chunk_id not in seen_ids
+        ]
+        scores: dict[str, float] = {}
+        for ranking in ([r["id"] for r in semantic], lexical):
+            for rank, chunk_id in enumerate(ranking, start=1):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1 / (self.RRF_K + rank)
+        by_id = {r["id"]: r for r in semantic}
+        for chunk_id in lexical:
+            if chunk_id not in by_id and chunk_id in fetched:
+                seen_ids.add(chunk_id)
+                by_id[chunk_id] = fetched[chunk_id]
+        ranked = sorted(by_id, key=lambda chunk_id: -scores.get(chunk_id, 0.0))
+        return [by_id[chunk_id] for chunk_id in ranked]
+
+    def _get_chunks(self, ids: list[str]) -> dict[str, RetrievalResult]:
+        """Fetch chunks by id as RetrievalResults without distance."""
+        if not ids:
+            return {}
+        fetched = self.collection.get(
+            ids=ids, include=["documents", "metadatas", "embeddings"]
+        )
+        documents = fetched.get("documents") or []
+        metadatas = fetched.get("metadatas") or []
+        embeddings = fetched.get("embeddings")
+        return {
+            chunk_id: {
+                "id": chunk_id,
+                "content": documents[i],
+                "metadata": metadatas[i] or {},
+                "distance": None,
+                "embedding": embeddings[i] if embeddings is not None else None,
+            }
+            for i, chunk_id in enumerate(fetched["ids"])
+        }
 
     def _get_rule_results(
         self, message: str, seen_ids: set[str], retrieved: list[RetrievalResult]
     ) -> None:
-        """If message contains a CERT-style rule id, prepend that chunk and mark ids seen."""
-        rule_id_match = re.search(r"([A-Z]{3,}\d+-C(?:PP)?)", message.upper())
-        if not rule_id_match:
+        """If message contains CERT-style rule ids, prepend their chunks and mark ids seen."""
+        rule_ids = RuleIndex.find_rule_ids(message)
+        if not rule_ids:
             return
-        rule_id = rule_id_match.group(1)
+        if self.rule_index is not None:
+            rule_results = self.rule_index.lookup(rule_ids)
+        else:
+            rule_results = self._get_rule_results_from_collection(rule_ids)
+        for result in rule_results:
+            if result["id"] in seen_ids:
+                continue
+            seen_ids.add(result["id"])
+            if result["content"]:
+                retrieved.append(result)
+
+    def _get_rule_results_from_collection(
+        self, rule_ids: list[str]
+    ) -> list[RetrievalResult]:
+        """Fetch rule chunks with a metadata filter (used without a RuleIndex)."""
         rule_results = self.collection.get(
-            where={"rule_id": rule_id}, include=["documents", "metadatas"]
+            where={"rule_id": {"$in": rule_ids}}, include=["documents", "metadatas"]
         )
-        if not rule_results["ids"]:
-            return
+        documents = rule_results.get("documents") or []
+        metadatas = rule_results.get("metadatas") or []
+        results: list[RetrievalResult] = []
         for idx, doc_id in enumerate(rule_results["ids"]):
-            seen_ids.add(doc_id)
-            documents = rule_results.get("documents")
-            if not documents or idx >= len(documents) or not documents[idx]:
-                continue
-            doc = documents[idx]
-            meta = rule_results["metadatas"][idx] if rule_results["metadatas"] else {}
-            retrieved.append({"content": doc, "metadata": meta, "distance": 0.0})
+            doc = documents[idx] if idx < len(documents) else ""
+            meta = metadatas[idx] if idx < len(metadatas) else {}
+            results.append(
+                {
+                    "id": doc_id,
+                    "content": doc,
+                    "metadata": meta,
+                    "distance": 0.0,
+                    "embedding": None,
+                }
+            )
+        order = {rule_id: i for i, rule_id in enumerate(rule_ids)}
+        results.sort(key=lambda r: order.get(str(r["metadata"].get("rule_id")), 0))
+        return results
 
     @staticmethod
-    def _get_metadata(results: QueryResult, i: int) -> Metadata:
-        """Get metadata for i-th document in Chroma query result."""
+    def _get_metadata(results: QueryResult, i: int, row: int = 0) -> Metadata:
+        """Get metadata for i-th document of row in Chroma query result."""
         metadatas = results.get("metadatas")
-        if not metadatas or not metadatas[0]:
+        if not metadatas or not metadatas[row]:
             return {}
-        if i >= len(metadatas[0]):
+        if i >= len(metadatas[row]):
             return {}
-        return metadatas[0][i]
+        return metadatas[row][i]
 
     @staticmethod
-    def _get_distance(results: QueryResult, i: int) -> float | None:
-        """Get distance for i-th document in Chroma query result."""
+    def _get_distance(results: QueryResult, i: int, row: int = 0) -> float | None:
+        """Get distance for i-th document of row in Chroma query result."""
         distances = results.get("distances")
-        if not distances or not distances[0]:
+        if not distances or not distances[row]:
             return None
-        if i >= len(distances[0]):
+        if i >= len(distances[row]):
+            return None
+        return distances[row][i]
+
+    @staticmethod
+    def _get_embedding(results: QueryResult, i: int, row: int = 0) -> Embedding | None:
+        """Get embedding for i-th document of row in Chroma query result."""
+        embeddings = results.get("embeddings")
+        if embeddings is None or len(embeddings) <= row or i >= len(embeddings[row]):
             return None
-        return distances[0][i]
+        return embeddings[row][i]
@@ -0,0 +1,148 @@
+"""In-memory rule_id index: serve CERT-style rule lookups without a metadata scan."""
+
+import logging
+import re
+import threading
+from typing import Any
+
+from chromadb import Collection, Metadata
+
+from chroma.models import RetrievalResult
+
+logger = logging.getLogger("RuleIndex")
+
+# rule_id: (3 or more uppercase letters)(digits)-C(optional PP)
+RULE_ID_PATTERN = re.compile(r"[A-Z]{3,}\d+-C(?:PP)?")
+
+
+class RuleIndex:
+    """
+    Maps rule_id to the chunks whose metadata carries it.
+    Built from the collection at startup, then kept in sync as a collection
+    listener on ChromaIndexer.
+    """
+
+    LOAD_PAGE_SIZE = 1000
+
+    def __init__(self) -> None:
+        # rule_id -> chunk id -> chunk (insertion order = index order)
+        self._rules: dict[str, dict[str, RetrievalResult]] = {}
+        # chunk id -> rule_id, to move or drop chunks on update/delete
+        self._chunk_rules: dict[str, str] = {}
+        # collection last loaded, where upserted rule chunks' embeddings are read
+        self._collection: Collection | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    @staticmethod
+    def find_rule_ids(message: str) -> list[str]:
+        """Return unique rule ids mentioned in message, in order of appearance."""
+        return list(dict.fromkeys(RULE_ID_PATTERN.findall(message.upper())))
+
+    def load(self, collection: Collection) -> None:
+        """Replace index contents with every rule chunk in collection."""
+        rule_ids: dict[str, str] = {}
+        offset = 0
+        while True:
+            page = collection.get(
+                include=["metadatas"], limit=self.LOAD_PAGE_SIZE, offset=offset
+            )
+            ids = page["ids"]
+            for chunk_id, meta in zip(ids, page.get("metadatas") or []):
+                rule_id = (meta or {}).get("rule_id")
+                if isinstance(rule_id, str):
+                    rule_ids[chunk_id] = rule_id
+            if len(ids) < self.LOAD_PAGE_SIZE:
+                break
+            offset += len(ids)
+        rules: dict[str, dict[str, RetrievalResult]] = {}
+        if rule_ids:
+            chunks = collection.get(
+                ids=list(rule_ids), include=["documents", "metadatas", "embeddings"]
+            )
+            documents = chunks.get("documents") or []
+            metadatas = chunks.get("metadatas") or []
+            embeddings = chunks.get("embeddings")
+            for i, chunk_id in enumerate(chunks["ids"]):
+                rules.setdefault(rule_ids[chunk_id], {})[chunk_id] = {
+                    "id": chunk_id,
+                    "content": documents[i],
+                    "metadata": metadatas[i] or {},
+                    "distance": 0.0,
+                    "embedding": embeddings[i] if embeddings is not None else None,
+                }
+        with self._lock:
+            self._rules = rules
+            self._chunk_rules = rule_ids
+            self._collection = collection
+        logger.info(f"Loaded {len(rules)} rule ids ({len(rule_ids)} chunks)")
+
+    def lookup(self, rule_ids: list[str]) -> list[RetrievalResult]:
+        """Return chunks for rule_ids, grouped in the order rule_ids are given."""
+        results = []
+        with self._lock:
+            for rule_id in rule_ids:
+                results.extend(self._rules.get(rule_id, {}).values())
+        return results
+
+    # collection listener hooks (see ChromaIndexer)
+    def on_upsert(
+        self, ids: list[str], documents: list[str], metadatas: list[Metadata]
+    ) -> None:
+        # embeddings as load() keeps them, so MMR treats rule chunks indexed
+        # since startup the same as after a restart
+        embeddings = self._embeddings(
+            [
+                i
+                for i, meta in zip(ids, metadatas)
+                if isinstance(meta.get("rule_id"), str)
+            ]
+        )
+        with self._lock:
+            for chunk_id, doc, meta in zip(ids, documents, metadatas):
+                self._discard(chunk_id)
+                rule_id = meta.get("rule_id")
+                if not isinstance(rule_id, str):
+                    continue
+                self._rules.setdefault(rule_id, {})[chunk_id] = {
+                    "id": chunk_id,
+                    "content": doc,
+                    "metadata": meta,
+                    "distance": 0.0,
+                    "embedding": embeddings.get(chunk_id),
+                }
+                self._chunk_rules[chunk_id] = rule_id
+
+    def on_delete(self, ids: list[str]) -> None:
+        with self._lock:
+            for chunk_id in ids:
+                self._discard(chunk_id)
+
+    def _embeddings(self, ids: list[str]) -> dict[str, Any]:
+        """Stored embeddings of chunks ids, by id ({} if they can't be read)."""
+        collection = self._collection
+        if not ids or collection is None:
+            return {}
+        try:
+            chunks = collection.get(ids=ids, include=["embeddings"])
+        except Exception as e:
+            logger.warning(f"Error reading embeddings of rule chunks: {e}")
+            return {}
+        embeddings = chunks.get("embeddings")
+        if embeddings is None:
+            return {}
+        return dict(zip(chunks["ids"], embeddings))
+
+    def _discard(self, chunk_id: str) -> None:
+        """Remove chunk_id from its rule, if any. Caller holds the lock."""
+        rule_id = self._chunk_rules.pop(chunk_id, None)
+        if rule_id is None:
+            return
+        chunks = self._rules.get(rule_id)
+        if chunks is None:
+            return
+        chunks.pop(chunk_id, None)
+        if not chunks:
+            del self._rules[rule_id]
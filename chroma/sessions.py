@@ -0,0 +1,266 @@
+"""Conversation memory per session_id: recent turns plus a compacted summary of older ones."""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Protocol
+
+from chroma.models import SessionState
+from chroma.rule_index import RuleIndex
+
+logger = logging.getLogger("SessionStore")
+
+# words that point back at an earlier turn ("what about its exceptions?")
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|it's|this|that|these|those|they|them|their|above|previous|"
+    r"same|also|else|more|example|examples|why|how about|what about)\b",
+    re.IGNORECASE,
+)
+
+
+class SessionBackend(Protocol):
+    """Where SessionStore keeps state; expired or evicted sessions read as None."""
+
+    def get(self, session_id: str) -> SessionState | None: ...
+
+    def set(self, session_id: str, state: SessionState) -> None: ...
+
+    def delete(self, session_id: str) -> None: ...
+
+
+class InMemorySessionBackend:
+    """LRU of up to max_sessions sessions in this process, expiring after ttl seconds."""
+
+    DEFAULT_MAX_SESSIONS = 1000
+    DEFAULT_TTL = 3600.0  # seconds
+
+    def __init__(
+        self, max_sessions: int = DEFAULT_MAX_SESSIONS, ttl: float = DEFAULT_TTL
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: OrderedDict[str, SessionState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> SessionState | None:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return None
+            if time.time() - state["updated"] > self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return state
+
+    def set(self, session_id: str, state: SessionState) -> None:
+        with self._lock:
+            self._sessions[session_id] = state
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class FileSessionBackend:
+    """
+    One JSON file per session under directory, so every server process on the
+    host sees the same sessions. Writes are atomic; concurrent writes to one
+    session keep the last. The least recently written files beyond
+    max_sessions are removed when a new session is created.
+    """
+
+    def __init__(
+        self,
+        directory: Path | str,
+        max_sessions: int = InMemorySessionBackend.DEFAULT_MAX_SESSIONS,
+        ttl: float = InMemorySessionBackend.DEFAULT_TTL,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+
+    def get(self, session_id: str) -> SessionState | None:
+        path = self._path(session_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state: SessionState = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Error loading session {session_id}: {e}")
+            return None
+        if time.time() - state["updated"] > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return state
+
+    def set(self, session_id: str, state: SessionState) -> None:
+        path = self._path(session_id)
+        is_new = not path.exists()
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.error(f"Error saving session {session_id}: {e}")
+            return
+        if is_new:
+            self._evict()
+
+    def delete(self, session_id: str) -> None:
+        self._path(session_id).unlink(missing_ok=True)
+
+    def _path(self, session_id: str) -> Path:
+        # session ids come from clients: keep them to a safe file name
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)
+        return self.directory / f"{safe}.json"
+
+    def _evict(self) -> None:
+        files = list(self.directory.glob("*.json"))
+        if len(files) <= self.max_sessions:
+            return
+        # another process may delete files between glob and stat
+        ages: dict[Path, float] = {}
+        for file in files:
+            mtime = self._mtime(file)
+            if mtime is not None:
+                ages[file] = mtime
+        by_age = sorted(ages, key=ages.__getitem__)
+        for old in by_age[: len(ages) - self.max_sessions]:
+            old.unlink(missing_ok=True)
+
+    @staticmethod
+    def _mtime(file: Path) -> float | None:
+        """Modification time of file, or None if it is gone."""
+        try:
+            return file.stat().st_mtime
+        except OSError:
+            return None
+
+
+class SessionStore:
+    """
+    Keeps the recent turns of each session within max_tokens (estimated as
+    characters / CHARS_PER_TOKEN). Older turns are compacted into one summary
+    line each (question and the first sentence of the answer); the oldest
+    summary lines are dropped when those no longer fit either.
+    """
+
+    DEFAULT_MAX_TOKENS = 1000
+    CHARS_PER_TOKEN = 4
+    SUMMARY_ANSWER_CHARS = 160  # answer excerpt kept per summarized turn
+    FOLLOW_UP_WORDS = 6  # messages this short are treated as follow-ups
+
+    def __init__(
+        self, backend: SessionBackend, max_tokens: int = DEFAULT_MAX_TOKENS
+    ) -> None:
+        self.backend = backend
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def get(self, session_id: int | str) -> SessionState | None:
+        return self.backend.get(str(session_id))
+
+    def add_turn(self, session_id: int | str, question: str, answer: str) -> None:
+        """Append a turn, compacting older turns to stay within max_tokens."""
+        with self._lock:
+            state = self.backend.get(str(session_id)) or {
+                "summary": "",
+                "turns": [],
+                "updated": 0.0,
+            }
+            state["turns"].append({"question": question, "answer": answer})
+            self._compact(state)
+            state["updated"] = time.time()
+            self.backend.set(str(session_id), state)
+
+    def clear(self, session_id: int | str) -> None:
+        self.backend.delete(str(session_id))
+
+    def condense_query(self, state: SessionState | None, message: str) -> str:
+        """
+        Retrieval query for message. A follow-up (short, or referring back with
+        "it", "that", ...) without its own rule id is prefixed with the previous
+        question, so retrieval finds the topic being discussed.
+        """
+        if not state or not state["turns"] or RuleIndex.find_rule_ids(message):
+            return message
+        is_follow_up = len(
+            message.split()
+        ) <= self.FOLLOW_UP_WORDS or FOLLOW_UP_PATTERN.search(message)
+        if not is_follow_up:
+            return message
+        return f"{state['turns'][-1]['question']} {message}"
+
+    @staticmethod
+    def format_history(state: SessionState | None) -> str:
+        """Summary and recent turns as prompt text ("" without history)."""
+        if not state:
+            return ""
+        parts = []
+        if state["summary"]:
+            parts.append(f"Summary of earlier conversation:\n{state['summary']}")
+        for turn in state["turns"]:
+            parts.append(f"User: {turn['question']}\nAssistant: {turn['answer']}")
+        return "\n\n".join(parts)
+
+    def _compact(self, state: SessionState) -> None:
+        """
+        Move oldest turns into the summary, then drop the oldest summary lines,
+        until the history fits max_tokens. The newest turn stays verbatim unless
+        it alone is too long; then its answer, and if need be its question, are
+        cut to fit.
+        """
+        max_chars = self.max_tokens * self.CHARS_PER_TOKEN
+        lines = state["summary"].split("\n") if state["summary"] else []
+        while len(state["turns"]) > 1 and len(self.format_history(state)) > max_chars:
+            turn = state["turns"].pop(0)
+            lines.append(
+                f"- {turn['question']} -> {self._first_sentence(turn['answer'])}"
+            )
+            state["summary"] = "\n".join(lines)
+        while lines and len(self.format_history(state)) > max_chars:
+            lines.pop(0)
+            state["summary"] = "\n".join(lines)
+        if not state["turns"]:
+            return
+        latest = state["turns"][-1]
+        overflow = len(self.format_history(state)) - max_chars
+        if overflow > 0:
+            answer = latest["answer"]
+            latest["answer"] = self._truncate(answer, len(answer) - overflow)
+            overflow = len(self.format_history(state)) - max_chars
+        if overflow > 0:
+            question = latest["question"]
+            latest["question"] = self._truncate(question, len(question) - overflow)
+
+    @classmethod
+    def _first_sentence(cls, text: str) -> str:
+        text = " ".join(text.split())
+        end = re.search(r"[.!?](\s|$)", text)
+        sentence = text[: end.end()].strip() if end else text
+        return cls._truncate(sentence, cls.SUMMARY_ANSWER_CHARS)
+
+    @staticmethod
+    def _truncate(text: str, chars: int) -> str:
+        """text cut to at most chars characters, ending in "..." when cut."""
+        if len(text) <= chars:
+            return text
+        if chars <= 3:
+            return text[: max(chars, 0)]
+        return text[: chars - 3].rstrip() + "..."
@@ -1,8 +1,18 @@
 """Chunking: split on chapter headers then by size with RecursiveCharacterTextSplitter"""
 
+import mmap
+import os
 import re
+from collections.abc import Iterator
+from functools import cached_property
+from typing import TYPE_CHECKING, AnyStr
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+if TYPE_CHECKING:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# chapter-level header at the start of a line
+HEADER_PATTERN = re.compile(r"^## ", re.MULTILINE)
+HEADER_PATTERN_BYTES = re.compile(rb"^## ", re.MULTILINE)
 
 
 class TextSplitter:
@@ -16,8 +26,16 @@ class TextSplitter:
         chunk_size: int = DEFAULT_CHUNK_SIZE,
         chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
     ) -> None:
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    @cached_property
+    def text_splitter(self) -> "RecursiveCharacterTextSplitter":
+        # langchain is slow to import and only needed once something is indexed
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        return RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
         )
 
     def split(self, file: str) -> list[str]:
@@ -25,36 +43,52 @@ class TextSplitter:
         Read .md file, split on headers, then by chunk_size/overlap.
         Return list of chunk strings.
         """
+        return list(self.iter_split(file))
+
+    def iter_split(self, file: str) -> Iterator[str]:
+        """
+        Yield the chunks of split(file) lazily.
+        The file is memory-mapped and scanned once for headers; only the section
+        being chunked is decoded, so memory stays bounded by the largest section.
+        """
         if not file.endswith(".md"):
             raise ValueError(f"File {file} is not a markdown file")
-        with open(file, "r", encoding="utf-8") as f:
-            text = f.read()
-        sections = self._split_on_headers(text)
-        if not sections:
-            sections = [text]
-        all_chunks = []
-        for section in sections:
-            section_chunks = self.text_splitter.split_text(section)
-            all_chunks.extend(section_chunks)
-        return all_chunks
+        for section in self._iter_sections(file):
+            yield from self.text_splitter.split_text(section)
 
-    @staticmethod
-    def _split_on_headers(text: str) -> list[str]:
+    @classmethod
+    def _iter_sections(cls, file: str) -> Iterator[str]:
+        with open(file, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data.find(b"\r") != -1:
+                    # text mode turns \r\n and \r into \n: read it that way instead
+                    with open(file, "r", encoding="utf-8") as text_file:
+                        yield from cls._split_on_headers(text_file.read())
+                    return
+                for start, end in cls._section_bounds(data, HEADER_PATTERN_BYTES):
+                    yield data[start:end].decode("utf-8")
+
+    @classmethod
+    def _split_on_headers(cls, text: str) -> list[str]:
         """Split on chapter-level headers into sections"""
-        header_pattern = r"^## "
-        sections = []
-        current_section = []
-        lines = text.split("\n")
-        for line in lines:
-            match = re.match(header_pattern, line)
-            if not match:
-                current_section.append(line)
-                continue
-            # if header matches
-            if current_section:  # add current section to sections
-                sections.append("\n".join(current_section))
-            # start new section
-            current_section = [line]
-        if current_section:  # add last section
-            sections.append("\n".join(current_section))
-        return sections
+        return [
+            text[start:end] for start, end in cls._section_bounds(text, HEADER_PATTERN)
+        ]
+
+    @staticmethod
+    def _section_bounds(
+        text: AnyStr | mmap.mmap, pattern: "re.Pattern[AnyStr]"
+    ) -> Iterator[tuple[int, int]]:
+        """
+        Yield (start, end) of each section: text before the first header (if any),
+        then each header up to the next one. The newline ending a section is dropped.
+        """
+        start = 0
+        for match in pattern.finditer(text):  # type: ignore[arg-type]
+            header = match.start()
+            if header > 0:
+                yield start, header - 1
+            start = header
+        yield start, len(text)
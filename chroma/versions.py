@@ -0,0 +1,102 @@
+"""Versioned collections for blue-green rebuilds: which version is live, which are kept."""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger("CollectionVersions")
+
+
+class CollectionVersions:
+    """
+    Tracks the versions of one logical collection in a JSON file:
+    {"active": "<collection name>", "versions": [oldest, ..., newest]}.
+    Without a file, the unversioned collection called name is the only version,
+    so existing databases keep working.
+    """
+
+    def __init__(self, version_file: Path | str, name: str) -> None:
+        self.version_file = Path(version_file)
+        self.name = name
+        self.active = name
+        self.versions = [name]
+        self._mtime: float | None = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        if not self.version_file.exists():
+            return
+        try:
+            mtime = self.version_file.stat().st_mtime
+            with open(self.version_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Error loading collection versions: {e}")
+            return
+        with self._lock:
+            self.active = data["active"]
+            self.versions = data["versions"]
+            self._mtime = mtime
+
+    def save(self) -> None:
+        """Write the file atomically, so readers never see a partial pointer."""
+        self.version_file.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {"active": self.active, "versions": self.versions}
+        fd, tmp = tempfile.mkstemp(dir=self.version_file.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp, self.version_file)
+        self._mtime = self.version_file.stat().st_mtime
+
+    def in_use(self) -> bool:
+        """True once a version has been published (the version file exists)."""
+        return self.version_file.exists()
+
+    def changed_on_disk(self) -> bool:
+        """True if another process saved the file since it was last loaded or saved."""
+        try:
+            mtime = self.version_file.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return mtime != self._mtime
+
+    def next_version(self) -> str:
+        """Name for a new version: name-v<n>, n one more than any version so far."""
+        numbers = [0]
+        for version in self.versions:
+            prefix = f"{self.name}-v"
+            if version.startswith(prefix) and version[len(prefix) :].isdigit():
+                numbers.append(int(version[len(prefix) :]))
+        return f"{self.name}-v{max(numbers) + 1}"
+
+    def previous(self) -> str | None:
+        """Version active before the current one, or None."""
+        with self._lock:
+            index = self.versions.index(self.active)
+            return self.versions[index - 1] if index > 0 else None
+
+    def activate(self, version: str) -> None:
+        """Make version live (appending it if new) and save."""
+        with self._lock:
+            if version not in self.versions:
+                self.versions.append(version)
+            self.active = version
+        self.save()
+
+    def stale(self, keep: int) -> list[str]:
+        """Versions beyond the newest keep ones before the active version."""
+        with self._lock:
+            index = self.versions.index(self.active)
+            return self.versions[: max(0, index - keep)]
+
+    def remove(self, version: str) -> None:
+        if version == self.active:
+            raise ValueError(f"Cannot remove active version {version}")
+        with self._lock:
+            self.versions.remove(version)
+        self.save()
@@ -0,0 +1,212 @@
+"""Watch collection_path and re-index changed files on a background thread."""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from chroma.models import CollectionResult, WatcherStatus
+
+logger = logging.getLogger("FileWatcher")
+
+WATCHED_SUFFIXES = (".md", ".pdf")
+
+# (changed or added paths, deleted paths) -> result, e.g. RagClient.update_files
+UpdateFiles = Callable[[list[str], list[str]], CollectionResult]
+
+
+class FileWatcher:
+    """
+    Collects changes to .md/.pdf files under path and, once no new change has
+    arrived for debounce seconds, passes only those paths to update_files.
+
+    Backends: "inotify" uses watchfiles (inotify on Linux, native events
+    elsewhere); "poll" compares mtime/size snapshots every poll_interval seconds;
+    "auto" picks inotify when watchfiles is installed.
+    """
+
+    DEFAULT_DEBOUNCE = 1.0  # seconds
+    DEFAULT_POLL_INTERVAL = 2.0  # seconds
+
+    def __init__(
+        self,
+        path: Path | str,
+        update_files: UpdateFiles,
+        backend: str = "auto",
+        debounce: float = DEFAULT_DEBOUNCE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_depth: int = 3,
+    ) -> None:
+        if backend not in ("auto", "inotify", "poll"):
+            raise ValueError(f"Unknown watcher backend: {backend}")
+        if backend == "auto":
+            backend = "inotify" if self._has_watchfiles() else "poll"
+        self.path = Path(path)
+        self.update_files = update_files
+        self.backend = backend
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.max_depth = max_depth
+        # path -> True if deleted, False if added/changed (latest event wins)
+        self._pending: dict[str, bool] = {}
+        self._last_event = 0.0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._indexing = False
+        self._last_index_time: float | None = None
+        self._last_result = CollectionResult(files=[], errors=[])
+
+    def start(self) -> None:
+        """Start the watch and index threads (daemon threads)."""
+        if self._threads:
+            return
+        self._stop.clear()
+        # take the baseline before returning, so later edits are never missed
+        snapshot = self._snapshot() if self.backend == "poll" else {}
+        watch = self._poll if self.backend == "poll" else self._watch_inotify
+        self._threads = [
+            threading.Thread(
+                target=watch, args=(snapshot,), name="watcher", daemon=True
+            ),
+            threading.Thread(
+                target=self._index_loop, name="watcher-index", daemon=True
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Watching {self.path} ({self.backend})")
+
+    def stop(self) -> None:
+        """Stop watching; a batch already being indexed is finished first."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def status(self) -> WatcherStatus:
+        with self._cond:
+            return WatcherStatus(
+                running=bool(self._threads) and not self._stop.is_set(),
+                backend=self.backend,
+                queue_depth=len(self._pending),
+                indexing=self._indexing,
+                last_index_time=self._last_index_time,
+                last_files=self._last_result.files,
+                last_errors=self._last_result.errors,
+            )
+
+    def record(self, path: str, deleted: bool) -> None:
+        """Queue a change to path; restarts the debounce window."""
+        if Path(path).suffix.lower() not in WATCHED_SUFFIXES:
+            return
+        with self._cond:
+            self._pending[str(Path(path).resolve())] = deleted
+            self._last_event = time.monotonic()
+            self._cond.notify_all()
+
+    def _index_loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            changed = [path for path, deleted in batch.items() if not deleted]
+            deleted = [path for path, is_deleted in batch.items() if is_deleted]
+            try:
+                result = self.update_files(changed, deleted)
+            except Exception as e:
+                logger.error(f"Error indexing watched files: {e}")
+                result = CollectionResult(files=[], errors=[str(e)])
+            with self._cond:
+                self._indexing = False
+                self._last_index_time = time.time()
+                self._last_result = result
+            logger.info(
+                f"Re-indexed {len(changed)} changed, {len(deleted)} deleted paths: "
+                f"files {result.files}, errors {result.errors}"
+            )
+
+    def _next_batch(self) -> dict[str, bool] | None:
+        """Wait until changes have been quiet for debounce seconds; None on stop."""
+        with self._cond:
+            while not self._stop.is_set():
+                if self._pending:
+                    remaining = self.debounce - (time.monotonic() - self._last_event)
+                    if remaining <= 0:
+                        batch, self._pending = self._pending, {}
+                        self._indexing = True
+                        return batch
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+        return None
+
+    def _poll(self, snapshot: dict[str, tuple[float, int]]) -> None:
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            for path, stat in current.items():
+                if snapshot.get(path) != stat:
+                    self.record(path, deleted=False)
+            for path in snapshot.keys() - current.keys():
+                self.record(path, deleted=True)
+            snapshot = current
+
+    def _snapshot(self) -> dict[str, tuple[float, int]]:
+        """Map each watched file to (mtime, size)."""
+        snapshot = {}
+        for filepath in self._walk(self.path, 0):
+            try:
+                stat = filepath.stat()
+            except OSError:  # deleted while walking
+                continue
+            snapshot[str(filepath.resolve())] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+    def _walk(self, path: Path, depth: int) -> Iterator[Path]:
+        if depth > self.max_depth or not path.is_dir():
+            return
+        try:
+            entries = list(path.iterdir())
+        except OSError:  # deleted or unreadable while walking
+            return
+        for filepath in entries:
+            if filepath.is_dir():
+                yield from self._walk(filepath, depth + 1)
+            elif filepath.suffix.lower() in WATCHED_SUFFIXES:
+                yield filepath
+
+    def _watch_inotify(self, _snapshot: dict[str, tuple[float, int]]) -> None:
+        from watchfiles import Change, watch
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        for changes in watch(
+            self.path,
+            watch_filter=lambda _, path: self._is_watched(path),
+            debounce=200,  # ms; the index thread applies self.debounce
+            stop_event=self._stop,
+            rust_timeout=500,
+            yield_on_timeout=False,
+        ):
+            for change, path in changes:
+                self.record(path, deleted=change == Change.deleted)
+
+    def _is_watched(self, path: str) -> bool:
+        """Watched suffix, at most max_depth directories below self.path."""
+        if not path.lower().endswith(WATCHED_SUFFIXES):
+            return False
+        try:
+            relative = Path(path).resolve().relative_to(self.path.resolve())
+        except ValueError:
+            return False
+        return len(relative.parts) - 1 <= self.max_depth
+
+    @staticmethod
+    def _has_watchfiles() -> bool:
+        try:
+            import watchfiles  # noqa: F401
+        except ImportError:
+            return False
+        return True
@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+# Test POST /chat/stream endpoint (Server-Sent Events)
+
+BASE_URL="${BASE_URL:-http://127.0.0.1:8000}"
+
+curl -N -X POST ${BASE_URL}/chat/stream \
+  -H "Content-Type: application/json" \
+  -d '{"message": "What is PRE30-C?", "session_id": 1}'
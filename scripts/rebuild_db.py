@@ -0,0 +1,37 @@
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+from chroma.config import create_rag_client
+
+logger = logging.getLogger("rebuild_db")
+
+
+# Load environment variables
+load_dotenv()
+
+
+def main() -> None:
+    logging.basicConfig(
+        filename="chatbot.log",
+        level=logging.INFO,
+        format="[%(asctime)s][%(levelname)s][%(name)s][%(message)s]",
+    )
+    rag_client = create_rag_client()
+    # Roll back: python -m scripts.rebuild_db rollback [version]
+    if len(sys.argv) > 1 and sys.argv[1] == "rollback":
+        version = rag_client.rollback(sys.argv[2] if len(sys.argv) > 2 else None)
+        logger.info(f"Rolled back to {version}")
+        return
+    # Build a new collection version and make it live
+    response = rag_client.rebuild_collection()
+    log = f"Collection rebuilt: {rag_client.versions.active}, {len(response.files)} Files indexed: {response.files}, Errors: {response.errors}"
+    if response.errors:
+        logger.error(log)
+    else:
+        logger.info(log)
+
+
+if __name__ == "__main__":
+    main()
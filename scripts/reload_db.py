@@ -1,9 +1,8 @@
 import logging
-import os
 
 from dotenv import load_dotenv
 
-from chroma import RagClient
+from chroma.config import create_rag_client
 
 logger = logging.getLogger("reload_db")
 
@@ -11,14 +10,6 @@ logger = logging.getLogger("reload_db")
 # Load environment variables
 load_dotenv()
 
-# instantiate RagClient
-rag_client = RagClient(
-    name=os.getenv("COLLECTION_NAME", "my-collection"),
-    persistent_storage=os.getenv("PERSISTENT_STORAGE", "./chroma_db"),
-    collection_path=os.getenv("COLLECTION_PATH", "source_docs"),
-    hash_filename=os.getenv("HASH_FILE", "file_hashes.json"),
-)
-
 
 def main() -> None:
     logging.basicConfig(
@@ -26,13 +17,24 @@ def main() -> None:
         level=logging.INFO,
         format="[%(asctime)s][%(levelname)s][%(name)s][%(message)s]",
     )
-    # Reload documents
-    response = rag_client.reload_collection()
+    rag_client = create_rag_client()
+    # Reload documents; once rebuild_db has made versions, publish a new one
+    # instead of writing in place, which running query workers don't see
+    if rag_client.versions.in_use():
+        response = rag_client.publish_collection()
+    else:
+        response = rag_client.reload_collection()
     log = f"Collection reloaded: {len(response.files)} Files indexed: {response.files}, Errors: {response.errors}"
     if response.errors:
         logger.error(log)
     else:
         logger.info(log)
+    for stage in response.stages:
+        logger.info(
+            f"Stage {stage.name}: {stage.items} items, {stage.errors} errors, "
+            f"busy {stage.busy_seconds:.2f}s, waiting {stage.wait_seconds:.2f}s, "
+            f"{stage.items_per_second:.2f} items/s"
+        )
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ import os
 
 from dotenv import load_dotenv
 
-from chroma import RagClient
+from chroma.config import create_rag_client
 
 logger = logging.getLogger("remove_db_files")
 
@@ -11,14 +11,6 @@ logger = logging.getLogger("remove_db_files")
 # Load environment variables
 load_dotenv()
 
-# instantiate RagClient
-rag_client = RagClient(
-    name=os.getenv("COLLECTION_NAME", "my-collection"),
-    persistent_storage=os.getenv("PERSISTENT_STORAGE", "./chroma_db"),
-    collection_path=os.getenv("COLLECTION_PATH", "source_docs"),
-    hash_filename=os.getenv("HASH_FILE", "file_hashes.json"),
-)
-
 
 def main() -> None:
     logging.basicConfig(
@@ -39,8 +31,21 @@ def main() -> None:
     # Convert to full paths
     base_folder = os.getenv("COLLECTION_PATH", "source_docs")
     files = [os.path.join(base_folder, line) for line in lines]
-    # Remove file from collection
-    files_removed = rag_client.indexer.remove_files(files=files)
+    if not files:
+        return
+    # created after input, so the prompt appears without waiting for Chroma
+    rag_client = create_rag_client()
+    # Remove file from collection; once rebuild_db has made versions, publish
+    # a new one instead of deleting in place, which query workers don't see
+    if rag_client.versions.in_use():
+        response = rag_client.publish_files([], files)
+        files_removed = response.files
+        for error in response.errors:
+            logger.error(error)
+    else:
+        files_removed = rag_client.indexer.remove_files(files=files)
+        if rag_client.lexical_index is not None:
+            rag_client.lexical_index.save()
     logger.info(f"Files removed: {files_removed}")
 
 
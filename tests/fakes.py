@@ -0,0 +1,40 @@
+"""Test doubles shared by unit tests (no network, no model download)."""
+
+import hashlib
+import uuid
+
+import chromadb
+from chromadb import Collection, Documents, EmbeddingFunction, Embeddings
+
+
+class FakeEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Deterministic embedding from the sha256 of each text (8 dims)."""
+
+    def __init__(self) -> None:
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = []
+        for text in input:
+            digest = hashlib.sha256(text.encode("utf-8")).digest()
+            embeddings.append([b / 255 for b in digest[:8]])
+        return embeddings  # type: ignore[return-value]
+
+    @staticmethod
+    def name() -> str:
+        return "fake"
+
+    def get_config(self) -> dict:
+        return {}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "FakeEmbeddingFunction":
+        return FakeEmbeddingFunction()
+
+
+def make_collection() -> Collection:
+    """Return an empty in-memory collection with a unique name."""
+    client = chromadb.EphemeralClient()
+    return client.create_collection(
+        f"test-{uuid.uuid4().hex}", embedding_function=FakeEmbeddingFunction()
+    )
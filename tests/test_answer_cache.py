@@ -0,0 +1,91 @@
+"""Unit tests for semantic answer cache.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_answer_cache -v
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from chroma.answer_cache import AnswerCache
+from tests.fakes import FakeEmbeddingFunction
+
+
+class TestAnswerCache(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_file = Path(tmp.name) / "answer_cache.json"
+
+    def make_cache(self, **kwargs) -> AnswerCache:
+        return AnswerCache(self.cache_file, FakeEmbeddingFunction(), **kwargs)
+
+    def test_same_question_same_chunks_hits(self) -> None:
+        cache = self.make_cache()
+        cache.store("What is PRE30-C?", ["a", "b"], "reply")
+        self.assertEqual(cache.lookup("What is PRE30-C?", ["b", "a"]), "reply")
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_different_chunks_miss(self) -> None:
+        cache = self.make_cache()
+        cache.store("What is PRE30-C?", ["a", "b"], "reply")
+        self.assertIsNone(cache.lookup("What is PRE30-C?", ["a", "c"]))
+
+    def test_distant_question_misses(self) -> None:
+        cache = self.make_cache(max_distance=0.0001)
+        cache.store("What is PRE30-C?", ["a"], "reply")
+        self.assertIsNone(cache.lookup("Explain DCL30-C", ["a"]))
+
+    def test_lru_eviction(self) -> None:
+        cache = self.make_cache(max_size=2)
+        cache.store("q1", ["a"], "r1")
+        cache.store("q2", ["b"], "r2")
+        cache.lookup("q1", ["a"])  # q2 is now least recently used
+        cache.store("q3", ["c"], "r3")
+        self.assertIsNone(cache.lookup("q2", ["b"]))
+        self.assertEqual(cache.lookup("q1", ["a"]), "r1")
+
+    def test_persisted_across_instances(self) -> None:
+        cache = self.make_cache()
+        cache.store("q", ["a"], "reply")
+        cache.save()
+        self.assertEqual(self.make_cache().lookup("q", ["a"]), "reply")
+
+    def test_reindexed_chunk_invalidates(self) -> None:
+        cache = self.make_cache()
+        cache.store("q1", ["a", "b"], "r1")
+        cache.store("q2", ["c"], "r2")
+        cache.on_upsert(["b"], ["new text"], [{"source": "/f.md"}])
+        self.assertIsNone(cache.lookup("q1", ["a", "b"]))
+        self.assertEqual(cache.lookup("q2", ["c"]), "r2")
+        cache.on_delete(["c"])
+        self.assertEqual(self.make_cache().stats()["size"], 0)
+
+    def test_miss_then_store_embeds_question_once(self) -> None:
+        cache = self.make_cache()
+        cache.store("q1", ["a"], "r1")
+        with mock.patch.object(
+            cache, "embedding_function", wraps=cache.embedding_function
+        ) as embed:
+            self.assertIsNone(cache.lookup("far away question", ["a"]))
+            cache.store("far away question", ["a"], "r2")
+        self.assertEqual(embed.call_count, 1)
+
+    def test_malformed_persisted_entries_skipped(self) -> None:
+        cache = self.make_cache()
+        cache.store("q", ["a"], "reply")
+        cache.save()
+        entries = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        entries += [{"question": "no chunk ids"}, "not an entry"]
+        self.cache_file.write_text(json.dumps(entries), encoding="utf-8")
+        with self.assertLogs("AnswerCache", "WARNING"):
+            reloaded = self.make_cache()
+        self.assertEqual(reloaded.stats()["size"], 1)
+        self.assertEqual(reloaded.lookup("q", ["a"]), "reply")
+
+
+if __name__ == "__main__":
+    unittest.main()
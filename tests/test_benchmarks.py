@@ -0,0 +1,55 @@
+"""Unit tests for the benchmark corpus generator and timing helpers.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_benchmarks -v
+"""
+
+import tempfile
+import unittest
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.run import percentile, summarize
+from chroma.rule_index import RuleIndex
+from chroma.text_splitter import TextSplitter
+
+
+class TestCorpus(unittest.TestCase):
+    def test_markdown_has_rule_headers(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            md_files, pdf_files = generate_corpus(
+                tmp, md_files=2, pdf_files=0, chapters=2, rules=3
+            )
+            self.assertEqual(len(md_files), 2)
+            self.assertEqual(pdf_files, [])
+            chunks = TextSplitter().split(md_files[0])
+        rule_ids = {r for chunk in chunks for r in RuleIndex.find_rule_ids(chunk)}
+        self.assertEqual(len(rule_ids), 6)
+
+    def test_same_seed_same_corpus(self) -> None:
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            first = generate_corpus(a, md_files=1, pdf_files=0, seed=3)[0][0]
+            second = generate_corpus(b, md_files=1, pdf_files=0, seed=3)[0][0]
+            with (
+                open(first, encoding="utf-8") as f1,
+                open(second, encoding="utf-8") as f2,
+            ):
+                self.assertEqual(f1.read(), f2.read())
+
+
+class TestTimings(unittest.TestCase):
+    def test_summarize(self) -> None:
+        timings = summarize([0.4, 0.1, 0.3, 0.2])
+        self.assertEqual(timings["count"], 4)
+        self.assertAlmostEqual(timings["mean"], 0.25)
+        self.assertEqual(timings["min"], 0.1)
+        self.assertEqual(timings["max"], 0.4)
+        self.assertEqual(timings["p50"], 0.2)
+
+    def test_percentile_nearest_rank(self) -> None:
+        ordered = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(ordered, 95), 95.0)
+        self.assertEqual(percentile([1.0], 95), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
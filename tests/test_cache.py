@@ -0,0 +1,90 @@
+"""Unit tests for retrieval cache.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_cache -v
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+from chroma.cache import RetrievalCache
+from chroma.hash_manager import FileHashManager
+from chroma.indexer import ChromaIndexer
+from chroma.models import RetrievalResult
+from chroma.text_splitter import TextSplitter
+from tests.fakes import make_collection
+
+RESULTS: list[RetrievalResult] = [
+    {
+        "id": "1",
+        "content": "PRE30-C",
+        "metadata": {"source": "/c.md"},
+        "distance": 0.0,
+        "embedding": None,
+    }
+]
+
+
+class TestRetrievalCache(unittest.TestCase):
+    def test_key_normalizes_case_and_whitespace(self) -> None:
+        a = RetrievalCache.make_key("What is  PRE30-C?", 5)
+        b = RetrievalCache.make_key(" what is pre30-c? ", 5)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, RetrievalCache.make_key("what is pre30-c?", 6))
+
+    def test_hit_and_miss_counters(self) -> None:
+        cache = RetrievalCache()
+        key = cache.make_key("q", 5)
+        self.assertIsNone(cache.get(key))
+        cache.set(key, RESULTS, cache.generation)
+        self.assertEqual(cache.get(key), RESULTS)
+        self.assertEqual(cache.stats(), {"size": 1, "hits": 1, "misses": 1})
+
+    def test_lru_eviction(self) -> None:
+        cache = RetrievalCache(max_size=2)
+        for message in ["a", "b"]:
+            cache.set(cache.make_key(message, 1), RESULTS, cache.generation)
+        cache.get(cache.make_key("a", 1))  # "b" is now least recently used
+        cache.set(cache.make_key("c", 1), RESULTS, cache.generation)
+        self.assertIsNone(cache.get(cache.make_key("b", 1)))
+        self.assertIsNotNone(cache.get(cache.make_key("a", 1)))
+
+    def test_ttl_expiry(self) -> None:
+        cache = RetrievalCache(ttl=10)
+        key = cache.make_key("q", 5)
+        with mock.patch("chroma.cache.time.monotonic", return_value=100.0):
+            cache.set(key, RESULTS, cache.generation)
+        with mock.patch("chroma.cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get(key))
+
+    def test_set_after_clear_is_dropped(self) -> None:
+        cache = RetrievalCache()
+        key = cache.make_key("q", 5)
+        generation = cache.generation
+        cache.clear()
+        cache.set(key, RESULTS, generation)
+        self.assertIsNone(cache.get(key))
+
+
+class TestCacheInvalidation(unittest.TestCase):
+    def test_indexer_writes_clear_cache(self) -> None:
+        cache = RetrievalCache()
+        hash_manager = mock.Mock(spec=FileHashManager, file_hashes={})
+        indexer = ChromaIndexer(
+            make_collection(), threading.Lock(), TextSplitter(), hash_manager
+        )
+        indexer.add_listener(cache)
+        key = cache.make_key("q", 5)
+        cache.set(key, RESULTS, cache.generation)
+        indexer._add_chunks(
+            {"ids": ["id1"], "documents": ["text"], "metadatas": [{"source": "/a.md"}]}
+        )
+        self.assertIsNone(cache.get(key))
+        cache.set(key, RESULTS, cache.generation)
+        indexer.clear()
+        self.assertIsNone(cache.get(key))
+
+
+if __name__ == "__main__":
+    unittest.main()
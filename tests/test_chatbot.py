@@ -0,0 +1,171 @@
+"""Unit tests for the /chat endpoint (clients replaced by stubs, no network).
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_chatbot -v
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest import mock
+
+import httpx
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import chatbot
+from chroma.chroma import RagClient
+from chroma.llm_dispatcher import LlmDispatcher
+from chroma.metrics import Metrics
+from chroma.sessions import InMemorySessionBackend, SessionStore
+from tests.fakes import FakeEmbeddingFunction
+
+
+class StubRagClient:
+    """Retrieval that finds nothing; records answer cache lookups and stores."""
+
+    answer_cache = None
+    query_batcher = None
+
+    def __init__(self) -> None:
+        self.lookups: list[str] = []
+        self.stored: list[str] = []
+
+    def get_context(self, message: str, n_results: int = 50) -> dict[str, Any]:
+        return {"context": "", "results": []}
+
+    def get_cached_answer(self, query: str, results: list) -> None:
+        self.lookups.append(query)
+
+    def cache_answer(self, query: str, results: list, reply: str) -> None:
+        self.stored.append(query)
+
+
+def stub_genai(latency: float) -> SimpleNamespace:
+    async def generate_content(**kwargs: Any) -> SimpleNamespace:
+        await asyncio.sleep(latency)
+        return SimpleNamespace(text="stub reply")
+
+    return SimpleNamespace(
+        aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+    )
+
+
+class TestChat(unittest.TestCase):
+    def serve(
+        self,
+        rag_client: Any,
+        llm: LlmDispatcher,
+        max_chats: int,
+        metrics: Metrics | None = None,
+        sessions: SessionStore | None = None,
+    ) -> None:
+        """Point chatbot's module clients at stubs for this test."""
+        for name, value in {
+            "rag_client": rag_client,
+            "genai_client": stub_genai(0.2),
+            "sessions": sessions,
+            "llm": llm,
+            "chat_semaphore": asyncio.Semaphore(max_chats),
+            "metrics": metrics,
+        }.items():
+            patcher = mock.patch.object(chatbot, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post_chat(self, session_id: int, message: str) -> httpx.Response:
+        async def post() -> httpx.Response:
+            transport = httpx.ASGITransport(app=chatbot.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                return await client.post(
+                    "/chat", json={"session_id": session_id, "message": message}
+                )
+
+        return asyncio.run(post())
+
+    def post_chats(self, n: int) -> list[httpx.Response]:
+        async def burst() -> list[httpx.Response]:
+            transport = httpx.ASGITransport(app=chatbot.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                return await asyncio.gather(
+                    *(
+                        client.post(
+                            "/chat", json={"session_id": i, "message": "question"}
+                        )
+                        for i in range(n)
+                    )
+                )
+
+        return asyncio.run(burst())
+
+    def test_burst_beyond_llm_capacity_gets_503(self) -> None:
+        llm = LlmDispatcher(max_in_flight=2, max_queue=2, timeout=5)
+        self.serve(StubRagClient(), llm, llm.max_in_flight + llm.max_queue)
+        responses = self.post_chats(7)
+        codes = sorted(r.status_code for r in responses)
+        self.assertEqual(codes, [200] * 4 + [503] * 3)
+        for response in responses:
+            if response.status_code == 503:
+                self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+            else:
+                self.assertEqual(response.json(), {"reply": "stub reply"})
+
+    def test_answer_cache_skipped_with_session_history(self) -> None:
+        rag_client = StubRagClient()
+        sessions = SessionStore(InMemorySessionBackend())
+        self.serve(rag_client, LlmDispatcher(timeout=5), 4, sessions=sessions)
+        self.assertEqual(self.post_chat(1, "What is INT30-C?").status_code, 200)
+        self.assertEqual(self.post_chat(1, "And its exceptions?").status_code, 200)
+        # only the first turn, which had no history, touched the cache
+        self.assertEqual(rag_client.lookups, ["What is INT30-C?"])
+        self.assertEqual(rag_client.stored, ["What is INT30-C?"])
+
+    @mock.patch("chroma.chroma.DefaultEmbeddingFunction", FakeEmbeddingFunction)
+    def test_batched_retrieval_keeps_server_timing(self) -> None:
+        metrics = Metrics()
+        with tempfile.TemporaryDirectory() as tmp:
+            docs = Path(tmp) / "docs"
+            docs.mkdir()
+            (docs / "a.md").write_text(
+                "## **1.1 INT30-C. Wrap**\n\nunsigned wrap", encoding="utf-8"
+            )
+            rag_client = RagClient(
+                name="docs",
+                persistent_storage=str(Path(tmp) / "db"),
+                collection_path=str(docs),
+                cache_size=0,
+                metrics=metrics,
+                query_batch_size=32,
+            )
+            rag_client.reload_collection()
+            self.assertIsNotNone(rag_client.query_batcher)
+            self.serve(rag_client, LlmDispatcher(timeout=5), 4, metrics)
+            responses = self.post_chats(3)
+            rag_client.query_batcher.close()  # type: ignore[union-attr]
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            stages = {
+                entry.split(";")[0].strip()
+                for entry in response.headers["Server-Timing"].split(",")
+            }
+            for stage in (
+                "query_batch",
+                "rule_lookup",
+                "collection_query",
+                "lexical_search",
+                "get_context",
+                "llm_generate",
+            ):
+                self.assertIn(stage, stages)
+
+
+if __name__ == "__main__":
+    unittest.main()
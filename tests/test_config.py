@@ -0,0 +1,46 @@
+"""Unit tests for the environment-driven RagClient factory.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_config -v
+"""
+
+import os
+import unittest
+from unittest import mock
+
+from chroma.config import create_rag_client
+
+
+class TestCreateRagClient(unittest.TestCase):
+    @mock.patch("chroma.chroma.RagClient")
+    def test_reads_indexing_and_serving_settings(self, rag_client: mock.Mock) -> None:
+        env = {
+            "INDEX_BATCH_SIZE": "32",
+            "PDF_WORKERS": "3",
+            "EMBED_WORKERS": "4",
+            "PIPELINE_QUEUE_SIZE": "2",
+            "KEEP_VERSIONS": "5",
+            "VECTOR_BACKEND": "numpy",
+            "LEXICAL_SEARCH": "false",
+        }
+        with mock.patch.dict(os.environ, env):
+            create_rag_client(read_only=True)
+        kwargs = rag_client.call_args.kwargs
+        self.assertEqual(kwargs["batch_size"], 32)
+        self.assertEqual(kwargs["pdf_workers"], 3)
+        self.assertEqual(kwargs["embed_workers"], 4)
+        self.assertEqual(kwargs["pipeline_queue_size"], 2)
+        self.assertEqual(kwargs["keep_versions"], 5)
+        self.assertEqual(kwargs["vector_backend"], "numpy")
+        self.assertFalse(kwargs["lexical_search"])
+        self.assertTrue(kwargs["read_only"])
+
+    @mock.patch("chroma.chroma.RagClient")
+    def test_unset_pdf_workers_means_cpu_count(self, rag_client: mock.Mock) -> None:
+        with mock.patch.dict(os.environ, {"PDF_WORKERS": "0"}):
+            create_rag_client()
+        self.assertIsNone(rag_client.call_args.kwargs["pdf_workers"])
+
+
+if __name__ == "__main__":
+    unittest.main()
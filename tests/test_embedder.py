@@ -0,0 +1,83 @@
+"""Unit tests for chroma batch embedder and embedding cache.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_embedder -v
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from chroma.embedder import BatchEmbedder
+from chroma.embedding_cache import EmbeddingCache
+from tests.fakes import FakeEmbeddingFunction
+
+
+class CountingEmbeddingFunction(FakeEmbeddingFunction):
+    """Records the batches it is called with."""
+
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def __call__(self, input):
+        self.calls.append(list(input))
+        return super().__call__(input)
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = EmbeddingCache(self.tmp.name)
+
+    def test_roundtrip_and_stats(self) -> None:
+        key = EmbeddingCache.make_key("chunk")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.set(key, [0.5, 0.25])
+        np.testing.assert_array_equal(self.cache.get(key), [0.5, 0.25])
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_persists_across_instances(self) -> None:
+        key = EmbeddingCache.make_key("chunk")
+        self.cache.set(key, [1.0])
+        self.assertIsNotNone(EmbeddingCache(self.tmp.name).get(key))
+
+
+class TestBatchEmbedder(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.function = CountingEmbeddingFunction()
+
+    def make_embedder(self, cache: EmbeddingCache | None = None) -> BatchEmbedder:
+        embedder = BatchEmbedder(self.function, cache, batch_size=2, max_workers=2)
+        self.addCleanup(embedder.close)
+        return embedder
+
+    def test_batches_and_keeps_order(self) -> None:
+        texts = [f"text {i}" for i in range(5)]
+        embeddings = self.make_embedder().embed(texts)
+        self.assertEqual([len(batch) for batch in self.function.calls], [2, 2, 1])
+        expected = FakeEmbeddingFunction()(texts)
+        self.assertEqual([list(e) for e in embeddings], [list(e) for e in expected])
+
+    def test_duplicate_texts_embedded_once(self) -> None:
+        embeddings = self.make_embedder().embed(["a", "b", "a"])
+        self.assertEqual(self.function.calls, [["a", "b"]])
+        self.assertEqual(list(embeddings[0]), list(embeddings[2]))
+
+    def test_cached_texts_not_embedded_again(self) -> None:
+        self.make_embedder(EmbeddingCache(self.tmp.name)).embed(["a", "b"])
+        self.function.calls.clear()
+        # new embedder + cache instance: vectors come from disk
+        embedder = self.make_embedder(EmbeddingCache(self.tmp.name))
+        embeddings = embedder.embed(["b", "c", "a"])
+        self.assertEqual(self.function.calls, [["c"]])
+        expected = FakeEmbeddingFunction()(["b", "c", "a"])
+        for got, want in zip(embeddings, expected):
+            np.testing.assert_allclose(got, want, rtol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
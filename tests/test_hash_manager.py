@@ -0,0 +1,58 @@
+"""Unit tests for file hash manager.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_hash_manager -v
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from chroma.hash_manager import FileHashManager
+
+
+class TestFileHashManager(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.hash_file = self.dir / "hashes.json"
+        self.file = str(self.dir / "doc.md")
+        Path(self.file).write_text("content", encoding="utf-8")
+
+    def test_new_file_is_changed(self) -> None:
+        manager = FileHashManager(self.hash_file)
+        self.assertFalse(manager.is_unchanged(self.file))
+
+    def test_update_then_unchanged(self) -> None:
+        manager = FileHashManager(self.hash_file)
+        manager.update(self.file, ["id1"])
+        self.assertTrue(manager.is_unchanged(self.file))
+        self.assertEqual(manager.get_chunks(self.file), ["id1"])
+
+    def test_same_size_different_content_is_changed(self) -> None:
+        manager = FileHashManager(self.hash_file)
+        manager.update(self.file, [])
+        manager.file_hashes[self.file]["mtime"] -= 1
+        Path(self.file).write_text("CONTENT", encoding="utf-8")
+        self.assertFalse(manager.is_unchanged(self.file))
+
+    def test_legacy_mtime_only_format(self) -> None:
+        mtime = Path(self.file).stat().st_mtime
+        self.hash_file.write_text(json.dumps({self.file: mtime}), encoding="utf-8")
+        manager = FileHashManager(self.hash_file)
+        self.assertTrue(manager.is_unchanged(self.file))
+        self.assertIsNone(manager.get_chunks(self.file))
+
+    def test_save_and_reload(self) -> None:
+        manager = FileHashManager(self.hash_file)
+        manager.update(self.file, ["id1", "id2"])
+        manager.save(manager.file_hashes)
+        self.assertFalse(manager.dirty)
+        reloaded = FileHashManager(self.hash_file)
+        self.assertEqual(reloaded.file_hashes, manager.file_hashes)
+
+
+if __name__ == "__main__":
+    unittest.main()
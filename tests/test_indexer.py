@@ -4,9 +4,17 @@ Run from project root (with deps installed):
   python -m unittest tests.test_indexer -v
 """
 
+import os
+import tempfile
+import threading
 import unittest
+from pathlib import Path
+from unittest import mock
 
+from chroma.hash_manager import FileHashManager
 from chroma.indexer import ChromaIndexer
+from chroma.text_splitter import TextSplitter
+from tests.fakes import make_collection
 
 
 class TestGenerateMd5Hash(unittest.TestCase):
@@ -26,5 +34,85 @@ class TestGenerateMd5Hash(unittest.TestCase):
         self.assertNotEqual(a, b)
 
 
+class TestIndexFiles(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.collection = make_collection()
+        self.indexer = ChromaIndexer(
+            self.collection,
+            threading.Lock(),
+            TextSplitter(chunk_size=200, chunk_overlap=0),
+            FileHashManager(Path(self.tmp.name) / "hashes.json"),
+            batch_size=3,
+        )
+
+    def write_md(self, name: str, text: str) -> str:
+        path = Path(self.tmp.name) / name
+        path.write_text(text, encoding="utf-8")
+        return str(path)
+
+    def test_indexes_all_chunks_across_batches(self) -> None:
+        sections = [f"## **1.{i} Section**\n\nbody text {i}" for i in range(10)]
+        file = self.write_md("doc.md", "\n".join(sections))
+        result = self.indexer.index_files([file])
+        self.assertEqual(result.errors, [])
+        self.assertEqual(self.collection.count(), 10)
+
+    def test_rule_id_set_in_metadata(self) -> None:
+        file = self.write_md("rules.md", "## **2.1 PRE30-C. Do not paste tokens**\n")
+        self.indexer.index_files([file])
+        metas = self.collection.get(include=["metadatas"])["metadatas"] or []
+        self.assertEqual(metas[0].get("rule_id"), "PRE30-C")
+
+    def test_duplicate_chunks_in_file_added_once(self) -> None:
+        file = self.write_md("dup.md", "## same\n## same\n")
+        result = self.indexer.index_files([file])
+        self.assertEqual(result.errors, [])
+        self.assertEqual(self.collection.count(), 1)
+
+    def test_reindex_adds_new_and_deletes_vanished_chunks(self) -> None:
+        file = self.write_md("doc.md", "## A\nalpha\n## B\nbeta\n## C\ngamma\n")
+        self.indexer.index_files([file])
+        before = set(self.collection.get(include=[])["ids"])
+        Path(file).write_text("## A\nalpha\n## B\nBETA v2\n", encoding="utf-8")
+        with mock.patch.object(
+            self.collection, "add", wraps=self.collection.add
+        ) as add:
+            result = self.indexer.index_files([file])
+        self.assertEqual(result.files, [file])
+        self.assertEqual(len(add.call_args.kwargs["ids"]), 1)
+        after = self.collection.get(include=["documents"])
+        self.assertEqual(len(after["ids"]), 2)
+        self.assertEqual(len(before & set(after["ids"])), 1)
+        self.assertEqual(self.indexer.hash_manager.get_chunks(file), after["ids"])
+
+    def test_touched_file_not_reindexed(self) -> None:
+        file = self.write_md("doc.md", "## A\nalpha\n")
+        self.indexer.index_files([file])
+        stat = Path(file).stat()
+        os.utime(file, (stat.st_atime, stat.st_mtime + 10))
+        result = self.indexer.index_files([file])
+        self.assertEqual(result.files, [])
+        record = self.indexer.hash_manager.file_hashes[file]
+        self.assertEqual(record["mtime"], stat.st_mtime + 10)
+
+    def test_existing_chunk_gets_rule_id_update(self) -> None:
+        chunk = "## **2.1 PRE30-C. Do not paste tokens**"
+        source = self.write_md("rules.md", chunk)
+        chunk_id = ChromaIndexer._generate_md5_hash(chunk, source)
+        self.collection.add(
+            ids=[chunk_id],
+            documents=[chunk],
+            metadatas=[{"source": source, "chunk_index": 0}],
+        )
+        for chunks in self.indexer.iter_prepare_file(source):
+            new, updated = self.indexer.plan_chunks(chunks)
+            self.indexer.write_chunks(new, updated, self.indexer.embed_chunks(new))
+        metas = self.collection.get(ids=[chunk_id])["metadatas"] or []
+        self.assertEqual(self.collection.count(), 1)
+        self.assertEqual(metas[0].get("rule_id"), "PRE30-C")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,44 @@
+"""Unit tests for deferred imports of heavy dependencies.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_lazy_imports -v
+"""
+
+import subprocess
+import sys
+import unittest
+
+
+def loaded_modules(code: str, modules: list[str]) -> list[str]:
+    """Run code in a fresh interpreter; return which of modules it imported."""
+    check = f"import sys; print(','.join(m for m in {modules!r} if m in sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", f"{code}\n{check}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    return [m for m in output.split(",") if m]
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_package_import_loads_nothing_heavy(self) -> None:
+        self.assertEqual(loaded_modules("import chroma", ["chromadb"]), [])
+
+    def test_rag_client_skips_conversion_and_chunking_libraries(self) -> None:
+        heavy = ["pymupdf4llm", "langchain_text_splitters"]
+        self.assertEqual(loaded_modules("from chroma import RagClient", heavy), [])
+
+    def test_chatbot_import_defers_clients(self) -> None:
+        code = "import os; os.environ['GEMINI_API_KEY'] = 'x'; import chatbot"
+        self.assertEqual(loaded_modules(code, ["chromadb", "google.genai"]), [])
+
+    def test_scripts_defer_chromadb_until_client_is_created(self) -> None:
+        for script in ("remove_db_files", "reload_db", "rebuild_db"):
+            with self.subTest(script=script):
+                code = f"import scripts.{script}"
+                self.assertEqual(loaded_modules(code, ["chromadb"]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
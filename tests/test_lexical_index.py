@@ -0,0 +1,86 @@
+"""Unit tests for chroma BM25 lexical index and hybrid retrieval.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_lexical_index -v
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from chroma.lexical_index import Bm25Index, tokenize
+from chroma.retriever import ChromaRetriever
+from tests.fakes import make_collection
+
+
+class TestTokenize(unittest.TestCase):
+    def test_keeps_identifiers_and_rule_ids(self) -> None:
+        self.assertEqual(
+            tokenize("Use strncpy() not STR_COPY; see INT30-C."),
+            ["use", "strncpy", "not", "str_copy", "see", "int30-c"],
+        )
+
+
+class TestBm25Index(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.file = Path(self.tmp.name) / "bm25.json"
+        self.index = Bm25Index(self.file)
+        self.index.on_upsert(
+            ["a", "b", "c"],
+            [
+                "strncpy copies at most n bytes",
+                "errno is set on failure; check errno",
+                "buffers and bytes",
+            ],
+            [{}, {}, {}],
+        )
+
+    def test_search_ranks_exact_tokens(self) -> None:
+        self.assertEqual(self.index.search("errno", 5)[0][0], "b")
+        self.assertEqual(self.index.search("strncpy bytes", 5)[0][0], "a")
+        self.assertEqual(self.index.search("missing", 5), [])
+
+    def test_delete_and_update(self) -> None:
+        self.index.on_delete(["b"])
+        self.assertEqual(self.index.search("errno", 5), [])
+        self.index.on_upsert(["a"], ["errno only"], [{}])
+        self.assertEqual([cid for cid, _ in self.index.search("errno", 5)], ["a"])
+        self.assertEqual(self.index.search("strncpy", 5), [])
+
+    def test_load_reconciles_with_collection(self) -> None:
+        self.index.save()
+        collection = make_collection()
+        collection.add(ids=["a", "d"], documents=["kept", "new errno text"])
+        index = Bm25Index(self.file)
+        index.load(collection)
+        self.assertEqual(len(index), 2)
+        # "a" keeps its saved terms, "d" is read from the collection, "b" is dropped
+        self.assertCountEqual(
+            [cid for cid, _ in index.search("strncpy errno", 5)], ["a", "d"]
+        )
+        reloaded = Bm25Index(self.file)
+        reloaded.load(collection)
+        self.assertEqual(len(reloaded), 2)
+
+
+class TestHybridRetrieval(unittest.TestCase):
+    def test_lexical_hit_fused_into_results(self) -> None:
+        collection = make_collection()
+        documents = [f"filler text number {i}" for i in range(20)]
+        documents.append("call strncpy with the destination size")
+        ids = [f"id{i}" for i in range(len(documents))]
+        metadatas = [{"source": f"s{i}"} for i in range(len(documents))]
+        collection.add(ids=ids, documents=documents, metadatas=metadatas)
+        index = Bm25Index(Path(tempfile.gettempdir()) / "unused-bm25.json")
+        index.on_upsert(ids, documents, metadatas)
+        retriever = ChromaRetriever(collection, lexical_index=index)
+        results = retriever.get_query_results("strncpy", n_results=3)
+        self.assertIn("id20", [r["id"] for r in results])
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len({r["id"] for r in results}), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
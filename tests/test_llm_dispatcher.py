@@ -0,0 +1,185 @@
+"""Unit tests for LLM admission control and retries.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_llm_dispatcher -v
+"""
+
+import asyncio
+import time
+import unittest
+from collections.abc import Awaitable
+from types import SimpleNamespace
+from typing import Any
+
+from benchmarks.fake_gemini import FakeGeminiServer
+from chroma.llm_dispatcher import (
+    LlmDispatcher,
+    LlmUnavailable,
+    retry_after_header,
+    retry_hint,
+)
+
+
+class ApiError(Exception):
+    """Shaped like google.genai.errors.APIError: code, details, response."""
+
+    def __init__(self, code: int, retry_delay: str | None = None) -> None:
+        super().__init__(f"{code}")
+        self.code = code
+        self.response = None
+        details = [{"retryDelay": retry_delay}] if retry_delay else []
+        self.details = {"error": {"code": code, "details": details}}
+
+
+class Flaky:
+    """Async callable failing with errors in order, then returning 'ok'."""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def dispatcher(**options: float) -> LlmDispatcher:
+    options = {"base_delay": 0.01, "max_delay": 0.02} | options
+    return LlmDispatcher(**options)  # type: ignore[arg-type]
+
+
+class TestRetryHint(unittest.TestCase):
+    def test_header_then_retry_info(self) -> None:
+        error = ApiError(429, "2.5s")
+        self.assertEqual(retry_hint(error), 2.5)
+        error.response = SimpleNamespace(headers={"retry-after": "7"})
+        self.assertEqual(retry_hint(error), 7.0)
+        self.assertIsNone(retry_hint(ApiError(503)))
+        self.assertIsNone(retry_hint(ValueError("no hint")))
+
+    def test_retry_after_header_rounds_up(self) -> None:
+        self.assertEqual(
+            retry_after_header(LlmUnavailable("x", 503, 1.2)), {"Retry-After": "2"}
+        )
+        self.assertEqual(
+            retry_after_header(LlmUnavailable("x", 503, 0.0)), {"Retry-After": "1"}
+        )
+
+
+class TestRetries(unittest.TestCase):
+    def test_retries_retryable_errors(self) -> None:
+        llm = dispatcher()
+        fn = Flaky(ApiError(429, "0.01s"), ApiError(503))
+        self.assertEqual(asyncio.run(llm.call(fn)), "ok")
+        self.assertEqual(fn.calls, 3)
+        self.assertEqual(llm.retries, 2)
+
+    def test_other_errors_are_not_retried(self) -> None:
+        fn = Flaky(ApiError(400), ValueError("bad"))
+        with self.assertRaises(ApiError):
+            asyncio.run(dispatcher().call(fn))
+        self.assertEqual(fn.calls, 1)
+
+    def test_gives_up_after_max_retries(self) -> None:
+        fn = Flaky(*[ApiError(429, "0.01s") for _ in range(3)])
+        with self.assertRaises(LlmUnavailable) as cm:
+            asyncio.run(dispatcher(max_retries=2).call(fn))
+        self.assertEqual(cm.exception.status_code, 429)
+        self.assertGreaterEqual(cm.exception.retry_after, 0.01)
+        self.assertEqual(fn.calls, 3)
+
+    def test_retry_hint_past_deadline_fails_fast(self) -> None:
+        fn = Flaky(ApiError(429, "60s"))
+        started = time.monotonic()
+        with self.assertRaises(LlmUnavailable):
+            asyncio.run(dispatcher(timeout=5).call(fn))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(fn.calls, 1)
+
+    def test_slow_call_times_out(self) -> None:
+        async def slow() -> str:
+            await asyncio.sleep(1)
+            return "late"
+
+        with self.assertRaises(LlmUnavailable) as cm:
+            asyncio.run(dispatcher(timeout=0.05).call(slow))
+        self.assertEqual(cm.exception.status_code, 504)
+
+
+class TestAdmission(unittest.TestCase):
+    def run_burst(self, llm: LlmDispatcher, n: int, seconds: float) -> list:
+        running = 0
+        peak = 0
+
+        async def work() -> str:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(seconds)
+            running -= 1
+            return "ok"
+
+        async def burst() -> list:
+            return await asyncio.gather(
+                *(llm.call(work) for _ in range(n)), return_exceptions=True
+            )
+
+        results = asyncio.run(burst())
+        self.peak = peak
+        return results
+
+    def test_in_flight_is_bounded(self) -> None:
+        results = self.run_burst(dispatcher(max_in_flight=2), 6, 0.02)
+        self.assertEqual(results, ["ok"] * 6)
+        self.assertEqual(self.peak, 2)
+
+    def test_full_queue_is_shed_with_503(self) -> None:
+        llm = dispatcher(max_in_flight=1, max_queue=2)
+        results = self.run_burst(llm, 5, 0.02)
+        self.assertEqual(results.count("ok"), 3)
+        shed = [r for r in results if isinstance(r, LlmUnavailable)]
+        self.assertEqual(len(shed), 2)
+        self.assertTrue(all(r.status_code == 503 for r in shed))
+        self.assertEqual(llm.shed, 2)
+
+    def test_wait_beyond_deadline_is_shed_at_once(self) -> None:
+        llm = dispatcher(max_in_flight=1, timeout=0.5)
+        llm.latency = 1.0  # calls are known to take longer than the deadline
+        started = time.monotonic()
+        results = self.run_burst(llm, 3, 0.05)
+        self.assertEqual(results[0], "ok")
+        self.assertTrue(all(isinstance(r, LlmUnavailable) for r in results[1:]))
+        self.assertLess(time.monotonic() - started, 0.3)
+
+
+class TestFakeGemini(unittest.TestCase):
+    def test_rate_limited_burst_completes_within_provider_limit(self) -> None:
+        from google import genai
+
+        with FakeGeminiServer(
+            latency=0.05, max_concurrent=3, rate_limit_every=4, retry_after=0.05
+        ) as server:
+            client = genai.Client(
+                api_key="fake", http_options={"base_url": server.base_url}
+            )
+            llm = dispatcher(max_in_flight=3, max_retries=5)
+
+            def generate() -> Awaitable[Any]:
+                return client.aio.models.generate_content(
+                    model="gemini-2.5-flash", contents={"text": "hi"}
+                )
+
+            async def burst() -> list:
+                return await asyncio.gather(*(llm.call(generate) for _ in range(12)))
+
+            replies = asyncio.run(burst())
+            self.assertEqual([r.text for r in replies], ["Fake Gemini reply."] * 12)
+            self.assertGreater(server.app.state.rate_limited, 0)
+            self.assertLessEqual(server.app.state.max_in_flight, 3)
+            self.assertEqual(llm.retries, server.app.state.rate_limited)
+
+
+if __name__ == "__main__":
+    unittest.main()
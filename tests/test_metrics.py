@@ -0,0 +1,81 @@
+"""Unit tests for hot-path metrics.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_metrics -v
+"""
+
+import asyncio
+import unittest
+
+from chroma.metrics import Metrics, timed
+from chroma.retriever import ChromaRetriever
+from tests.fakes import make_collection
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.metrics = Metrics()
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        for value in (0.002, 0.02, 20.0):
+            self.metrics.observe("collection_query", value)
+        text = self.metrics.render()
+        self.assertIn("# TYPE rag_collection_query_seconds histogram", text)
+        self.assertIn('rag_collection_query_seconds_bucket{le="0.001"} 0', text)
+        self.assertIn('rag_collection_query_seconds_bucket{le="0.005"} 1', text)
+        self.assertIn('rag_collection_query_seconds_bucket{le="0.025"} 2', text)
+        self.assertIn('rag_collection_query_seconds_bucket{le="10"} 2', text)
+        self.assertIn('rag_collection_query_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("rag_collection_query_seconds_count 3", text)
+
+    def test_request_collects_timings_from_worker_threads(self) -> None:
+        def work() -> None:
+            with self.metrics.time("rule_lookup"):
+                pass
+            self.metrics.observe("prompt", 1234)
+
+        async def serve() -> dict[str, float]:
+            with self.metrics.request() as timings:
+                await asyncio.to_thread(work)
+            return timings
+
+        timings = asyncio.run(serve())
+        self.assertEqual(set(timings), {"rule_lookup", "prompt"})
+        header = Metrics.server_timing(timings)
+        self.assertRegex(header, r"rule_lookup;dur=\d+\.\d")
+        self.assertIn('prompt;desc="1234"', header)
+
+    def test_observations_outside_a_request_only_go_to_histograms(self) -> None:
+        with self.metrics.request() as timings:
+            pass
+        self.metrics.observe("prompt", 10)
+        self.assertEqual(timings, {})
+        self.assertEqual(self.metrics.histograms["prompt"].count, 1)
+
+    def test_timed_without_metrics_is_a_no_op(self) -> None:
+        with timed(None, "rule_lookup"):
+            pass
+        with timed(self.metrics, "rule_lookup"):
+            pass
+        self.assertEqual(self.metrics.histograms["rule_lookup"].count, 1)
+
+
+class TestRetrieverMetrics(unittest.TestCase):
+    def test_query_stages_are_timed(self) -> None:
+        collection = make_collection()
+        collection.add(
+            ids=["a", "b"],
+            documents=["alpha", "beta"],
+            metadatas=[{"source": "/a.md"}, {"source": "/b.md"}],
+        )
+        metrics = Metrics()
+        retriever = ChromaRetriever(collection, metrics=metrics)
+        results = retriever.get_query_results("alpha INT30-C", 2)
+        retriever.get_context(results)
+        for name in ("rule_lookup", "collection_query", "context_format"):
+            self.assertEqual(metrics.histograms[name].count, 1, name)
+        self.assertEqual(metrics.histograms["lexical_search"].count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
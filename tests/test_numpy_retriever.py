@@ -0,0 +1,163 @@
+"""Unit tests for the memory-mapped NumPy vector retriever.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_numpy_retriever -v
+"""
+
+import tempfile
+import unittest
+import uuid
+from pathlib import Path
+from unittest import mock
+
+import chromadb
+import numpy as np
+from chromadb import Collection
+
+from chroma.chroma import RagClient
+from chroma.numpy_retriever import NumpyRetriever, NumpyVectorIndex
+from chroma.retriever import ChromaRetriever
+from tests.fakes import FakeEmbeddingFunction, make_collection
+
+QUERIES = ["memcpy overlap", "integer overflow", "free twice", "errno"]
+
+
+def fill(collection: Collection, n: int = 200) -> None:
+    collection.add(
+        ids=[f"chunk-{i}" for i in range(n)],
+        documents=[f"document {i} about topic {i % 7}" for i in range(n)],
+        metadatas=[{"source": f"file-{i % 5}.md"} for i in range(n)],
+    )
+
+
+class TestNumpyRetriever(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.index_dir = Path(self.tmp.name)
+        self.collection = make_collection()
+        fill(self.collection)
+
+    def make_retriever(self, dtype: str = "float32", **options) -> NumpyRetriever:
+        return NumpyRetriever(
+            self.collection, self.index_dir, FakeEmbeddingFunction(), dtype, **options
+        )
+
+    def semantic(self, retriever: ChromaRetriever) -> list[list[tuple[str, float]]]:
+        results = retriever._semantic_query(QUERIES, 10)
+        return [
+            list(zip(ids, distances))
+            for ids, distances in zip(results["ids"], results["distances"] or [])
+        ]
+
+    def assert_parity(self, dtype: str, places: int, min_overlap: int) -> None:
+        expected = self.semantic(ChromaRetriever(self.collection))
+        actual = self.semantic(self.make_retriever(dtype))
+        for want, got in zip(expected, actual):
+            common = {i for i, _ in want} & {i for i, _ in got}
+            self.assertGreaterEqual(len(common), min_overlap)
+            if min_overlap == len(want):
+                self.assertEqual([i for i, _ in got], [i for i, _ in want])
+            distances = dict(want)
+            for chunk_id, distance in got:
+                if chunk_id in distances:
+                    self.assertAlmostEqual(distance, distances[chunk_id], places)
+
+    def test_float32_matches_chroma(self) -> None:
+        self.assert_parity("float32", places=4, min_overlap=10)
+
+    def test_float16_matches_chroma(self) -> None:
+        self.assert_parity("float16", places=2, min_overlap=9)
+
+    def test_int8_mostly_matches_chroma(self) -> None:
+        self.assert_parity("int8", places=1, min_overlap=8)
+
+    def test_cosine_space(self) -> None:
+        client = chromadb.EphemeralClient()
+        self.collection = client.create_collection(
+            f"test-{uuid.uuid4().hex}",
+            embedding_function=FakeEmbeddingFunction(),  # type: ignore[arg-type]
+            configuration={"hnsw": {"space": "cosine"}},
+        )
+        fill(self.collection)
+        self.assert_parity("float32", places=4, min_overlap=10)
+
+    def test_full_query_matches_chroma(self) -> None:
+        expected = ChromaRetriever(self.collection).get_query_results("topic 3", 5)
+        actual = self.make_retriever().get_query_results("topic 3", 5)
+        self.assertEqual([r["id"] for r in actual], [r["id"] for r in expected])
+        self.assertEqual(actual[0]["content"], expected[0]["content"])
+        self.assertEqual(actual[0]["metadata"], expected[0]["metadata"])
+
+    def test_saved_index_is_memory_mapped_and_reused(self) -> None:
+        self.make_retriever().warmup()
+        with mock.patch.object(
+            NumpyVectorIndex, "from_collection", side_effect=AssertionError
+        ):
+            index = self.make_retriever().index()
+        self.assertIsInstance(index.matrix, np.memmap)
+        self.assertEqual(len(index), 200)
+
+    def test_writes_reload_the_index(self) -> None:
+        retriever = self.make_retriever()
+        retriever.warmup()
+        self.collection.add(ids=["new"], documents=["brand new chunk"])
+        retriever.on_upsert(["new"], ["brand new chunk"], [{}])
+        self.assertIn("new", retriever.index().rows)
+        # a restarted process sees the collection changed and rebuilds
+        self.collection.delete(ids=["new"])
+        self.assertNotIn("new", self.make_retriever().index().rows)
+
+    def test_read_only_builds_in_memory(self) -> None:
+        index = self.make_retriever(read_only=True).index()
+        self.assertEqual(len(index), 200)
+        self.assertEqual(list(self.index_dir.iterdir()), [])
+
+    def test_int8_quarters_the_matrix(self) -> None:
+        index = NumpyVectorIndex.from_collection(self.collection, "int8")
+        self.assertEqual(index.matrix.dtype, np.int8)
+        self.assertIsNotNone(index.scales)
+        stored = self.collection.get(ids=["chunk-0"], include=["embeddings"])
+        original = np.asarray(stored["embeddings"])[0]
+        np.testing.assert_allclose(
+            index.embedding(index.rows["chunk-0"]), original, atol=0.01
+        )
+
+    def test_empty_collection(self) -> None:
+        self.collection = make_collection()
+        retriever = self.make_retriever()
+        self.assertEqual(retriever.get_query_results("anything", 5), [])
+        self.assertEqual(
+            len(NumpyVectorIndex.open(self.index_dir / self.collection.name) or []), 0
+        )
+
+
+@mock.patch("chroma.chroma.DefaultEmbeddingFunction", FakeEmbeddingFunction)
+class TestRagClientNumpyBackend(unittest.TestCase):
+    def test_versions_are_exported_and_dropped(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            docs = Path(tmp) / "docs"
+            docs.mkdir()
+            (docs / "a.md").write_text("## **1.1 A**\n\nbody a", encoding="utf-8")
+            client = RagClient(
+                name="docs",
+                persistent_storage=str(Path(tmp) / "db"),
+                collection_path=str(docs),
+                vector_backend="numpy",
+                keep_versions=0,
+            )
+            self.assertIsInstance(client.retriever, NumpyRetriever)
+            client.rebuild_collection()
+            exported = Path(tmp) / "db" / "vector_index"
+            self.assertTrue((exported / "docs-v1" / "embeddings.npy").exists())
+            results = client.get_query_results("body", 5)
+            self.assertEqual(
+                [r["content"] for r in results], ["## **1.1 A**\n\nbody a"]
+            )
+            client.rebuild_collection()
+            self.assertFalse((exported / "docs-v1").exists())
+            self.assertTrue((exported / "docs-v2").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
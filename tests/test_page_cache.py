@@ -0,0 +1,98 @@
+"""Unit tests for the PDF page cache.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_page_cache -v
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import pymupdf
+
+from chroma.page_cache import PageCache
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.cache_dir = self.dir / "cache"
+
+    def touch(self, name: str) -> str:
+        path = self.dir / name
+        path.write_bytes(b"")
+        return str(path)
+
+    def fill(self, cache: PageCache, pdf: str, keys: list[str]) -> None:
+        for key in keys:
+            cache.set(key, f"markdown {key}")
+        cache.record(pdf, keys)
+
+    def test_get_set_and_reopen(self) -> None:
+        cache = PageCache(self.cache_dir)
+        self.assertIsNone(cache.get("ab12"))
+        self.fill(cache, self.touch("a.pdf"), ["ab12"])
+        self.assertEqual(cache.get("ab12"), "markdown ab12")
+        reopened = PageCache(self.cache_dir)
+        self.assertEqual(reopened.get("ab12"), "markdown ab12")
+        self.assertEqual(reopened.stats()["pdfs"], 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_rerecording_drops_replaced_pages(self) -> None:
+        cache = PageCache(self.cache_dir)
+        pdf = self.touch("a.pdf")
+        self.fill(cache, pdf, ["aa01", "aa02"])
+        self.fill(cache, pdf, ["aa01", "aa03"])
+        self.assertIsNone(cache.get("aa02"))
+        self.assertIsNotNone(cache.get("aa01"))
+
+    def test_least_recently_converted_pdfs_are_evicted(self) -> None:
+        cache = PageCache(self.cache_dir, max_pages=3)
+        old, shared, new = (
+            self.touch("old.pdf"),
+            self.touch("b.pdf"),
+            self.touch("c.pdf"),
+        )
+        self.fill(cache, old, ["aa01", "aa02"])
+        self.fill(cache, shared, ["bb01"])
+        self.fill(cache, new, ["bb01", "cc01"])
+        self.assertIsNone(cache.get("aa01"))
+        self.assertIsNone(cache.get("aa02"))
+        # still used by the newest PDF
+        self.assertIsNotNone(cache.get("bb01"))
+        self.assertEqual(cache.stats()["pages"], 2)
+
+    def test_current_pdf_is_kept_even_if_too_large(self) -> None:
+        cache = PageCache(self.cache_dir, max_pages=1)
+        self.fill(cache, self.touch("big.pdf"), ["aa01", "aa02"])
+        self.assertIsNotNone(cache.get("aa02"))
+
+    def test_prune_drops_pages_of_deleted_pdfs(self) -> None:
+        cache = PageCache(self.cache_dir)
+        kept, deleted = self.touch("kept.pdf"), self.touch("deleted.pdf")
+        self.fill(cache, kept, ["aa01", "cc01"])
+        self.fill(cache, deleted, ["bb01", "cc01"])
+        Path(deleted).unlink()
+        cache.prune()
+        self.assertIsNone(cache.get("bb01"))
+        self.assertIsNotNone(cache.get("cc01"))
+        self.assertEqual(PageCache(self.cache_dir).stats()["pdfs"], 1)
+
+    def test_page_key_changes_only_with_page_content(self) -> None:
+        cache = PageCache(self.cache_dir)
+        doc = pymupdf.open()
+        for text in ("first", "second", "first"):
+            doc.new_page().insert_text((72, 144), text)
+        keys = [cache.page_key(page) for page in doc]
+        self.assertEqual(keys[0], keys[2])
+        self.assertNotEqual(keys[0], keys[1])
+        doc[1].insert_text((72, 200), "edited")
+        self.assertNotEqual(cache.page_key(doc[1]), keys[1])
+        self.assertEqual(cache.page_key(doc[0]), keys[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
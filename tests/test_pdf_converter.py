@@ -0,0 +1,153 @@
+"""Unit tests for PDF converter.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_pdf_converter -v
+"""
+
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, ClassVar
+from unittest import mock
+
+import pymupdf
+import pymupdf4llm
+
+from chroma.page_cache import PageCache
+from chroma.pdf_converter import PdfConverter, convert_pages
+
+
+def write_pdf(path: Path, pages: int, edited: int | None = None) -> None:
+    doc = pymupdf.open()
+    for i in range(pages):
+        page = doc.new_page()
+        text = "Edited text" if i == edited else "Body text"
+        page.insert_text((72, 144), f"{text} for page {i}. " * 3, fontsize=10)
+    doc.save(path)
+
+
+class InProcessExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor taking ProcessPoolExecutor's arguments, so patched functions run."""
+
+    contexts: ClassVar[list[Any]] = []
+
+    def __init__(self, max_workers: int | None = None, mp_context: Any = None) -> None:
+        super().__init__(max_workers=max_workers)
+        self.contexts.append(mp_context)
+
+
+class TestPdfConverter(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_page_batches_match_whole_file_conversion(self) -> None:
+        pdf = self.dir / "doc.pdf"
+        write_pdf(pdf, 5)
+        expected = pymupdf4llm.to_markdown(str(pdf), header=False, footer=False)
+        converter = PdfConverter(max_workers=2, pages_per_batch=2)
+        [result] = converter.convert([str(pdf)])
+        self.assertIsNone(result.error)
+        self.assertEqual(result.pages, 5)
+        self.assertGreater(result.seconds, 0)
+        self.assertEqual(result.md_file, str(pdf.with_suffix(".md").resolve()))
+        self.assertEqual(Path(result.md_file).read_text(encoding="utf-8"), expected)
+
+    def test_unreadable_pdf_reports_error(self) -> None:
+        bad = self.dir / "bad.pdf"
+        bad.write_text("not a pdf", encoding="utf-8")
+        good = self.dir / "good.pdf"
+        write_pdf(good, 1)
+        results = PdfConverter(max_workers=1).convert([str(bad), str(good)])
+        self.assertEqual([r.pdf for r in results], [str(bad), str(good)])
+        self.assertIsNotNone(results[0].error)
+        self.assertIsNone(results[0].md_file)
+        self.assertIsNone(results[1].error)
+
+    def test_cached_pages_are_not_converted_again(self) -> None:
+        pdf = self.dir / "doc.pdf"
+        write_pdf(pdf, 4)
+        converter = PdfConverter(1, 2, PageCache(self.dir / "cache"))
+        [first] = converter.convert([str(pdf)])
+        self.assertEqual(first.cached_pages, 0)
+        write_pdf(pdf, 4, edited=2)
+        expected = pymupdf4llm.to_markdown(str(pdf), header=False, footer=False)
+        converted: list[list[int]] = []
+
+        def record_pages(pdf: str, pages: list[int]) -> list[str]:
+            converted.append(pages)
+            return convert_pages(pdf, pages)
+
+        # run the batches in this process, so the patched function is called
+        with (
+            mock.patch("chroma.pdf_converter.ProcessPoolExecutor", InProcessExecutor),
+            mock.patch("chroma.pdf_converter.convert_pages", record_pages),
+        ):
+            [second] = converter.convert([str(pdf)])
+        self.assertIsNone(second.error)
+        self.assertEqual(converted, [[2]])
+        # workers are never forked from the (multithreaded) server
+        self.assertNotEqual(InProcessExecutor.contexts[-1].get_start_method(), "fork")
+        self.assertEqual(second.cached_pages, 3)
+        self.assertEqual(
+            Path(str(second.md_file)).read_text(encoding="utf-8"), expected
+        )
+
+    def test_fully_cached_pdf_is_rewritten(self) -> None:
+        pdf = self.dir / "doc.pdf"
+        write_pdf(pdf, 2)
+        converter = PdfConverter(1, page_cache=PageCache(self.dir / "cache"))
+        converter.convert([str(pdf)])
+        md_file = pdf.with_suffix(".md")
+        expected = md_file.read_text(encoding="utf-8")
+        md_file.unlink()
+        [result] = converter.convert([str(pdf)])
+        self.assertEqual(result.cached_pages, 2)
+        self.assertEqual(md_file.read_text(encoding="utf-8"), expected)
+
+    def test_in_flight_batches_are_bounded(self) -> None:
+        pdfs = [self.dir / "a.pdf", self.dir / "b.pdf"]
+        for pdf in pdfs:
+            write_pdf(pdf, 5)
+        converter = PdfConverter(max_workers=1, pages_per_batch=2)
+        fill = converter._fill
+        in_flight: list[int] = []
+
+        def record_fill(*args: Any) -> None:
+            fill(*args)
+            in_flight.append(len(args[1]))  # pending batches
+
+        with mock.patch.object(converter, "_fill", record_fill):
+            results = converter.convert([str(pdf) for pdf in pdfs])
+        self.assertEqual(max(in_flight), converter.max_in_flight)
+        for pdf, result in zip(pdfs, results):
+            expected = pymupdf4llm.to_markdown(str(pdf), header=False, footer=False)
+            self.assertEqual(Path(str(result.md_file)).read_text("utf-8"), expected)
+        self.assertEqual(
+            sorted(p.name for p in self.dir.iterdir()),
+            ["a.md", "a.pdf", "b.md", "b.pdf"],
+        )
+
+    def test_failed_batch_leaves_no_partial_markdown(self) -> None:
+        pdf = self.dir / "doc.pdf"
+        write_pdf(pdf, 6)
+
+        def fail_late_pages(pdf: str, pages: list[int]) -> list[str]:
+            if 4 in pages:
+                raise RuntimeError("broken page")
+            return convert_pages(pdf, pages)
+
+        with (
+            mock.patch("chroma.pdf_converter.ProcessPoolExecutor", InProcessExecutor),
+            mock.patch("chroma.pdf_converter.convert_pages", fail_late_pages),
+        ):
+            [result] = PdfConverter(1, 2).convert([str(pdf)])
+        self.assertIn("broken page", str(result.error))
+        self.assertIsNone(result.md_file)
+        self.assertEqual([p.name for p in self.dir.iterdir()], ["doc.pdf"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+"""Unit tests for chroma ingestion pipeline.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_pipeline -v
+"""
+
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from chroma.embedder import BatchEmbedder
+from chroma.hash_manager import FileHashManager
+from chroma.indexer import ChromaIndexer
+from chroma.models import ChunkBatch, ConversionResult
+from chroma.pipeline import IngestionPipeline
+from chroma.text_splitter import TextSplitter
+from tests.fakes import FakeEmbeddingFunction, make_collection
+
+
+class FakePdfConverter:
+    """Writes '## **1.1 <stem>**' markdown for each .pdf; names with 'bad' fail."""
+
+    def __init__(self) -> None:
+        self.seen: list[str] = []
+
+    def iter_convert(self, pdfs):
+        for pdf in pdfs:
+            self.seen.append(pdf)
+            if "bad" in pdf:
+                yield ConversionResult(pdf=pdf, error=f"Error opening {pdf}")
+                continue
+            md_path = Path(pdf).with_suffix(".md")
+            md_path.write_text(f"## **1.1 {md_path.stem}**\n\nconverted", "utf-8")
+            yield ConversionResult(pdf=pdf, md_file=str(md_path), pages=1)
+
+
+class TestIngestionPipeline(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.collection = make_collection()
+        self.indexer = ChromaIndexer(
+            self.collection,
+            threading.Lock(),
+            TextSplitter(chunk_size=200, chunk_overlap=0),
+            FileHashManager(Path(self.tmp.name) / "hashes.json"),
+            batch_size=2,
+            embedder=BatchEmbedder(FakeEmbeddingFunction(), batch_size=2),
+        )
+        self.converter = FakePdfConverter()
+        self.pipeline = IngestionPipeline(self.indexer, self.converter, queue_size=1)
+
+    def write(self, name: str, text: str = "") -> str:
+        path = Path(self.tmp.name) / name
+        path.write_text(text, encoding="utf-8")
+        return str(path.resolve())
+
+    def test_indexes_markdown_and_converted_pdfs(self) -> None:
+        md_files = [
+            self.write(f"doc{i}.md", f"## **1.{i} Doc {i}**\n\nbody {i}")
+            for i in range(5)
+        ]
+        pdf = self.write("scan.pdf")
+        result = self.pipeline.run(lambda: (md_files, [], [pdf]))
+        self.assertEqual(result.errors, [])
+        self.assertCountEqual(
+            result.files, md_files + [str(Path(pdf).with_suffix(".md"))]
+        )
+        self.assertEqual(self.collection.count(), 6)
+        self.assertEqual(self.converter.seen, [pdf])
+        stats = {stage.name: stage for stage in result.stages}
+        self.assertEqual(stats["discovery"].items, 6)
+        self.assertEqual(stats["writing"].items, 6)
+
+    def test_writes_precomputed_embeddings(self) -> None:
+        md = self.write("doc.md", "## **1.1 Doc**\n\nbody")
+        self.pipeline.run(lambda: ([md], [], []))
+        stored = self.collection.get(include=["documents", "embeddings"])
+        expected = FakeEmbeddingFunction()(stored["documents"])
+        self.assertEqual(
+            [list(e) for e in stored["embeddings"]],
+            [list(e) for e in expected],
+        )
+
+    def test_unchanged_files_skipped_on_rerun(self) -> None:
+        md = self.write("doc.md", "## **1.1 Doc**\n\nbody")
+        self.pipeline.run(lambda: ([md], [], []))
+        result = self.pipeline.run(lambda: ([md], [], []))
+        self.assertEqual(result.files, [])
+        self.assertEqual(result.errors, [])
+
+    def test_errors_do_not_stop_other_files(self) -> None:
+        md = self.write("doc.md", "## **1.1 Doc**\n\nbody")
+        missing = str(Path(self.tmp.name) / "missing.md")
+        bad_pdf = self.write("bad.pdf")
+        result = self.pipeline.run(lambda: ([missing, md], ["walk error"], [bad_pdf]))
+        self.assertEqual(result.files, [md])
+        self.assertEqual(len(result.errors), 3)
+        self.assertIn("walk error", result.errors)
+
+    def test_no_files(self) -> None:
+        result = self.pipeline.run(lambda: ([], [], []))
+        self.assertEqual(result.errors, ["No files to index"])
+
+    def test_hashes_saved(self) -> None:
+        md = self.write("doc.md", "## **1.1 Doc**\n\nbody")
+        self.pipeline.run(lambda: ([md], [], []))
+        reloaded = FileHashManager(Path(self.tmp.name) / "hashes.json")
+        self.assertIn(md, reloaded.file_hashes)
+
+    def big_file(self, chapters: int = 5) -> str:
+        text = "\n".join(
+            f"## **1.{i} Chapter {i}**\n\nbody {i}" for i in range(chapters)
+        )
+        return self.write("big.md", text)
+
+    def test_file_flows_through_in_chunk_batches(self) -> None:
+        md = self.big_file()
+        batches: list[int] = []
+        write_chunks = self.indexer.write_chunks
+
+        def record(
+            new: ChunkBatch, updated: ChunkBatch, embeddings: Any = None
+        ) -> None:
+            batches.append(len(new["ids"]))
+            write_chunks(new, updated, embeddings)
+
+        with mock.patch.object(self.indexer, "write_chunks", record):
+            result = self.pipeline.run(lambda: ([md], [], []))
+        self.assertEqual(result.files, [md])
+        self.assertEqual(batches, [2, 2, 1])  # batch_size=2
+        self.assertEqual(self.collection.count(), 5)
+        self.assertEqual(len(self.indexer.hash_manager.get_chunks(md) or []), 5)
+
+    def test_failed_batch_leaves_file_unrecorded(self) -> None:
+        md = self.big_file()
+        embed_chunks = self.indexer.embed_chunks
+        calls = 0
+
+        def fail_second(new: ChunkBatch) -> Any:
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise RuntimeError("embedding failed")
+            return embed_chunks(new)
+
+        with mock.patch.object(self.indexer, "embed_chunks", fail_second):
+            result = self.pipeline.run(lambda: ([md], [], []))
+        self.assertEqual(result.files, [])
+        self.assertEqual(len(result.errors), 1)
+        self.assertFalse(self.indexer.hash_manager.is_unchanged(md))
+        # indexed completely on the next run
+        self.assertEqual(self.pipeline.run(lambda: ([md], [], [])).files, [md])
+        self.assertEqual(self.collection.count(), 5)
+
+    def test_markdown_indexed_while_pdfs_convert(self) -> None:
+        md = self.write("doc.md", "## **1.1 Doc**\n\nbody")
+        pdfs = [self.write(f"scan{i}.pdf") for i in range(3)]
+        indexed = threading.Event()
+        finish_file = self.indexer.finish_file
+        seen_while_converting: list[bool] = []
+
+        def record(file: str, ids: list[str]) -> None:
+            finish_file(file, ids)
+            if file == md:
+                indexed.set()
+
+        def slow_convert(pdfs):
+            # the first PDF only finishes once the markdown is indexed
+            for pdf in pdfs:
+                seen_while_converting.append(indexed.wait(timeout=5))
+                yield from FakePdfConverter().iter_convert([pdf])
+
+        with (
+            mock.patch.object(self.indexer, "finish_file", record),
+            mock.patch.object(self.converter, "iter_convert", slow_convert),
+        ):
+            result = self.pipeline.run(lambda: ([md], [], pdfs))
+        self.assertEqual(result.errors, [])
+        self.assertEqual(seen_while_converting, [True] * 3)
+        self.assertEqual(len(result.files), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Unit tests for query micro-batching.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_query_batcher -v
+"""
+
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from chroma.lexical_index import Bm25Index
+from chroma.query_batcher import QueryBatcher
+from chroma.retriever import ChromaRetriever
+from tests.fakes import make_collection
+
+
+def make_retriever() -> ChromaRetriever:
+    collection = make_collection()
+    texts = [f"chunk {i} about INT3{i}-C and strncpy" for i in range(10)]
+    collection.add(
+        ids=[f"id{i}" for i in range(10)],
+        documents=texts,
+        metadatas=[{"source": f"/{i}.md", "rule_id": f"INT3{i}-C"} for i in range(10)],
+    )
+    return ChromaRetriever(collection)
+
+
+class CountingRetriever:
+    """Records each batch; answers every query with one result naming it."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.batches: list[list[tuple[str, int]]] = []
+        self.error = error
+
+    def get_query_results_batch(self, queries: list[tuple[str, int]]) -> list:
+        self.batches.append(queries)
+        if self.error is not None:
+            raise self.error
+        return [[{"id": message}] for message, _ in queries]
+
+
+def run_concurrently(batcher: QueryBatcher, messages: list[str]) -> list:
+    results: list = [None] * len(messages)
+
+    def query(i: int) -> None:
+        try:
+            results[i] = batcher.get_query_results(messages[i], 5)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=query, args=(i,)) for i in range(len(messages))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestBatchedRetrieval(unittest.TestCase):
+    def test_batch_matches_single_queries(self) -> None:
+        retriever = make_retriever()
+        queries = [("What is INT32-C?", 3), ("strncpy", 5), ("chunk 7", 1)]
+        batched = retriever.get_query_results_batch(queries)
+        for (message, n_results), results in zip(queries, batched):
+            single = retriever.get_query_results(message, n_results)
+            self.assertEqual([r["id"] for r in results], [r["id"] for r in single])
+        self.assertEqual(batched[0][0]["id"], "id2")  # rule-id match first
+
+    def test_hybrid_batch_matches_single_queries(self) -> None:
+        retriever = make_retriever()
+        with tempfile.TemporaryDirectory() as tmp:
+            retriever.lexical_index = Bm25Index(Path(tmp) / "bm25.json")
+            retriever.lexical_index.load(retriever.collection)
+            queries = [("chunk 4 strncpy", 2), ("INT35-C", 4), ("chunk 9", 3)]
+            batched = retriever.get_query_results_batch(queries)
+            for (message, n_results), results in zip(queries, batched):
+                single = retriever.get_query_results(message, n_results)
+                self.assertEqual([r["id"] for r in results], [r["id"] for r in single])
+
+
+class TestQueryBatcher(unittest.TestCase):
+    def test_concurrent_queries_share_a_batch(self) -> None:
+        retriever = CountingRetriever()
+        batcher = QueryBatcher(retriever, window=0.2)  # type: ignore[arg-type]
+        self.addCleanup(batcher.close)
+        messages = [f"question {i}" for i in range(8)]
+        results = run_concurrently(batcher, messages)
+        self.assertEqual([r[0]["id"] for r in results], messages)
+        self.assertEqual(len(retriever.batches), 1)
+        self.assertEqual(len(retriever.batches[0]), 8)
+
+    def test_max_batch_splits_batches(self) -> None:
+        retriever = CountingRetriever()
+        batcher = QueryBatcher(retriever, window=0.2, max_batch=3)  # type: ignore[arg-type]
+        self.addCleanup(batcher.close)
+        run_concurrently(batcher, [f"q{i}" for i in range(7)])
+        self.assertTrue(all(len(batch) <= 3 for batch in retriever.batches))
+        self.assertEqual(sum(len(batch) for batch in retriever.batches), 7)
+
+    def test_identical_in_flight_queries_are_coalesced(self) -> None:
+        retriever = CountingRetriever()
+        batcher = QueryBatcher(retriever, window=0.2)  # type: ignore[arg-type]
+        self.addCleanup(batcher.close)
+        results = run_concurrently(batcher, ["Same  question", "same question"] * 3)
+        self.assertEqual(retriever.batches, [[("Same  question", 5)]])
+        self.assertEqual(batcher.stats()["coalesced"], 5)
+        self.assertTrue(all(r == [{"id": "Same  question"}] for r in results))
+
+    def test_error_reaches_every_caller(self) -> None:
+        retriever = CountingRetriever(error=RuntimeError("chroma down"))
+        batcher = QueryBatcher(retriever, window=0.05)  # type: ignore[arg-type]
+        self.addCleanup(batcher.close)
+        results = run_concurrently(batcher, ["a", "b"])
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    def test_closed_batcher_rejects_queries(self) -> None:
+        batcher = QueryBatcher(CountingRetriever())  # type: ignore[arg-type]
+        self.assertEqual(batcher.get_query_results("a", 1), [{"id": "a"}])
+        batcher.close()
+        with self.assertRaises(RuntimeError):
+            batcher.get_query_results("a", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Unit tests for chroma retriever.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_retriever -v
+"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from chroma.models import RetrievalResult
+from chroma.retriever import ChromaRetriever
+
+
+def make_scored(
+    content: str, distance: float, embedding: list[float]
+) -> RetrievalResult:
+    return {
+        "id": content,
+        "content": content,
+        "metadata": {"source": "/s.md"},
+        "distance": distance,
+        "embedding": np.array(embedding, dtype=np.float32),
+    }
+
+
+def make_result(content: str, source: str) -> RetrievalResult:
+    return {
+        "id": content,
+        "content": content,
+        "metadata": {"source": source},
+        "distance": 0.0,
+    }
+
+
+class TestGetSources(unittest.TestCase):
+    def test_unique_sources_in_order(self) -> None:
+        results = [
+            make_result("a", "/docs/b.md"),
+            make_result("b", "/docs/a.md"),
+            make_result("c", "/docs/b.md"),
+        ]
+        sources = ChromaRetriever.get_sources(results)
+        self.assertEqual(sources, ["/docs/b.md", "/docs/a.md"])
+
+    def test_empty_results(self) -> None:
+        self.assertEqual(ChromaRetriever.get_sources([]), [])
+
+
+class TestGetContext(unittest.TestCase):
+    def setUp(self) -> None:
+        self.results = [
+            make_scored("first", 0.2, [1.0, 0.0]),
+            make_scored("near duplicate of first", 0.3, [0.99, 0.01]),
+            make_scored("different topic", 0.5, [0.0, 1.0]),
+        ]
+
+    def test_unlimited_budget_keeps_all(self) -> None:
+        retriever = ChromaRetriever(None, context_budget=0)  # type: ignore[arg-type]
+        context = retriever.get_context(self.results)
+        self.assertEqual(len(context["results"]), 3)
+        self.assertTrue(context["context"].startswith("[source 1: /s.md]\nfirst"))
+        self.assertEqual(context["chars_used"], len(context["context"]))
+
+    def test_mmr_prefers_diverse_chunk(self) -> None:
+        retriever = ChromaRetriever(None, mmr_lambda=0.5)  # type: ignore[arg-type]
+        ids = [r["id"] for r in retriever.get_context(self.results)["results"]]
+        self.assertEqual(ids, ["first", "different topic", "near duplicate of first"])
+
+    def test_fused_relevance_keeps_semantic_distance(self) -> None:
+        retriever = ChromaRetriever(
+            None,  # type: ignore[arg-type]
+            context_budget=0,
+            lexical_index=mock.Mock(),
+        )
+        fused = [
+            make_scored("bm25 match, far in meaning", 1.8, [1.0, 0.0]),
+            make_scored("close in meaning", 0.0, [0.0, 1.0]),
+            {**make_scored("bm25 only", 0.0, [0.7, 0.7]), "distance": None},
+        ]
+        ids = [r["id"] for r in retriever.get_context(fused)["results"]]
+        self.assertEqual(ids[0], "close in meaning")
+        self.assertEqual(ids[-1], "bm25 only")
+
+    def test_budget_limits_context(self) -> None:
+        budget = len("[source 1: /s.md]\nfirst") + 10
+        retriever = ChromaRetriever(None, context_budget=budget)  # type: ignore[arg-type]
+        context = retriever.get_context(self.results)
+        self.assertEqual([r["id"] for r in context["results"]], ["first"])
+        self.assertLessEqual(context["chars_used"], budget)
+        self.assertEqual(context["char_budget"], budget)
+
+    def test_empty_results(self) -> None:
+        context = ChromaRetriever(None).get_context([])  # type: ignore[arg-type]
+        self.assertEqual(context["context"], "")
+        self.assertEqual(context["chars_used"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Unit tests for in-memory rule_id index.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_rule_index -v
+"""
+
+import unittest
+
+from chroma.retriever import ChromaRetriever
+from chroma.rule_index import RuleIndex
+from tests.fakes import make_collection
+
+
+class TestFindRuleIds(unittest.TestCase):
+    def test_several_rule_ids_in_order(self) -> None:
+        message = "compare pre30-c with DCL30-C and again PRE30-C, OOP50-CPP"
+        self.assertEqual(
+            RuleIndex.find_rule_ids(message), ["PRE30-C", "DCL30-C", "OOP50-CPP"]
+        )
+
+    def test_no_rule_id(self) -> None:
+        self.assertEqual(RuleIndex.find_rule_ids("how do I use strncpy?"), [])
+
+
+class TestRuleIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collection = make_collection()
+        self.collection.add(
+            ids=["a", "b", "c"],
+            documents=["PRE30-C text", "plain text", "DCL30-C text"],
+            metadatas=[
+                {"source": "/c.md", "rule_id": "PRE30-C"},
+                {"source": "/c.md"},
+                {"source": "/c.md", "rule_id": "DCL30-C"},
+            ],
+        )
+        self.index = RuleIndex()
+        self.index.load(self.collection)
+
+    def test_load_from_collection(self) -> None:
+        self.assertEqual(len(self.index), 2)
+        results = self.index.lookup(["DCL30-C", "PRE30-C"])
+        self.assertEqual([r["id"] for r in results], ["c", "a"])
+        self.assertEqual(results[0]["distance"], 0.0)
+
+    def test_upsert_and_delete(self) -> None:
+        self.index.on_upsert(["b"], ["now a rule"], [{"rule_id": "PRE30-C"}])
+        ids = [r["id"] for r in self.index.lookup(["PRE30-C"])]
+        self.assertEqual(ids, ["a", "b"])
+        self.index.on_delete(["a", "b"])
+        self.assertEqual(self.index.lookup(["PRE30-C"]), [])
+        self.assertEqual(len(self.index), 1)
+
+    def test_upserted_rule_chunk_keeps_its_embedding(self) -> None:
+        self.collection.add(
+            ids=["d"], documents=["INT30-C text"], metadatas=[{"rule_id": "INT30-C"}]
+        )
+        self.index.on_upsert(["d"], ["INT30-C text"], [{"rule_id": "INT30-C"}])
+        [upserted] = self.index.lookup(["INT30-C"])
+        reloaded = RuleIndex()
+        reloaded.load(self.collection)
+        [loaded] = reloaded.lookup(["INT30-C"])
+        self.assertIsNotNone(upserted["embedding"])
+        self.assertEqual(list(upserted["embedding"]), list(loaded["embedding"]))
+
+    def test_retriever_prepends_all_mentioned_rules(self) -> None:
+        retriever = ChromaRetriever(self.collection, rule_index=self.index)
+        results = retriever.get_query_results("PRE30-C vs DCL30-C?", 3)
+        self.assertEqual([r["id"] for r in results[:2]], ["a", "c"])
+        self.assertEqual(len({r["id"] for r in results}), 3)
+
+    def test_retriever_without_index_matches(self) -> None:
+        retriever = ChromaRetriever(self.collection)
+        results = retriever.get_query_results("PRE30-C vs DCL30-C?", 3)
+        self.assertEqual([r["id"] for r in results[:2]], ["a", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Unit tests for session memory.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_sessions -v
+"""
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from chroma.sessions import FileSessionBackend, InMemorySessionBackend, SessionStore
+
+
+class TestInMemorySessionBackend(unittest.TestCase):
+    def test_lru_eviction(self) -> None:
+        backend = InMemorySessionBackend(max_sessions=2)
+        store = SessionStore(backend)
+        store.add_turn(1, "q1", "a1")
+        store.add_turn(2, "q2", "a2")
+        store.get(1)  # 1 is now most recently used
+        store.add_turn(3, "q3", "a3")
+        self.assertIsNotNone(store.get(1))
+        self.assertIsNone(store.get(2))
+        self.assertEqual(len(backend), 2)
+
+    def test_ttl_expiry(self) -> None:
+        store = SessionStore(InMemorySessionBackend(ttl=60))
+        store.add_turn(1, "q", "a")
+        state = store.get(1)
+        assert state is not None
+        state["updated"] = time.time() - 61
+        self.assertIsNone(store.get(1))
+
+
+class TestFileSessionBackend(unittest.TestCase):
+    def test_shared_between_stores(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            SessionStore(FileSessionBackend(tmp)).add_turn(7, "q", "a")
+            state = SessionStore(FileSessionBackend(tmp)).get(7)
+        assert state is not None
+        self.assertEqual(state["turns"], [{"question": "q", "answer": "a"}])
+
+    def test_evicts_oldest_and_sanitizes_ids(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SessionStore(FileSessionBackend(tmp, max_sessions=1))
+            store.add_turn("../a", "q", "a")
+            store.add_turn("b", "q", "a")
+            self.assertIsNone(store.get("../a"))
+            self.assertIsNotNone(store.get("b"))
+
+    def test_eviction_skips_files_deleted_by_another_process(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = FileSessionBackend(tmp, max_sessions=1)
+            store = SessionStore(backend)
+            store.add_turn("a", "q", "a")
+            stat = Path.stat
+
+            def vanish(path: Path, **kwargs: Any) -> Any:
+                if path.name == "a.json":
+                    path.unlink()  # deleted between glob and stat
+                return stat(path, **kwargs)
+
+            with mock.patch.object(Path, "stat", vanish):
+                store.add_turn("b", "q", "a")
+            self.assertIsNotNone(store.get("b"))
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = SessionStore(InMemorySessionBackend(), max_tokens=100)
+
+    def test_history_stays_within_token_cap(self) -> None:
+        for i in range(20):
+            self.store.add_turn(1, f"question {i}", f"Answer {i}. " + "detail " * 20)
+        state = self.store.get(1)
+        assert state is not None
+        history = SessionStore.format_history(state)
+        self.assertLessEqual(len(history), 100 * SessionStore.CHARS_PER_TOKEN)
+        self.assertEqual(state["turns"][-1]["question"], "question 19")
+        # compacted turns keep the question and first sentence of the answer
+        self.assertIn("- question 18 -> Answer 18.", state["summary"])
+        self.assertNotIn("question 0 ", state["summary"])
+
+    def test_long_latest_turn_is_cut_to_token_cap(self) -> None:
+        self.store.add_turn(1, "question 0", "Short answer.")
+        self.store.add_turn(1, "question 1", "Long answer. " + "detail " * 200)
+        state = self.store.get(1)
+        assert state is not None
+        history = SessionStore.format_history(state)
+        self.assertLessEqual(len(history), 100 * SessionStore.CHARS_PER_TOKEN)
+        self.assertEqual(state["turns"][-1]["question"], "question 1")
+        self.assertTrue(state["turns"][-1]["answer"].startswith("Long answer."))
+        self.assertTrue(state["turns"][-1]["answer"].endswith("..."))
+
+    def test_condense_follow_up(self) -> None:
+        self.store.add_turn(1, "What does INT30-C say about unsigned wrap?", "...")
+        state = self.store.get(1)
+        self.assertEqual(
+            self.store.condense_query(state, "Any exceptions?"),
+            "What does INT30-C say about unsigned wrap? Any exceptions?",
+        )
+        # own rule id or a standalone question: used as is
+        self.assertEqual(
+            self.store.condense_query(state, "And INT31-C?"), "And INT31-C?"
+        )
+        standalone = "How should I validate array indexes before accessing memory"
+        self.assertEqual(self.store.condense_query(state, standalone), standalone)
+        self.assertEqual(self.store.condense_query(None, "Why?"), "Why?")
+
+    def test_format_history(self) -> None:
+        self.assertEqual(SessionStore.format_history(None), "")
+        self.store.add_turn(1, "q", "a")
+        self.assertEqual(
+            SessionStore.format_history(self.store.get(1)), "User: q\nAssistant: a"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
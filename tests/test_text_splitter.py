@@ -0,0 +1,93 @@
+"""Unit tests for chroma text splitter.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_text_splitter -v
+"""
+
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from chroma.text_splitter import TextSplitter
+
+
+def legacy_split(splitter: TextSplitter, file: str) -> list[str]:
+    """Line-by-line splitter the single-pass scan replaced, kept as reference."""
+    with open(file, "r", encoding="utf-8") as f:
+        text = f.read()
+    sections = []
+    current_section: list[str] = []
+    for line in text.split("\n"):
+        if not re.match(r"^## ", line):
+            current_section.append(line)
+            continue
+        if current_section:
+            sections.append("\n".join(current_section))
+        current_section = [line]
+    if current_section:
+        sections.append("\n".join(current_section))
+    if not sections:
+        sections = [text]
+    chunks = []
+    for section in sections:
+        chunks.extend(splitter.text_splitter.split_text(section))
+    return chunks
+
+
+class TestTextSplitter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.splitter = TextSplitter(chunk_size=120, chunk_overlap=30)
+
+    def write(self, text: str, newline: str = "\n") -> str:
+        path = Path(self.tmp.name) / "doc.md"
+        with open(path, "w", encoding="utf-8", newline=newline) as f:
+            f.write(text)
+        return str(path)
+
+    def assert_parity(self, text: str, newline: str = "\n") -> None:
+        file = self.write(text, newline)
+        self.assertEqual(self.splitter.split(file), legacy_split(self.splitter, file))
+
+    def test_parity_on_rule_document(self) -> None:
+        sections = [
+            f"## **{i}.1 INT{i}-C. Ensure operations do not wrap**\n\n"
+            + "Unsigned integer operations can wrap. " * (i % 7 + 1)
+            + "\n\n### Noncompliant Code Example\n\n```c\nint x = a + b;\n```\n"
+            for i in range(40)
+        ]
+        self.assert_parity("# Title\n\npreamble text\n\n" + "\n".join(sections))
+
+    def test_parity_edge_cases(self) -> None:
+        cases = [
+            "",
+            "no headers at all, just a paragraph " * 10,
+            "## only header",
+            "\n## header after blank line\nbody",
+            "## A\n## B\n\n## C\nbody",
+            "##not a header\n ## not either\n### sub header\nbody",
+            "## ünïcode hëader\nbödy with ✓ and 日本語\n## next\n" + "é" * 300,
+            "trailing newline\n## A\nbody\n",
+        ]
+        for text in cases:
+            with self.subTest(text=text[:30]):
+                self.assert_parity(text)
+
+    def test_parity_with_windows_newlines(self) -> None:
+        self.assert_parity("preamble\n## A\nbody a\n## B\nbody b\n", newline="\r\n")
+
+    def test_iter_split_is_lazy(self) -> None:
+        file = self.write("## A\nbody a\n## B\nbody b")
+        chunks = self.splitter.iter_split(file)
+        self.assertEqual(next(chunks), "## A\nbody a")
+        self.assertEqual(list(chunks), ["## B\nbody b"])
+
+    def test_rejects_non_markdown(self) -> None:
+        with self.assertRaises(ValueError):
+            self.splitter.split("doc.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
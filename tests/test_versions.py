@@ -0,0 +1,219 @@
+"""Unit tests for blue-green collection versions.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_versions -v
+"""
+
+import multiprocessing
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from chromadb.errors import NotFoundError
+
+from chroma.chroma import RagClient
+from chroma.versions import CollectionVersions
+from tests.fakes import FakeEmbeddingFunction
+
+
+def publish_in_writer_process(storage: str, docs: str, changed: list[str]) -> None:
+    """Writer side of the multi-process test (runs in a spawned process)."""
+    with mock.patch("chroma.chroma.DefaultEmbeddingFunction", FakeEmbeddingFunction):
+        client = RagClient(
+            name="docs", persistent_storage=storage, collection_path=docs
+        )
+        client.publish_files(changed, [])
+
+
+class TestCollectionVersions(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.file = Path(self.tmp.name) / "versions.json"
+
+    def test_defaults_to_unversioned_name(self) -> None:
+        versions = CollectionVersions(self.file, "docs")
+        self.assertEqual(versions.active, "docs")
+        self.assertEqual(versions.next_version(), "docs-v1")
+        self.assertIsNone(versions.previous())
+
+    def test_activate_persists_and_counts_up(self) -> None:
+        versions = CollectionVersions(self.file, "docs")
+        versions.activate("docs-v1")
+        versions.activate("docs-v2")
+        reloaded = CollectionVersions(self.file, "docs")
+        self.assertEqual(reloaded.active, "docs-v2")
+        self.assertEqual(reloaded.versions, ["docs", "docs-v1", "docs-v2"])
+        self.assertEqual(reloaded.next_version(), "docs-v3")
+        self.assertEqual(reloaded.previous(), "docs-v1")
+        self.assertEqual(reloaded.stale(keep=1), ["docs"])
+
+    def test_changed_on_disk(self) -> None:
+        versions = CollectionVersions(self.file, "docs")
+        self.assertFalse(versions.changed_on_disk())
+        other = CollectionVersions(self.file, "docs")
+        other.activate("docs-v1")
+        self.assertTrue(versions.changed_on_disk())
+        versions.load()
+        self.assertFalse(versions.changed_on_disk())
+        self.assertEqual(versions.active, "docs-v1")
+
+    def test_cannot_remove_active(self) -> None:
+        versions = CollectionVersions(self.file, "docs")
+        with self.assertRaises(ValueError):
+            versions.remove("docs")
+
+
+@mock.patch("chroma.chroma.DefaultEmbeddingFunction", FakeEmbeddingFunction)
+class TestRebuildCollection(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.docs = Path(self.tmp.name) / "docs"
+        self.docs.mkdir()
+        self.storage = str(Path(self.tmp.name) / "db")
+
+    def make_client(self) -> RagClient:
+        return RagClient(
+            name="docs",
+            persistent_storage=self.storage,
+            collection_path=str(self.docs),
+            keep_versions=1,
+        )
+
+    def write(self, name: str, text: str) -> None:
+        (self.docs / name).write_text(text, encoding="utf-8")
+
+    def sources(self, client: RagClient) -> set[str]:
+        results = client.get_query_results("body", n_results=10)
+        return {Path(str(r["metadata"]["source"])).name for r in results}
+
+    def test_rebuild_swaps_readers_and_keeps_previous(self) -> None:
+        self.write("a.md", "## **1.1 A**\n\nbody a")
+        client = self.make_client()
+        client.reload_collection()
+        self.write("b.md", "## **1.1 B**\n\nbody b")
+        result = client.rebuild_collection()
+        self.assertEqual(result.errors, [])
+        self.assertEqual(client.versions.active, "docs-v1")
+        self.assertEqual(self.sources(client), {"a.md", "b.md"})
+        # live collection was untouched while rebuilding
+        self.assertEqual(client.client.get_collection("docs").count(), 1)
+        self.assertEqual(client.rollback(), "docs")
+        self.assertEqual(self.sources(client), {"a.md"})
+
+    def test_old_versions_dropped(self) -> None:
+        self.write("a.md", "## **1.1 A**\n\nbody a")
+        client = self.make_client()
+        client.rebuild_collection()
+        client.rebuild_collection()
+        self.assertEqual(client.versions.versions, ["docs-v1", "docs-v2"])
+        names = {c.name for c in client.client.list_collections()}
+        self.assertNotIn("docs", names)
+
+    def test_empty_rebuild_rejected(self) -> None:
+        client = self.make_client()
+        result = client.rebuild_collection()
+        self.assertTrue(any("rejected" in error for error in result.errors))
+        self.assertEqual(client.versions.active, "docs")
+        self.assertEqual(client.versions.versions, ["docs"])
+
+    def test_other_process_picks_up_new_version(self) -> None:
+        self.write("a.md", "## **1.1 A**\n\nbody a")
+        reader = self.make_client()
+        writer = self.make_client()
+        writer.rebuild_collection()
+        reader.get_context("body")
+        self.assertEqual(reader.retriever.collection.name, "docs-v1")
+
+    def test_publish_files_goes_live_as_new_version(self) -> None:
+        self.write("a.md", "## **1.1 A**\n\nbody a")
+        self.write("b.md", "## **1.1 B**\n\nbody b")
+        client = self.make_client()
+        client.reload_collection()
+        self.write("c.md", "## **1.1 C**\n\nbody c")
+        result = client.publish_files(
+            [str(self.docs / "c.md")], [str(self.docs / "a.md")]
+        )
+        self.assertEqual(result.errors, [])
+        self.assertEqual(client.versions.active, "docs-v1")
+        self.assertEqual(self.sources(client), {"b.md", "c.md"})
+        self.assertEqual(client.client.get_collection("docs").count(), 2)
+        # hashes were carried over: unchanged files are not indexed again
+        result = client.publish_files([str(self.docs / "b.md")], [])
+        self.assertEqual(result.files, [])
+        self.assertEqual(client.versions.active, "docs-v2")
+
+    def test_publish_collection_publishes_changed_files(self) -> None:
+        self.write("a.md", "## **1.1 A**\n\nbody a")
+        client = self.make_client()
+        client.rebuild_collection()
+        self.assertTrue(client.versions.in_use())
+        result = client.publish_collection()
+        self.assertEqual(result.files, [])
+        self.assertEqual(client.versions.active, "docs-v1")
+        self.write("b.md", "## **1.1 B**\n\nbody b")
+        result = client.publish_collection()
+        self.assertEqual(result.errors, [])
+        self.assertEqual([Path(f).name for f in result.files], ["b.md"])
+        self.assertEqual(client.versions.active, "docs-v2")
+        self.assertEqual(self.sources(client), {"a.md", "b.md"})
+
+    def test_remove_db_files_publishes_deletion(self) -> None:
+        from scripts import remove_db_files
+
+        self.write("a.md", "## **1.1 A**\n\nbody a")
+        self.write("b.md", "## **1.1 B**\n\nbody b")
+        client = self.make_client()
+        client.rebuild_collection()
+        with (
+            mock.patch.dict("os.environ", {"COLLECTION_PATH": str(self.docs)}),
+            mock.patch("builtins.input", side_effect=["a.md", ""]),
+            mock.patch("builtins.print"),
+            mock.patch("logging.basicConfig"),
+            mock.patch.object(remove_db_files, "create_rag_client", lambda: client),
+        ):
+            remove_db_files.main()
+        self.assertEqual(client.versions.active, "docs-v2")
+        self.assertEqual(self.sources(client), {"b.md"})
+        # the previous version, still open in other processes, is untouched
+        self.assertEqual(client.client.get_collection("docs-v1").count(), 2)
+
+    def test_read_only_client_never_writes(self) -> None:
+        with self.assertRaises(NotFoundError):
+            RagClient(name="docs", persistent_storage=self.storage, read_only=True)
+        self.make_client()
+        reader = RagClient(name="docs", persistent_storage=self.storage, read_only=True)
+        with self.assertRaises(RuntimeError):
+            reader.reload_collection()
+        with self.assertRaises(RuntimeError):
+            reader.publish_files([], [])
+
+    def test_reader_process_sees_version_published_by_writer(self) -> None:
+        self.write("a.md", "## **1.1 A**\n\nbody a")
+        self.make_client().reload_collection()
+        reader = RagClient(
+            name="docs",
+            persistent_storage=self.storage,
+            collection_path=str(self.docs),
+            cache_size=0,
+            read_only=True,
+        )
+        self.assertEqual(self.sources(reader), {"a.md"})
+        self.write("b.md", "## **1.1 B**\n\nbody b")
+        # a separate process, so the reader's in-memory vector index is not shared
+        writer = multiprocessing.get_context("spawn").Process(
+            target=publish_in_writer_process,
+            args=(self.storage, str(self.docs), [str(self.docs / "b.md")]),
+        )
+        writer.start()
+        writer.join(timeout=120)
+        self.assertEqual(writer.exitcode, 0)
+        reader.get_context("body")
+        self.assertEqual(reader.retriever.collection.name, "docs-v1")
+        self.assertEqual(self.sources(reader), {"a.md", "b.md"})
+
+
+if __name__ == "__main__":
+    unittest.main()
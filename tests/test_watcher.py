@@ -0,0 +1,138 @@
+"""Unit tests for chroma file watcher.
+
+Run from project root (with deps installed):
+  python -m unittest tests.test_watcher -v
+"""
+
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from chroma.models import CollectionResult
+from chroma.watcher import FileWatcher
+
+
+class RecordingUpdate:
+    """Stands in for RagClient.update_files; records each batch."""
+
+    def __init__(self) -> None:
+        self.batches: list[tuple[list[str], list[str]]] = []
+        self.called = threading.Event()
+
+    def __call__(self, changed: list[str], deleted: list[str]) -> CollectionResult:
+        self.batches.append((sorted(changed), sorted(deleted)))
+        self.called.set()
+        return CollectionResult(files=changed + deleted, errors=[])
+
+
+class TestFileWatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name).resolve()
+        self.update = RecordingUpdate()
+
+    def make_watcher(
+        self, backend: str = "poll", debounce: float = 0.2, max_depth: int = 3
+    ) -> FileWatcher:
+        watcher = FileWatcher(
+            self.root,
+            self.update,
+            backend,
+            debounce=debounce,
+            poll_interval=0.05,
+            max_depth=max_depth,
+        )
+        self.addCleanup(watcher.stop)
+        return watcher
+
+    def test_debounces_burst_into_one_batch(self) -> None:
+        watcher = self.make_watcher(backend="poll", debounce=0.3)
+        watcher.start()
+        for name in ("a.md", "b.md", "c.md"):
+            watcher.record(str(self.root / name), deleted=False)
+            time.sleep(0.05)
+        watcher.record(str(self.root / "a.md"), deleted=True)
+        watcher.record(str(self.root / "notes.txt"), deleted=False)  # ignored
+        self.assertTrue(self.update.called.wait(5))
+        self.assertEqual(
+            self.update.batches,
+            [
+                (
+                    [str(self.root / "b.md"), str(self.root / "c.md")],
+                    [str(self.root / "a.md")],
+                )
+            ],
+        )
+        status = watcher.status()
+        self.assertEqual(status.queue_depth, 0)
+        self.assertIsNotNone(status.last_index_time)
+
+    def test_poll_backend_detects_add_change_delete(self) -> None:
+        existing = self.root / "old.md"
+        existing.write_text("old", encoding="utf-8")
+        watcher = self.make_watcher(backend="poll", debounce=0.3)
+        watcher.start()
+        (self.root / "sub").mkdir()
+        added = self.root / "sub" / "new.pdf"
+        added.write_bytes(b"%PDF")
+        existing.unlink()
+        self.assertTrue(self.update.called.wait(5))
+        changed, deleted = self.update.batches[0]
+        self.assertEqual(changed, [str(added)])
+        self.assertEqual(deleted, [str(existing)])
+
+    @unittest.skipUnless(FileWatcher._has_watchfiles(), "watchfiles not installed")
+    def test_inotify_backend_detects_new_file(self) -> None:
+        watcher = self.make_watcher(backend="inotify", debounce=0.1)
+        watcher.start()
+        time.sleep(0.5)  # let the watch register
+        added = self.root / "new.md"
+        added.write_text("new", encoding="utf-8")
+        self.assertTrue(self.update.called.wait(5))
+        self.assertIn(str(added), self.update.batches[0][0])
+
+    def test_poll_snapshot_skips_directory_deleted_while_walking(self) -> None:
+        (self.root / "gone").mkdir()
+        kept = self.root / "kept.md"
+        kept.write_text("kept", encoding="utf-8")
+        iterdir = Path.iterdir
+
+        def vanishing_iterdir(path: Path):  # type: ignore[no-untyped-def]
+            if path.name == "gone":
+                raise FileNotFoundError(path)
+            return iterdir(path)
+
+        watcher = self.make_watcher()
+        with mock.patch.object(Path, "iterdir", vanishing_iterdir):
+            self.assertEqual(list(watcher._snapshot()), [str(kept)])
+
+    @unittest.skipUnless(FileWatcher._has_watchfiles(), "watchfiles not installed")
+    def test_inotify_backend_honours_max_depth(self) -> None:
+        watcher = self.make_watcher(backend="inotify", debounce=0.3, max_depth=1)
+        deep = self.root / "a" / "b" / "deep.md"
+        deep.parent.mkdir(parents=True)
+        watcher.start()
+        time.sleep(0.5)  # let the watch register
+        deep.write_text("deep", encoding="utf-8")
+        shallow = self.root / "a" / "shallow.md"
+        shallow.write_text("shallow", encoding="utf-8")
+        self.assertTrue(self.update.called.wait(5))
+        self.assertEqual(self.update.batches, [([str(shallow)], [])])
+
+    def test_status_before_start(self) -> None:
+        status = self.make_watcher().status()
+        self.assertFalse(status.running)
+        self.assertEqual(status.backend, "poll")
+        self.assertIsNone(status.last_index_time)
+
+    def test_unknown_backend(self) -> None:
+        with self.assertRaises(ValueError):
+            FileWatcher(self.root, self.update, backend="fsevents")
+
+
+if __name__ == "__main__":
+    unittest.main()